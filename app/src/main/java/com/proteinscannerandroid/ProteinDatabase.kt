@@ -88,7 +88,8 @@ object ProteinDatabase {
         // RULE 0a: EMULSIFIER/OIL EXCLUSION - Lecithin and oils are NOT protein sources
         // Check text IMMEDIATELY around this match only, not far context
         // ============================================================
-        if (proteinSourceName == "Soy Protein" || proteinSourceName == "Soy Protein Isolate" || proteinSourceName == "Soy Protein Concentrate") {
+        val soySources = setOf("Soy Protein", "Soy Protein Isolate", "Soy Protein Concentrate")
+        if (proteinSourceName in soySources) {
             // Get immediate context (25 chars before and 25 after - need larger window to capture "huile végétale (soja)")
             val immediateStart = maxOf(0, position - 25)
             val immediateEnd = minOf(ingredientsLower.length, position + matchedText.length + 25)
@@ -144,8 +145,8 @@ object ProteinDatabase {
             val contextBeforeMatch = immediateContext.substring(0, minOf(immediateContext.length, 25))
             // Only check the text after the last comma/semicolon (= same ingredient)
             val sameIngredientBefore = contextBeforeMatch.substringAfterLast(",").substringAfterLast(";")
-            if (sameIngredientBefore.contains("huile") || sameIngredientBefore.contains("oil") ||
-                sameIngredientBefore.contains("öl") || sameIngredientBefore.contains("aceite")) {
+            val oilWords = listOf("huile", "oil", "öl", "aceite")
+            if (oilWords.any { sameIngredientBefore.contains(it) }) {
                 return Pair(false, "Part of oil phrase (oil precedes soja/soy), not protein source")
             }
         }
@@ -153,9 +154,9 @@ object ProteinDatabase {
         // RULE 0b: MILK CHOCOLATE / MILKFAT EXCLUSION - "milk" in "milk chocolate" is NOT a protein source
         // "Milk chocolate" is a type of chocolate, not a dairy protein ingredient.
         // Similarly "milkfat" is a fat, not a protein source.
-        if (proteinSourceName == "Milk Protein" || proteinSourceName == "Casein Protein" ||
-            proteinSourceName == "Whey Protein Concentrate" || proteinSourceName == "Whey Protein Isolate" ||
-            proteinSourceName == "Whey Protein Hydrolysate" || proteinSourceName == "Dairy Trace Protein") {
+        val milkSources = setOf("Milk Protein", "Casein Protein", "Whey Protein Concentrate", "Whey Protein Isolate",
+            "Whey Protein Hydrolysate", "Dairy Trace Protein")
+        if (proteinSourceName in milkSources) {
             if (matchedText == "milk" || matchedText == "lait" || matchedText == "milch") {
                 val afterEnd = minOf(ingredientsLower.length, position + matchedText.length + 15)
                 val textAfter = ingredientsLower.substring(position + matchedText.length, afterEnd).trimStart()
@@ -243,21 +244,22 @@ object ProteinDatabase {
         // Starch exclusion - starch is not protein
         // Starch comes BEFORE ingredient (amidon de blé, Stärke from X) OR parenthetically (Starches (from Pea))
         // But NOT if starch is a SEPARATE ingredient after a comma: "pois, amidon de tapioca"
-        if (proteinSourceName == "Wheat Protein" || proteinSourceName == "Corn Protein" || proteinSourceName == "Rice Protein" ||
-            proteinSourceName == "Pea Protein" || proteinSourceName == "Pea Protein Isolate") {
+        val starchSources = setOf("Wheat Protein", "Corn Protein", "Rice Protein", "Pea Protein", "Pea Protein Isolate")
+        if (proteinSourceName in starchSources) {
             // Only check BEFORE the match (starch precedes ingredient) - use larger window
             val starchContextStart = maxOf(0, position - 35)
             val starchContextBefore = ingredientsLower.substring(starchContextStart, position)
 
             // Check for starch patterns BEFORE the match
-            if (starchContextBefore.contains("amidon") || starchContextBefore.contains("stärke") ||
-                starchContextBefore.contains("starch") || starchContextBefore.contains("amidonné")) {
+            val starchTerms = listOf("amidon", "stärke", "starch", "amidonné")
+            if (starchTerms.any { starchContextBefore.contains(it) }) {
                 return Pair(false, "Part of starch, not protein source")
             }
         }
 
         // Gluten-free exclusion - "glutenfrei", "gluten free", "sans gluten" etc. are NOT protein
-        if (proteinSourceName == "Wheat Protein" || proteinSourceName == "Corn Protein") {
+        val glutenSources = setOf("Wheat Protein", "Corn Protein")
+        if (proteinSourceName in glutenSources) {
             if (matchedText == "gluten" || matchedText == "weizengluten" || matchedText == "maisgluten" || matchedText == "corn gluten") {
                 val afterEnd = minOf(ingredientsLower.length, position + matchedText.length + 10)
                 val textAfter = ingredientsLower.substring(position + matchedText.length, afterEnd)
@@ -290,18 +292,16 @@ object ProteinDatabase {
             val context = ingredientsLower.substring(contextStart, contextEnd)
 
             // Check for fiber and starch patterns - corn in these contexts is not protein
-            if (context.contains("fibre") || context.contains("fiber") ||
-                context.contains("starch") || context.contains("amidon") ||
-                context.contains("(from") || context.contains("from corn") ||
-                context.contains("of corn")) {
+            val cornContextTerms = listOf("fibre", "fiber", "starch", "amidon", "(from", "from corn", "of corn")
+            if (cornContextTerms.any { context.contains(it) }) {
                 return Pair(false, "Part of fiber/starch context, not protein source")
             }
         }
 
         // Malt/extract exclusion - malt and malt extract are sweeteners/flavorings, not protein
         // Handles: gerstenmalzextrakt, malzextrakt, barley malt, malt extract, weizenmalz, etc.
-        if (proteinSourceName == "Barley Protein" || proteinSourceName == "Wheat Protein" ||
-            proteinSourceName == "Corn Protein" || proteinSourceName == "Rye Protein") {
+        val maltSources = setOf("Barley Protein", "Wheat Protein", "Corn Protein", "Rye Protein")
+        if (proteinSourceName in maltSources) {
             val wordEnd = (position + matchedText.length until ingredientsLower.length).firstOrNull {
                 ingredientsLower[it] in setOf(' ', ',', '.', ';', ':', '(', ')', '[', ']', '\t', '\n')
             } ?: ingredientsLower.length
@@ -328,7 +328,8 @@ object ProteinDatabase {
         }
 
         // Chicken/poultry exclusion - flavor/aroma terms are not actual protein
-        if (proteinSourceName == "Chicken Protein" || proteinSourceName == "Turkey Protein") {
+        val poultrySources = setOf("Chicken Protein", "Turkey Protein")
+        if (proteinSourceName in poultrySources) {
             val flavorContextStart = maxOf(0, position - 40)
             val flavorContextEnd = minOf(ingredientsLower.length, position + matchedText.length + 20)
             val flavorContext = ingredientsLower.substring(flavorContextStart, flavorContextEnd)
@@ -350,14 +351,15 @@ object ProteinDatabase {
 
         // Nut exclusion - "noix de muscade" = nutmeg (spice), not nut protein
         // Also exclude French compound nut names: noix de coco, noix de cajou, noix de pécan, noix du brésil
-        if (proteinSourceName == "Mixed Nut Protein" || proteinSourceName == "Walnut Protein") {
+        val nutSources = setOf("Mixed Nut Protein", "Walnut Protein")
+        if (proteinSourceName in nutSources) {
             val nutContextStart = maxOf(0, position - 10)
             val nutContextEnd = minOf(ingredientsLower.length, position + matchedText.length + 20)
             val nutContext = ingredientsLower.substring(nutContextStart, nutContextEnd)
 
             // Nutmeg exclusion
-            if (nutContext.contains("muscade") || nutContext.contains("nutmeg") ||
-                nutContext.contains("muskat") || nutContext.contains("moscada")) {
+            val nutmegTerms = listOf("muscade", "nutmeg", "muskat", "moscada")
+            if (nutmegTerms.any { nutContext.contains(it) }) {
                 return Pair(false, "Part of nutmeg (spice), not nut protein")
             }
 
@@ -371,10 +373,8 @@ object ProteinDatabase {
                     !afterNoix.matches(Regex(" de [^a-z].*|^$"))) { // Not just "de noix" at end
                     // Check what comes after "noix de/du " - if it's coco, cajou, pécan, brésil, muscade, it's not walnut
                     val afterPhrase = afterNoix.replace(Regex("^ de | du "), "")
-                    if (afterPhrase.startsWith("coco") || afterPhrase.startsWith("cajou") ||
-                        afterPhrase.startsWith("pécan") || afterPhrase.startsWith("pecan") ||
-                        afterPhrase.startsWith("brésil") || afterPhrase.startsWith("bresil") ||
-                        afterPhrase.startsWith("muscade")) {
+                    val frenchNutNames = listOf("coco", "cajou", "pécan", "pecan", "brésil", "bresil", "muscade")
+                    if (frenchNutNames.any { afterPhrase.startsWith(it) }) {
                         return Pair(false, "Part of French compound nut name (noix de/du X)")
                     }
                 }
@@ -387,7 +387,8 @@ object ProteinDatabase {
             val contextEnd = minOf(ingredientsLower.length, position + matchedText.length + 10)
             val context = ingredientsLower.substring(contextStart, contextEnd)
 
-            if (context.contains("linseed") || context.contains("lin seed") || context.contains("flaxseed")) {
+            val linseedTerms = listOf("linseed", "lin seed", "flaxseed")
+            if (linseedTerms.any { context.contains(it) }) {
                 return Pair(false, "Part of linseed/flax, not lentil")
             }
         }
@@ -503,14 +504,11 @@ object ProteinDatabase {
                     else ingredientsLower.substring(position + matchedText.length)
 
                 // Check for known compound patterns that should be EXCLUDED
-                val invalidCompounds = setOf(
-                    // German compound patterns that contain generic terms
-                    "soja${keyword.lowercase()}", "reis${keyword.lowercase()}", "weizen${keyword.lowercase()}",
-                    "erbsen${keyword.lowercase()}", "hanf${keyword.lowercase()}", "hühner${keyword.lowercase()}",
-                    "milch${keyword.lowercase()}", // "milk" compounds
-                    "${keyword.lowercase()}isolat", "${keyword.lowercase()}konzentrat",
-                    "${keyword.lowercase()}pulver", "${keyword.lowercase()}crispies"
-                )
+                // German compound patterns that contain generic terms ("milch" = "milk" compounds)
+                val compoundPrefixes = listOf("soja", "reis", "weizen", "erbsen", "hanf", "hühner", "milch")
+                val compoundSuffixes = listOf("isolat", "konzentrat", "pulver", "crispies")
+                val invalidCompounds = compoundPrefixes.map { it + keyword.lowercase() } +
+                    compoundSuffixes.map { keyword.lowercase() + it }
 
                 val fullContext = contextBefore + matchedText + contextAfter
                 for (pattern in invalidCompounds) {
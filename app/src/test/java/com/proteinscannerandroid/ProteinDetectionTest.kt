@@ -6,6 +6,7 @@ import org.junit.Test
 import org.junit.Assert.*
 import java.io.File
 import java.net.URL
+import java.util.Locale
 
 /**
  * Protein Detection Algorithm Test Suite
@@ -21,6 +22,12 @@ import java.net.URL
  */
 class ProteinDetectionTest {
 
+    companion object {
+        // Relative to the module directory, where Gradle runs unit tests
+        const val CASE_REPORT_PATH = "build/test-results/protein-detection/cases.json"
+        const val CASE_REPORT_FORMAT = "protein-detection-results"
+    }
+
     data class TestCase(
         val id: String,
         val name: String,
@@ -45,7 +52,8 @@ class ProteinDetectionTest {
         val missingProteins: List<String>,
         val unexpectedProteins: List<String>,
         val wronglyDetected: List<String>,
-        val errorMessage: String? = null
+        val errorMessage: String? = null,
+        val durationMs: Double = 0.0
     )
 
     private val gson = Gson()
@@ -76,6 +84,7 @@ class ProteinDetectionTest {
      * Run a single test case and return detailed results
      */
     private fun runTestCase(testCase: TestCase): TestResult {
+        val startNanos = System.nanoTime()
         try {
             val analysis = ProteinDatabase.analyzeProteinQuality(testCase.ingredients, null)
             val detectedNames = analysis.detectedProteins.map { it.proteinSource.name }
@@ -112,7 +121,8 @@ class ProteinDetectionTest {
                 detectedProteins = detectedNames,
                 missingProteins = missingProteins,
                 unexpectedProteins = unexpectedProteins,
-                wronglyDetected = wronglyDetected
+                wronglyDetected = wronglyDetected,
+                durationMs = (System.nanoTime() - startNanos) / 1_000_000.0
             )
         } catch (e: Exception) {
             return TestResult(
@@ -122,11 +132,49 @@ class ProteinDetectionTest {
                 missingProteins = testCase.expected_detected,
                 unexpectedProteins = emptyList(),
                 wronglyDetected = emptyList(),
-                errorMessage = e.message
+                errorMessage = e.message,
+                durationMs = (System.nanoTime() - startNanos) / 1_000_000.0
             )
         }
     }
 
+    /**
+     * Per-case timing suffix (locale-independent decimal point)
+     */
+    private fun formatDuration(result: TestResult): String =
+        "[${String.format(Locale.ROOT, "%.3f", result.durationMs)} ms]"
+
+    /**
+     * Write one structured entry per test case (in file order, duplicate ids included)
+     * for test_results.py, instead of it scraping the console output
+     */
+    private fun writeCaseReport(results: List<TestResult>) {
+        val cases = results.mapIndexed { index, result ->
+            linkedMapOf(
+                "index" to index,
+                "id" to result.testCase.id,
+                "name" to result.testCase.name,
+                "passed" to result.passed,
+                "time_ms" to result.durationMs,
+                "detected" to result.detectedProteins,
+                "missing" to result.missingProteins,
+                "wrongly_detected" to result.wronglyDetected,
+                "unexpected" to result.unexpectedProteins,
+                "error" to result.errorMessage
+            )
+        }
+        val report = linkedMapOf(
+            "format" to CASE_REPORT_FORMAT,
+            "version" to 1,
+            "passed" to results.count { it.passed },
+            "failed" to results.count { !it.passed },
+            "cases" to cases
+        )
+        val file = File(CASE_REPORT_PATH)
+        file.parentFile?.mkdirs()
+        file.writeText(gson.toJson(report))
+    }
+
     /**
      * MAIN TEST: Run all test cases from JSON file
      * This is the test that the Ralph Wiggum loop will run repeatedly
@@ -147,11 +195,11 @@ class ProteinDetectionTest {
         for (result in results) {
             if (result.passed) {
                 passCount++
-                println("\n[PASS] ${result.testCase.name} (${result.testCase.id})")
+                println("\n[PASS] ${result.testCase.name} (${result.testCase.id}) ${formatDuration(result)}")
                 println("       Detected: ${result.detectedProteins.joinToString(", ").ifEmpty { "none" }}")
             } else {
                 failCount++
-                println("\n[FAIL] ${result.testCase.name} (${result.testCase.id})")
+                println("\n[FAIL] ${result.testCase.name} (${result.testCase.id}) ${formatDuration(result)}")
                 println("       Ingredients: ${result.testCase.ingredients.take(100)}...")
                 println("       Detected: ${result.detectedProteins.joinToString(", ").ifEmpty { "none" }}")
 
@@ -175,6 +223,8 @@ class ProteinDetectionTest {
         println("SUMMARY: $passCount passed, $failCount failed out of ${results.size} tests")
         println("=".repeat(80))
 
+        writeCaseReport(results)
+
         // Assert all tests pass
         val failedTests = results.filter { !it.passed }
         if (failedTests.isNotEmpty()) {
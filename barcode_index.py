@@ -0,0 +1,185 @@
+"""
+Known-barcode index
+
+Fetchers used to find out that a product already has a test case only after
+fetching it, and run creation did not check at all, so known products ended
+up in products files and agent iterations. This index answers "have we seen
+this barcode?" without parsing protein_test_cases.json or decompressing run
+folders on every call:
+
+    cases   barcodes of test cases (protein_test_cases.json + pending case
+            log; off_<barcode> and training_<barcode> ids)
+    runs    barcodes of the run products (runs/ and runs_archived/) whose
+            checkpoint entry is done or auto, i.e. evaluated in that run.
+            Pending, in-progress, skipped and failed products are not
+            claimed, nor are the products of runs without a checkpoint, so
+            an abandoned run does not hide its products from later fetches
+
+The barcodes are persisted per source file (for runs: the checkpoint.json
+next to the products file) in .barcode_index.json together
+with the file's (mtime_ns, size), so a refresh only re-reads files that
+changed and drops files that are gone. It is an exact set: a few thousand
+barcodes fit in memory easily, and a false positive would silently hide a
+product.
+
+Usage:
+    python barcode_index.py status
+    python barcode_index.py check 6111246721261 4000405001738
+    python barcode_index.py rebuild
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+from case_log import CASE_LOG_FILE, TEST_CASES_FILE, CaseLog, _stat_key
+from product_store import RUN_ROOTS, barcode_from_case
+from run_checkpoint import AUTO, CHECKPOINT_NAME, DONE
+from run_products import run_products_files
+
+PROJECT_ROOT = Path(__file__).parent
+BARCODE_INDEX_FILE = PROJECT_ROOT / ".barcode_index.json"
+FORMAT_VERSION = 2
+
+# Checkpoint statuses that claim a run product's barcode
+EVALUATED = (DONE, AUTO)
+
+CASES, RUNS = "cases", "runs"
+
+
+def _case_file_barcodes(path: Path) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        cases = json.load(f).get("test_cases", [])
+    return [barcode_from_case(case) for case in cases]
+
+
+def _case_log_barcodes(path: Path) -> list:
+    return [barcode_from_case(entry["case"]) for entry in CaseLog(log=path).entries()]
+
+
+def _run_barcodes(path: Path) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f).get("products", [])
+    return [str(entry["barcode"]) for entry in entries if entry.get("status") in EVALUATED and entry.get("barcode")]
+
+
+class BarcodeIndex:
+    """Barcodes of the test cases and run products, refreshed incrementally per source file."""
+
+    def __init__(self, path=BARCODE_INDEX_FILE, test_cases=TEST_CASES_FILE, case_log=CASE_LOG_FILE,
+                 run_roots=None):
+        self.path = Path(path)
+        self.test_cases = Path(test_cases)
+        self.case_log = Path(case_log)
+        self.run_roots = run_roots or RUN_ROOTS
+        self.sources = {}
+        self._barcodes = {CASES: set(), RUNS: set()}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("version") == FORMAT_VERSION:
+                self.sources = stored["sources"]
+        except (OSError, ValueError, KeyError):
+            self.sources = {}
+
+    def _save(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "sources": self.sources}, f)
+        os.replace(tmp, self.path)
+
+    def source_files(self) -> list:
+        """(path, kind, reader) of every source file that currently exists."""
+        files = [(self.test_cases, CASES, _case_file_barcodes), (self.case_log, CASES, _case_log_barcodes)]
+        files += [(p.parent / CHECKPOINT_NAME, RUNS, _run_barcodes) for p in run_products_files(self.run_roots)]
+        return [(p, kind, reader) for p, kind, reader in files if p.exists()]
+
+    def refresh(self) -> int:
+        """Re-read the source files that changed since the last refresh; returns how many were re-read."""
+        changed = 0
+        current = {}
+        for path, kind, reader in self.source_files():
+            name = str(path)
+            key = _stat_key(path)
+            stored = self.sources.get(name)
+            if stored is None or stored["key"] != key or stored["kind"] != kind:
+                try:
+                    barcodes = sorted({b for b in reader(path) if b})
+                except (OSError, ValueError) as e:
+                    print(f"Warning: could not read barcodes from {path}: {e}")
+                    continue
+                stored = {"kind": kind, "key": key, "barcodes": barcodes}
+                changed += 1
+            current[name] = stored
+        if changed or current.keys() != self.sources.keys():
+            self.sources = current
+            self._save()
+        self._barcodes = {CASES: set(), RUNS: set()}
+        for stored in self.sources.values():
+            self._barcodes[stored["kind"]].update(stored["barcodes"])
+        return changed
+
+    def case_barcodes(self) -> set:
+        """Barcodes that already have a test case."""
+        return self._barcodes[CASES]
+
+    def barcodes(self) -> set:
+        """Every known barcode: test cases and products evaluated in a run."""
+        return self._barcodes[CASES] | self._barcodes[RUNS]
+
+    def __contains__(self, barcode) -> bool:
+        barcode = str(barcode)
+        return barcode in self._barcodes[CASES] or barcode in self._barcodes[RUNS]
+
+    def __len__(self) -> int:
+        return len(self.barcodes())
+
+
+_index = None
+
+
+def get_barcode_index() -> BarcodeIndex:
+    """The shared index, refreshed against the source files on every call."""
+    global _index
+    if _index is None:
+        _index = BarcodeIndex()
+    _index.refresh()
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Known barcodes of test cases and run products")
+    parser.add_argument("command", choices=("status", "check", "rebuild"))
+    parser.add_argument("barcodes", nargs="*", help="Barcodes to look up (check)")
+    args = parser.parse_args()
+
+    if args.command == "rebuild" and BARCODE_INDEX_FILE.exists():
+        BARCODE_INDEX_FILE.unlink()
+    index = BarcodeIndex()
+    changed = index.refresh()
+
+    if args.command == "check":
+        if not args.barcodes:
+            parser.error("check needs at least one barcode")
+        for barcode in args.barcodes:
+            if barcode in index.case_barcodes():
+                state = "test case"
+            elif barcode in index:
+                state = "evaluated in a run"
+            else:
+                state = "unknown"
+            print(f"{barcode:<16} {state}")
+        return
+
+    print(f"Re-read {changed} of {len(index.sources)} source files")
+    print(f"{len(index.case_barcodes())} barcodes with a test case, {len(index)} known in total")
+
+
+if __name__ == "__main__":
+    main()
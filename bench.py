@@ -0,0 +1,290 @@
+"""
+Benchmarks for the protein matcher and the evaluation pipeline
+
+Times the hot paths of the training tools and compares them with a saved
+baseline, failing when anything got slower than the allowed threshold:
+
+    matcher_build      building the keyword automaton (grows with the keyword table)
+    matcher_corpus     find_matches over every test case
+    matcher_ocr        find_matches over long synthetic OCR-style texts
+    matcher_batch      find_matches_batch over the test cases + run folders
+    evaluator_native   the native evaluator over every test case
+    engine_corpus      protein_engine.analyze (the analyzeProteinQuality port) over every test case
+    fetcher_stub       CategoryFetcher against a local stub OpenFoodFacts server
+
+The baseline (bench_baseline.json) is machine-local and not committed:
+timings only compare on the machine they were taken on. Benchmarks missing
+from it, e.g. on the first run, are recorded instead of compared.
+
+Usage:
+    python bench.py                           # run everything, compare with bench_baseline.json
+    python bench.py --save-baseline           # record the current numbers as the baseline
+    python bench.py --only matcher_corpus,matcher_ocr --threshold 0.1
+    python bench.py -o results.json           # also keep the full results
+
+Exits with status 1 when a benchmark's best time exceeds the baseline's by
+more than --threshold (default 25%). The best of many rounds is compared
+rather than the median, since it is far less sensitive to a busy machine.
+The process-wide normalization cache is cleared before every round, so each
+round normalizes its texts again instead of timing cache hits.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from corpus import iter_corpus, iter_test_cases
+from normalization import get_normalizer
+from test_fixes import PROTEIN_BASE_KEYWORDS, PROTEIN_KEYWORDS, KeywordMatcher, find_matches_batch
+
+PROJECT_ROOT = Path(__file__).parent
+BASELINE_FILE = PROJECT_ROOT / "bench_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+
+OCR_SEED = 1234
+OCR_TEXTS = 40
+OCR_TEXT_CHARS = 20_000
+
+
+def cold_start():
+    """Untimed per-round reset: drop the memoized normalizations shared by the matcher and the engine."""
+    get_normalizer().clear()
+
+
+def measure(fn, rounds=5, min_time=0.5, setup=cold_start) -> dict:
+    """Call fn() repeatedly (at least `rounds` times and `min_time` seconds); median and best seconds.
+
+    setup() runs before every call, outside the timing.
+    """
+    setup()
+    fn()  # warm-up: imports, lazily built matchers
+    times = []
+    start = time.perf_counter()
+    while len(times) < rounds or time.perf_counter() - start < min_time:
+        setup()
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return {"seconds": statistics.median(times), "best": min(times), "rounds": len(times)}
+
+
+def _throughput(result: dict, texts: list) -> dict:
+    size_mb = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    result["texts"] = len(texts)
+    result["texts_per_s"] = round(len(texts) / result["seconds"], 1)
+    result["mb_per_s"] = round(size_mb / result["seconds"], 3)
+    return result
+
+
+def ocr_texts(count=OCR_TEXTS, chars=OCR_TEXT_CHARS, seed=OCR_SEED) -> list:
+    """Long, noisy ingredient texts: keywords, filler words, OCR confusions, broken lines."""
+    rng = random.Random(seed)
+    keywords = [k for ks in PROTEIN_KEYWORDS.values() for k in ks] + list(PROTEIN_BASE_KEYWORDS)
+    filler = ["sugar", "salt", "water", "glucose syrup", "emulsifier", "lecithins", "may contain traces of",
+              "aroma", "E330", "vegetable oil", "starch", "spuren von", "peut contenir", "acidity regulator"]
+    confusions = {"o": "0", "l": "1", "e": "c", "i": "l"}
+    texts = []
+    for _ in range(count):
+        parts, size = [], 0
+        while size < chars:
+            word = rng.choice(keywords) if rng.random() < 0.3 else rng.choice(filler)
+            if rng.random() < 0.1:
+                word = "".join(confusions.get(c, c) if rng.random() < 0.3 else c for c in word)
+            if rng.random() < 0.05:
+                cut = rng.randrange(1, max(2, len(word)))
+                word = word[:cut] + "-\n" + word[cut:]
+            if rng.random() < 0.2:
+                word = word.upper()
+            parts.append(word)
+            size += len(word) + 2
+        texts.append(rng.choice([", ", "; ", " , "]).join(parts))
+    return texts
+
+
+# --- benchmarks ---------------------------------------------------------------
+
+def bench_matcher_build(args) -> dict:
+    result = measure(lambda: KeywordMatcher(PROTEIN_KEYWORDS, PROTEIN_BASE_KEYWORDS), args.rounds)
+    result["keywords"] = sum(len(k) for k in PROTEIN_KEYWORDS.values()) + len(PROTEIN_BASE_KEYWORDS)
+    return result
+
+
+def bench_matcher_corpus(args) -> dict:
+    matcher = KeywordMatcher(PROTEIN_KEYWORDS, PROTEIN_BASE_KEYWORDS)
+    texts = [r["ingredients"] for r in iter_test_cases()]
+    return _throughput(measure(lambda: [matcher.find_matches(t) for t in texts], args.rounds), texts)
+
+
+def bench_matcher_ocr(args) -> dict:
+    matcher = KeywordMatcher(PROTEIN_KEYWORDS, PROTEIN_BASE_KEYWORDS)
+    texts = ocr_texts()
+    return _throughput(measure(lambda: [matcher.find_matches(t) for t in texts], args.rounds), texts)
+
+
+def bench_matcher_batch(args) -> dict:
+    texts = [r["ingredients"] for r in iter_corpus()]
+    # A fresh matcher per round (and a cleared normalization cache), so the batch memo starts empty every time
+    run = lambda: list(find_matches_batch(texts, KeywordMatcher(PROTEIN_KEYWORDS, PROTEIN_BASE_KEYWORDS)))  # noqa: E731
+    return _throughput(measure(run, args.rounds), texts)
+
+
+def bench_evaluator_native(args) -> dict:
+    from evaluator import load_test_cases, run_native_tests
+    test_cases = load_test_cases()
+    result = measure(lambda: run_native_tests(test_cases), args.rounds)
+    result["cases"] = len(test_cases)
+    result["cases_per_s"] = round(len(test_cases) / result["seconds"], 1)
+    return result
+
+
+def bench_engine_corpus(args) -> dict:
+    from protein_engine import ProteinEngine
+    engine = ProteinEngine()
+    texts = [r["ingredients"] for r in iter_test_cases()]
+    return _throughput(measure(lambda: [engine.analyze(t) for t in texts], args.rounds), texts)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Minimal OpenFoodFacts search endpoint: page_size products per category, no latency."""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        category = query.get("tag_0", ["random"])[0]
+        page_size = int(query.get("page_size", ["15"])[0])
+        products = [{"code": f"{category}-{i}", "product_name": f"Product {i}", "brands": "Stub",
+                     "ingredients_text": "water, pea protein isolate, sunflower oil, salt, soy lecithin"}
+                    for i in range(page_size)]
+        body = json.dumps({"products": products}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_fetcher_stub(args) -> dict:
+    from off_fetcher import CategoryFetcher
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/cgi/search.pl"
+    categories = [f"en:stub-{i}" for i in range(40)]
+
+    def run():
+        fetcher = CategoryFetcher(url, concurrency=8, rate=10_000)
+        return asyncio.run(fetcher.fetch(categories, target=500, page_size=15))
+
+    try:
+        products = len(run())
+        result = measure(run, args.rounds)
+    finally:
+        server.shutdown()
+        server.server_close()
+    result["products"] = products
+    result["products_per_s"] = round(products / result["seconds"], 1)
+    return result
+
+
+BENCHMARKS = {
+    "matcher_build": bench_matcher_build,
+    "matcher_corpus": bench_matcher_corpus,
+    "matcher_ocr": bench_matcher_ocr,
+    "matcher_batch": bench_matcher_batch,
+    "evaluator_native": bench_evaluator_native,
+    "engine_corpus": bench_engine_corpus,
+    "fetcher_stub": bench_fetcher_stub,
+}
+
+
+# --- baseline comparison ------------------------------------------------------
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """(name, baseline best seconds, current best seconds, ratio) for every benchmark slower than allowed."""
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        old = baseline.get("benchmarks", {}).get(name)
+        if not old:
+            continue
+        ratio = result["best"] / old["best"]
+        if ratio > 1 + threshold:
+            regressions.append((name, old["best"], result["best"], ratio))
+    return regressions
+
+
+def run_benchmarks(names, args) -> dict:
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": {},
+    }
+    for name in names:
+        result = BENCHMARKS[name](args)
+        results["benchmarks"][name] = result
+        extra = ", ".join(f"{k}={v}" for k, v in result.items() if k not in ("seconds", "best", "rounds"))
+        print(f"{name:<18} {result['seconds'] * 1000:10.2f} ms  (best {result['best'] * 1000:.2f} ms, "
+              f"{result['rounds']} rounds)  {extra}", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the protein matcher and evaluation pipeline")
+    parser.add_argument("--only", help="Comma-separated benchmarks to run: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--rounds", type=int, default=5, help="Minimum timed rounds per benchmark")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE), help="Baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("-o", "--output", help="Write the results JSON to this file")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = run_benchmarks(names, args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    baseline_path = Path(args.baseline)
+    baseline = {"benchmarks": {}}
+    if baseline_path.exists():
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    recorded = [name for name in names if args.save_baseline or name not in baseline.get("benchmarks", {})]
+    if recorded:
+        # --only runs update their own entries and keep the others
+        baseline = {**baseline, **{k: v for k, v in results.items() if k != "benchmarks"},
+                    "benchmarks": {**baseline.get("benchmarks", {}),
+                                   **{name: results["benchmarks"][name] for name in recorded}}}
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Recorded {', '.join(recorded)} as the baseline in {baseline_path}")
+    if args.save_baseline:
+        return
+
+    regressions = compare({"benchmarks": {n: r for n, r in results["benchmarks"].items() if n not in recorded}},
+                          baseline, args.threshold)
+    for name, old, new, ratio in regressions:
+        print(f"REGRESSION {name}: {old * 1000:.2f} ms -> {new * 1000:.2f} ms ({(ratio - 1) * 100:+.0f}%)")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%} against {baseline_path.name}")
+
+
+if __name__ == "__main__":
+    main()
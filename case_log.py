@@ -0,0 +1,262 @@
+"""
+Append-only test case log
+
+New test cases are appended as single JSON lines to a log next to
+protein_test_cases.json instead of rewriting the whole pretty-printed file
+for every insert. Appends take an exclusive file lock, so several training
+loops can add cases at the same time. An id index over the canonical file is
+persisted, so duplicate checks do not re-parse protein_test_cases.json.
+
+compact() applies the log to the canonical JSON that the Kotlin
+ProteinDetectionTest.loadTestCases reads (atomic replace), then empties the
+log. Gradle runs compact first; the native evaluator merges the log in memory.
+
+Log lines:
+    {"op": "add", "case": {...}}    # skipped if the id already exists
+    {"op": "put", "case": {...}}    # replaces every case with that id
+
+Agents record cases with `put` instead of editing the canonical JSON: a
+hand edit takes no lock and is lost when compact() replaces the file.
+
+Usage:
+    python case_log.py status
+    python case_log.py compact
+    python case_log.py put case.json        # or a JSON string, or - for stdin
+"""
+
+import json
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+PROJECT_ROOT = Path(__file__).parent
+TEST_CASES_FILE = PROJECT_ROOT / "app/src/test/resources/protein_test_cases.json"
+CASE_LOG_FILE = PROJECT_ROOT / "app/src/test/resources/protein_test_cases.log.jsonl"
+CASE_INDEX_FILE = PROJECT_ROOT / ".case_index.json"
+
+EMPTY_TEST_CASES = {"description": "Test cases for protein detection", "version": "1.0", "test_cases": []}
+
+
+def _stat_key(path: Path):
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Exclusive advisory lock on `path` (created if missing), held for the with block."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if sys.platform == "win32":
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10s; keep waiting
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def apply_entry(cases: list, entry: dict, ids: set) -> bool:
+    """Apply one log entry to a case list in place; returns False for a skipped add."""
+    case = entry["case"]
+    if entry.get("op") == "put":
+        cases[:] = [tc for tc in cases if tc.get("id") != case["id"]]
+    elif case["id"] in ids:
+        return False
+    cases.append(case)
+    ids.add(case["id"])
+    return True
+
+
+class CaseLog:
+    """Append-only case log layered over the canonical protein_test_cases.json."""
+
+    def __init__(self, canonical=TEST_CASES_FILE, log=CASE_LOG_FILE, index=CASE_INDEX_FILE):
+        self.canonical = Path(canonical)
+        self.log = Path(log)
+        self.index = Path(index)
+        self.lock_file = self.log.with_name(self.log.name + ".lock")
+        self._canonical_ids = (None, set())
+
+    # --- reading ------------------------------------------------------------
+
+    def load_canonical(self) -> dict:
+        if not self.canonical.exists():
+            return json.loads(json.dumps(EMPTY_TEST_CASES))
+        with open(self.canonical, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def entries(self) -> list:
+        """Log entries in append order; a torn last line from a crash is ignored."""
+        if not self.log.exists():
+            return []
+        entries = []
+        with open(self.log, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+        return entries
+
+    def canonical_ids(self) -> set:
+        """Ids in the canonical file, from the persisted index while the file is unchanged."""
+        key = _stat_key(self.canonical)
+        if self._canonical_ids[0] == key and key is not None:
+            return self._canonical_ids[1]
+        ids = None
+        if self.index.exists():
+            try:
+                with open(self.index, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                if stored.get("canonical") == key:
+                    ids = set(stored["ids"])
+            except (OSError, ValueError, KeyError):
+                pass
+        if ids is None:
+            ids = {tc["id"] for tc in self.load_canonical().get("test_cases", [])}
+            self._write_index(key, ids)
+        self._canonical_ids = (key, ids)
+        return ids
+
+    def _write_index(self, key, ids):
+        tmp = self.index.with_name(self.index.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"canonical": key, "ids": sorted(ids)}, f)
+        os.replace(tmp, self.index)
+
+    def ids(self) -> set:
+        ids = set(self.canonical_ids())
+        ids.update(entry["case"]["id"] for entry in self.entries())
+        return ids
+
+    def contains(self, case_id: str) -> bool:
+        if case_id in self.canonical_ids():
+            return True
+        return any(entry["case"]["id"] == case_id for entry in self.entries())
+
+    def merged(self) -> dict:
+        """Canonical test case data with the pending log applied (nothing is written)."""
+        data = self.load_canonical()
+        cases = data.setdefault("test_cases", [])
+        ids = {tc["id"] for tc in cases}
+        for entry in self.entries():
+            apply_entry(cases, entry, ids)
+        return data
+
+    # --- writing ------------------------------------------------------------
+
+    def _append(self, op: str, test_case: dict):
+        line = json.dumps({"op": op, "case": test_case}, ensure_ascii=False) + "\n"
+        with open(self.log, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def add(self, test_case: dict) -> bool:
+        """Append a new case; returns False (and writes nothing) if the id already exists."""
+        with file_lock(self.lock_file):
+            if self.contains(test_case["id"]):
+                return False
+            self._append("add", test_case)
+        return True
+
+    def put(self, test_case: dict):
+        """Append a case that replaces any existing case with the same id."""
+        with file_lock(self.lock_file):
+            self._append("put", test_case)
+
+    def pending(self) -> int:
+        return len(self.entries())
+
+    def compact(self) -> int:
+        """Fold the log into the canonical JSON; returns the number of entries applied."""
+        if not self.log.exists() or self.log.stat().st_size == 0:
+            return 0
+        with file_lock(self.lock_file):
+            entries = self.entries()
+            if not entries:
+                return 0
+            data = self.merged()
+            tmp = self.canonical.with_name(self.canonical.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.canonical)
+            ids = {tc["id"] for tc in data["test_cases"]}
+            key = _stat_key(self.canonical)
+            self._write_index(key, ids)
+            self._canonical_ids = (key, ids)
+            self.log.write_bytes(b"")
+        return len(entries)
+
+
+_shared_log = None
+
+
+def get_case_log() -> CaseLog:
+    global _shared_log
+    if _shared_log is None:
+        _shared_log = CaseLog()
+    return _shared_log
+
+
+def load_cases(path=TEST_CASES_FILE) -> list:
+    """Test cases of `path`, including pending log entries when it is the canonical file."""
+    log = get_case_log()
+    if Path(path) == log.canonical:
+        return log.merged().get("test_cases", [])
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("test_cases", [])
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    log = get_case_log()
+    if command == "compact":
+        print(f"Compacted {log.compact()} log entries into {log.canonical}")
+    elif command == "status":
+        print(f"{len(log.canonical_ids())} cases in {log.canonical.name}, {log.pending()} pending in {log.log.name}")
+    elif command == "put":
+        source = sys.argv[2] if len(sys.argv) > 2 else "-"
+        if source == "-":
+            text = sys.stdin.read()
+        elif Path(source).is_file():
+            text = Path(source).read_text(encoding="utf-8")
+        else:
+            text = source
+        try:
+            test_case = json.loads(text)
+        except ValueError as e:
+            print(f"Invalid test case JSON: {e}", file=sys.stderr)
+            sys.exit(1)
+        missing = [key for key in ("id", "ingredients", "expected_detected", "expected_not_detected")
+                   if key not in test_case]
+        if missing:
+            print(f"Test case is missing {', '.join(missing)}", file=sys.stderr)
+            sys.exit(1)
+        log.put(test_case)
+        print(f"Recorded {test_case['id']} in {log.log.name} (folded into {log.canonical.name} before the next test run)")
+    else:
+        print(f"Unknown command: {command} (use status, compact or put)", file=sys.stderr)
+        sys.exit(1)
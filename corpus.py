@@ -0,0 +1,93 @@
+"""
+Corpus readers for the protein detection tooling
+
+Streams ingredient texts from protein_test_cases.json, run folders
+(runs*/*/products.ndjson[.gz|.zst] or legacy products.json) and JSONL dumps as uniform records:
+
+    {"id": ..., "ingredients": ..., "origin": <file the record came from>}
+"""
+
+import gzip
+import json
+from pathlib import Path
+
+from run_products import is_products_file, iter_products, resolve, run_products_files
+
+PROJECT_ROOT = Path(__file__).parent
+TEST_CASES_FILE = PROJECT_ROOT / "app/src/test/resources/protein_test_cases.json"
+RUN_ROOTS = [PROJECT_ROOT / "runs", PROJECT_ROOT / "runs_archived"]
+
+
+def open_text(path):
+    """Open a (possibly gzip-compressed) text file for reading."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_test_cases(path=TEST_CASES_FILE):
+    """Yield the cases of a protein_test_cases.json file (with pending case-log entries)."""
+    from case_log import load_cases
+    for tc in load_cases(path):
+        yield {"id": tc["id"], "ingredients": tc.get("ingredients", ""), "origin": str(path)}
+
+
+def iter_run_products(path):
+    """Yield the products of a run folder or its products file."""
+    path = resolve(path)
+    run_id = path.parent.name
+    for product in iter_products(path):
+        yield {
+            "id": f"{run_id}/{product.get('barcode', 'unknown')}",
+            "ingredients": product.get("ingredients", ""),
+            "origin": str(path),
+        }
+
+
+def iter_jsonl(path):
+    """Yield records of a JSONL dump (OFF export lines, test cases or products)."""
+    with open_text(path) as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            text = record.get("ingredients")
+            if text is None:
+                text = record.get("ingredients_text", "")
+            record_id = record.get("id") or record.get("barcode") or record.get("code") or f"line_{line_no}"
+            yield {"id": str(record_id), "ingredients": text or "", "origin": str(path)}
+
+
+def run_product_files(roots=None):
+    """The products file of every runs*/* folder, sorted for a stable corpus order."""
+    return run_products_files(roots or RUN_ROOTS)
+
+
+def default_sources():
+    """The corpus the training tools replay: all test cases plus every run folder."""
+    return [TEST_CASES_FILE] + run_product_files()
+
+
+def iter_source(path):
+    """Dispatch a single source path to the matching reader."""
+    path = Path(path)
+    if path.is_dir():
+        try:
+            yield from iter_run_products(path)
+        except FileNotFoundError:
+            for products_file in run_products_files([path]):
+                yield from iter_run_products(products_file)
+    elif is_products_file(path):
+        yield from iter_run_products(path)
+    elif path.name.endswith((".jsonl", ".jsonl.gz", ".ndjson", ".ndjson.gz")):
+        yield from iter_jsonl(path)
+    else:
+        yield from iter_test_cases(path)
+
+
+def iter_corpus(paths=None):
+    """Yield records from every source in order (default_sources() if none given)."""
+    for path in paths or default_sources():
+        yield from iter_source(path)
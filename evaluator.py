@@ -2,39 +2,41 @@
 Evaluator for Ralph Wiggum Loop - Protein Detection Training
 
 Runs the gradle test suite and reports pass/fail status.
+
+With --native the cases in protein_test_cases.json are checked in-process
+instead, without starting Gradle or a JVM: by default with protein_engine.py
+(the Python port of analyzeProteinQuality), or with --detector matcher
+against the keyword matcher in test_fixes.py.
+--incremental additionally caches per-case results on disk and only
+re-checks cases touched by a keyword-table or test-case change.
+--json prints the native counts and failing case keys as one JSON object
+(train_parallel.py verifies worker workspaces with it).
 """
 
-import subprocess
+import argparse
+import hashlib
+import json
+import os
 import sys
 import re
+import time
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent
+TEST_CASES_FILE = PROJECT_ROOT / "app/src/test/resources/protein_test_cases.json"
+EVAL_CACHE_FILE = PROJECT_ROOT / ".eval_cache.json"
+
+# (path, mtime_ns, log mtime_ns) -> parsed test cases, so repeated evaluations skip the JSON parse
+_test_case_cache = {}
 
 
 def run_tests() -> tuple[bool, str]:
-    """Run gradle tests and return (success, output)."""
-    try:
-        result = subprocess.run(
-            ["powershell.exe", "-Command", ".\\gradlew.bat :app:testDebugUnitTest 2>&1"],
-            cwd=PROJECT_ROOT,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-
-        output = result.stdout + result.stderr
-
-        # Check for success
-        if "BUILD SUCCESSFUL" in output:
-            return True, output
-        else:
-            return False, output
+    """Run gradle tests on the shared warm daemon and return (success, output).
 
-    except subprocess.TimeoutExpired:
-        return False, "ERROR: Test timeout (5 minutes exceeded)"
-    except Exception as e:
-        return False, f"ERROR: {str(e)}"
+    Failure lines are printed while the run is still in progress.
+    """
+    from gradle_runner import get_runner
+    return get_runner().run()
 
 
 def extract_test_count(output: str) -> tuple[int, int]:
@@ -46,13 +48,271 @@ def extract_test_count(output: str) -> tuple[int, int]:
     return 0, 0
 
 
+def load_test_cases(path=TEST_CASES_FILE) -> list:
+    """Load the test cases (plus pending case-log entries) once; reloaded only when a file changes."""
+    from case_log import CASE_LOG_FILE, load_cases
+    path = Path(path)
+    log_mtime = CASE_LOG_FILE.stat().st_mtime_ns if CASE_LOG_FILE.exists() else None
+    key = (str(path), path.stat().st_mtime_ns, log_mtime)
+    if key not in _test_case_cache:
+        _test_case_cache.clear()
+        _test_case_cache[key] = load_cases(path)
+    return _test_case_cache[key]
+
+
+def _names_match(a: str, b: str) -> bool:
+    """Same loose name comparison as ProteinDetectionTest (contains, ignoring case)."""
+    a, b = a.lower(), b.lower()
+    return a in b or b in a
+
+
+def python_detect(ingredients: str) -> list:
+    """Protein names detected by the Python matcher in test_fixes.py."""
+    from test_fixes import find_matches
+    return [name for name, _ in find_matches(ingredients)]
+
+
+def engine_detect(ingredients: str) -> list:
+    """Protein names detected by the protein_engine.py port of analyzeProteinQuality."""
+    from protein_engine import detect
+    return detect(ingredients)
+
+
+def check_case(test_case: dict, detected: list) -> dict:
+    """Compare detections with a case's expectations, mirroring ProteinDetectionTest.runTestCase."""
+    expected = test_case.get("expected_detected", [])
+    not_expected = test_case.get("expected_not_detected", [])
+    missing = [e for e in expected if not any(_names_match(d, e) for d in detected)]
+    wrongly_detected = [n for n in not_expected if any(_names_match(d, n) for d in detected)]
+    unexpected = [d for d in detected if not any(_names_match(d, e) for e in expected)]
+    return {
+        "id": test_case["id"],
+        "name": test_case.get("name", ""),
+        "passed": not missing and not wrongly_detected,
+        "detected": detected,
+        "missing": missing,
+        "wrongly_detected": wrongly_detected,
+        "unexpected": unexpected,
+    }
+
+
+def run_native_tests(test_cases=None, detect=python_detect) -> list:
+    """Evaluate test cases in-process and return one result dict per case."""
+    if test_cases is None:
+        test_cases = load_test_cases()
+    return [check_case(tc, detect(tc.get("ingredients", ""))) for tc in test_cases]
+
+
+def _digest(obj) -> str:
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def python_keyword_table() -> dict:
+    """Keyword table behind python_detect, in the form the incremental cache fingerprints."""
+    from test_fixes import PROTEIN_KEYWORDS, PROTEIN_BASE_KEYWORDS
+    return {
+        "proteins": {name: list(kws) for name, kws in PROTEIN_KEYWORDS.items()},
+        "base": sorted(PROTEIN_BASE_KEYWORDS),
+    }
+
+
+# Code every detector depends on: text normalization and loading/parsing the shared data table
+SHARED_DETECTOR_FILES = ("normalization.py", "protein_data.py", "protein_sources.py")
+
+
+def _rules_version(*files) -> str:
+    from protein_data import load_data, rules_digest
+    files = files + tuple(PROJECT_ROOT / name for name in SHARED_DETECTOR_FILES)
+    digest = hashlib.sha1(b"".join(Path(p).read_bytes() for p in files))
+    digest.update(rules_digest(load_data()).encode("ascii"))
+    return digest.hexdigest()
+
+
+def python_detector_version() -> str:
+    """Changes whenever the matching rules themselves (code or shared rule lists, not keywords) change."""
+    return _rules_version(PROJECT_ROOT / "test_fixes.py", __file__)
+
+
+def engine_keyword_table() -> dict:
+    """Keyword table behind engine_detect (the proteinSources table, in order)."""
+    from protein_engine import PROTEIN_BASE_KEYWORDS, get_engine
+    return {
+        "proteins": {source["name"]: list(source["keywords"]) for source in get_engine().sources},
+        "base": sorted(PROTEIN_BASE_KEYWORDS),
+    }
+
+
+def engine_detector_version() -> str:
+    """Changes whenever the engine's rules change."""
+    return _rules_version(PROJECT_ROOT / "protein_engine.py", __file__)
+
+
+# name -> (detect, keyword table, detector version) for the native evaluation
+DETECTORS = {
+    "engine": (engine_detect, engine_keyword_table, engine_detector_version),
+    "matcher": (python_detect, python_keyword_table, python_detector_version),
+}
+
+
+def touched_keywords(old_table: dict, new_table: dict) -> set:
+    """Keywords whose presence in a text could change the detection result.
+
+    Any change to a protein's keyword list (added, removed or reordered
+    keywords, or a new/removed protein) touches every keyword it had before or
+    has now; base-keyword changes touch those base keywords.
+    """
+    touched = set()
+    old_proteins, new_proteins = old_table.get("proteins", {}), new_table.get("proteins", {})
+    for name in set(old_proteins) | set(new_proteins):
+        old_kws, new_kws = old_proteins.get(name, []), new_proteins.get(name, [])
+        if old_kws != new_kws:
+            touched.update(old_kws)
+            touched.update(new_kws)
+    touched.update(set(old_table.get("base", [])) ^ set(new_table.get("base", [])))
+    return {kw.lower() for kw in touched if kw}
+
+
+def mentions_keyword(ingredients: str, keywords) -> bool:
+    """Whether any keyword occurs in a text as the detectors scan it.
+
+    The matcher scans the lowercased text, the engine the normalized one
+    (markdown stripped, whitespace collapsed, text before the ingredient
+    marker cut), where "soy_ protein" becomes "soy protein".
+    """
+    from normalization import normalize
+    normalized = normalize(ingredients)
+    return any(kw in normalized.lower or kw in normalized.text for kw in keywords)
+
+
+def run_incremental_tests(test_cases=None, detect=python_detect, keyword_table=None,
+                          detector_version=None, cache_file=EVAL_CACHE_FILE) -> tuple[list, int]:
+    """Like run_native_tests(), reusing cached results for cases no change can affect.
+
+    A case is re-checked when it is new, its content changed, or its
+    ingredients contain a keyword touched since the cached run
+    (mentions_keyword). A changed detector version invalidates the whole
+    cache. Returns (results, number of cases actually re-evaluated).
+    """
+    if test_cases is None:
+        test_cases = load_test_cases()
+    if keyword_table is None:
+        keyword_table = python_keyword_table()
+    if detector_version is None:
+        detector_version = python_detector_version()
+
+    cache = {}
+    cache_path = Path(cache_file)
+    if cache_path.exists():
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+
+    if cache.get("detector_version") == detector_version:
+        touched = touched_keywords(cache.get("keyword_table", {}), keyword_table)
+        cached_cases = cache.get("cases", {})
+    else:
+        touched = set()
+        cached_cases = {}
+
+    # Keyed by case content rather than id: the file has duplicate ids
+    results = []
+    new_cases = {}
+    reevaluated = 0
+    for tc in test_cases:
+        case_hash = _digest(tc)
+        ingredients = tc.get("ingredients", "")
+        result = new_cases.get(case_hash) or cached_cases.get(case_hash)
+        if result is None or (touched and case_hash not in new_cases and
+                              mentions_keyword(ingredients, touched)):
+            result = check_case(tc, detect(ingredients))
+            reevaluated += 1
+        new_cases[case_hash] = result
+        results.append(result)
+
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "detector_version": detector_version,
+            "keyword_table": keyword_table,
+            "cases": new_cases,
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+    return results, reevaluated
+
+
+def result_keys(results: list) -> list:
+    """One key per result: the case id, "<id>#2" for the second copy of a duplicate id (as in test_results)."""
+    copies = {}
+    keys = []
+    for r in results:
+        copies[r["id"]] = copies.get(r["id"], 0) + 1
+        keys.append(r["id"] if copies[r["id"]] == 1 else f"{r['id']}#{copies[r['id']]}")
+    return keys
+
+
+def count_results(results: list) -> tuple[int, int]:
+    """(passed, failed) counts of run_native_tests() results."""
+    passed = sum(1 for r in results if r["passed"])
+    return passed, len(results) - passed
+
+
+def evaluate_native(incremental=False, detector="engine"):
+    """Run the in-process evaluation and print results."""
+    detect, keyword_table, detector_version = DETECTORS[detector]
+    print(f"Running protein detection tests (native, {detector})...")
+    print("-" * 50)
+
+    start = time.perf_counter()
+    if incremental:
+        # The detector is part of the version, so switching detectors never reuses cached results
+        results, reevaluated = run_incremental_tests(detect=detect, keyword_table=keyword_table(),
+                                                     detector_version=f"{detector}:{detector_version()}")
+    else:
+        results = run_native_tests(detect=detect)
+        reevaluated = len(results)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    passed, failed = count_results(results)
+
+    print(f"\nResults:")
+    print(f"  Tests passed: {passed}")
+    print(f"  Tests failed: {failed}")
+    print(f"  Re-evaluated: {reevaluated} of {len(results)}")
+    print(f"  Time: {elapsed_ms:.1f} ms")
+    print(f"  Overall: {'SUCCESS' if failed == 0 else 'FAIL'}")
+
+    if failed:
+        print("\nError details:")
+        for r in results:
+            if r["passed"]:
+                continue
+            details = []
+            if r["missing"]:
+                details.append(f"missing [{', '.join(r['missing'])}]")
+            if r["wrongly_detected"]:
+                details.append(f"wrongly detected [{', '.join(r['wrongly_detected'])}]")
+            print(f"  {r['id']}: {' '.join(details)}")
+
+    return failed == 0
+
+
 def evaluate():
     """Run evaluation and print results."""
+    from test_results import load_results
+
     print("Running protein detection tests...")
     print("-" * 50)
 
+    started = time.time()
     success, output = run_tests()
-    passed, failed = extract_test_count(output)
+    # Prefer the reports written by this run; scrape the console only as a fallback
+    results = load_results(since=started)
+    if results is not None:
+        passed, failed = results["passed"], results["failed"]
+    else:
+        passed, failed = extract_test_count(output)
 
     print(f"\nResults:")
     print(f"  Tests passed: {passed}")
@@ -60,15 +320,45 @@ def evaluate():
     print(f"  Overall: {'SUCCESS' if success else 'FAIL'}")
 
     if not success:
-        # Print relevant error lines
         print("\nError details:")
-        for line in output.split('\n'):
-            if 'FAILED' in line or 'AssertionError' in line or 'expected' in line.lower():
-                print(f"  {line.strip()}")
+        if results is not None and results["cases"]:
+            for case in results["cases"]:
+                if case["passed"]:
+                    continue
+                details = []
+                if case["missing"]:
+                    details.append(f"missing [{', '.join(case['missing'])}]")
+                if case["wrongly_detected"]:
+                    details.append(f"wrongly detected [{', '.join(case['wrongly_detected'])}]")
+                print(f"  {case['key']}: {' '.join(details)}")
+        else:
+            # Print relevant error lines
+            for line in output.split('\n'):
+                if 'FAILED' in line or 'AssertionError' in line or 'expected' in line.lower():
+                    print(f"  {line.strip()}")
 
     return success
 
 
 if __name__ == "__main__":
-    success = evaluate()
+    parser = argparse.ArgumentParser(description="Evaluate protein detection against the test cases")
+    parser.add_argument("--native", action="store_true", help="Check the cases in-process (no Gradle)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Native mode, re-checking only cases affected since the last run (implies --native)")
+    parser.add_argument("--detector", choices=sorted(DETECTORS), default="engine",
+                        help="Native detector: the analyzeProteinQuality port (default) or the test_fixes matcher")
+    parser.add_argument("--json", action="store_true",
+                        help="Native mode: print passed/failed counts and the failing case keys as JSON")
+    args = parser.parse_args()
+
+    if args.json:
+        results = run_native_tests(detect=DETECTORS[args.detector][0])
+        passed, failed = count_results(results)
+        failing = [key for key, r in zip(result_keys(results), results) if not r["passed"]]
+        print(json.dumps({"passed": passed, "failed": failed, "failing": failing}))
+        success = failed == 0
+    elif args.native or args.incremental:
+        success = evaluate_native(incremental=args.incremental, detector=args.detector)
+    else:
+        success = evaluate()
     sys.exit(0 if success else 1)
@@ -0,0 +1,184 @@
+"""
+Warm Gradle test runner for the training loops
+
+Keeps one Gradle daemon alive for the whole training session and submits
+every test run to it, streaming the output line by line instead of buffering
+it until the build finishes. A failing case is reported as soon as Gradle
+prints it.
+
+Usage:
+    with GradleTestRunner() as runner:      # starts + warms the daemon (a failed compile
+                                            # is reported by the first run())
+        success, output = runner.run()      # repeat as often as needed
+
+    python gradle_runner.py                 # compact the case log, run the tests once
+                                            # (the daemon stays up for the next call)
+"""
+
+import platform
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+TEST_TASK = ":app:testDebugUnitTest"
+
+# Lines worth surfacing immediately while a run is still in progress
+FAILURE_MARKERS = ("[FAIL]", "FAILED", "AssertionError", "MISSING:", "WRONGLY DETECTED:")
+
+
+def _is_wsl() -> bool:
+    return sys.platform.startswith("linux") and "microsoft" in platform.uname().release.lower()
+
+
+def gradle_wrapper(project_dir=PROJECT_ROOT) -> list:
+    """Command prefix that invokes the Gradle wrapper on this platform."""
+    if sys.platform == "win32":
+        return [str(Path(project_dir) / "gradlew.bat")]
+    if _is_wsl():
+        # gradle.properties pins a Windows JDK, so WSL goes through the Windows wrapper
+        return ["powershell.exe", "-Command", ".\\gradlew.bat"]
+    return [str(Path(project_dir) / "gradlew")]
+
+
+def print_failures(line: str):
+    """Default on_line callback: echo failure lines the moment they arrive."""
+    if any(marker in line for marker in FAILURE_MARKERS):
+        print(f"  {line.rstrip()}", flush=True)
+
+
+class GradleTestRunner:
+    """Submits test runs to one long-lived Gradle daemon."""
+
+    def __init__(self, project_dir=PROJECT_ROOT, task=TEST_TASK, timeout=300, on_line=print_failures):
+        self.project_dir = Path(project_dir)
+        self.task = task
+        self.timeout = timeout
+        self.on_line = on_line
+        # started: the test sources compiled on the warm daemon; daemon: a daemon was launched (stop() ends it)
+        self.started = False
+        self.daemon = False
+
+    def _command(self, *args) -> list:
+        # --daemon forces daemon reuse even where it was disabled (e.g. CI env vars)
+        return gradle_wrapper(self.project_dir) + ["--daemon", "--console=plain", *args]
+
+    def _stream(self, args, on_line=None, banner=True) -> tuple[bool, str]:
+        """Run one Gradle invocation, feeding each output line to on_line as it arrives.
+
+        Success is exit code 0 plus "BUILD SUCCESSFUL" in the output; with
+        banner=False (quiet builds print no banner) the exit code alone.
+        """
+        process = subprocess.Popen(
+            self._command(*args),
+            cwd=self.project_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+        )
+        self.daemon = True
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            process.kill()
+
+        watchdog = threading.Timer(self.timeout, kill)
+        watchdog.start()
+        lines = []
+        try:
+            for line in process.stdout:
+                lines.append(line)
+                if on_line:
+                    on_line(line)
+            process.wait()
+        finally:
+            watchdog.cancel()
+            process.stdout.close()
+
+        output = "".join(lines)
+        if timed_out.is_set():
+            return False, output + f"\nERROR: Test timeout ({self.timeout} seconds exceeded)"
+        return process.returncode == 0 and (not banner or "BUILD SUCCESSFUL" in output), output
+
+    def start(self) -> tuple[bool, str]:
+        """Start the daemon and compile the test sources so the first run is warm too.
+
+        Returns (success, compiler output). A failed compile leaves the runner
+        unstarted, so the next start() or run() compiles again.
+        """
+        if self.started:
+            return True, ""
+        # -q suppresses "BUILD SUCCESSFUL": judge the compile by its exit code
+        success, output = self._stream([f"{self.task.rsplit(':', 1)[0]}:compileDebugUnitTestKotlin", "-q"],
+                                       on_line=self.on_line, banner=False)
+        self.started = success
+        return success, output
+
+    def run(self, extra_args=()) -> tuple[bool, str]:
+        """Run the test task on the warm daemon and return (success, output).
+
+        Pending case-log entries are compacted into protein_test_cases.json
+        first, since that is the file the Kotlin test reads.
+        """
+        try:
+            if self.project_dir == PROJECT_ROOT:
+                from case_log import get_case_log
+                get_case_log().compact()
+            compiled, output = self.start()
+            if not compiled:
+                return False, output + "\nERROR: Test sources failed to compile"
+            return self._stream([self.task, *extra_args], on_line=self.on_line)
+        except FileNotFoundError:
+            return False, f"ERROR: Gradle wrapper not found in {self.project_dir}"
+        except Exception as e:
+            return False, f"ERROR: {str(e)}"
+
+    def stop(self):
+        """Shut the daemon down."""
+        if not self.daemon:
+            return
+        try:
+            subprocess.run(gradle_wrapper(self.project_dir) + ["--stop"], cwd=self.project_dir,
+                           capture_output=True, timeout=60)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        self.started = self.daemon = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+_shared_runner = None
+
+
+def get_runner() -> GradleTestRunner:
+    """Process-wide runner, so every run_tests() call in a session hits the same daemon."""
+    global _shared_runner
+    if _shared_runner is None:
+        _shared_runner = GradleTestRunner()
+    return _shared_runner
+
+
+def main():
+    runner = GradleTestRunner(on_line=lambda line: print(line, end="", flush=True))
+    success, output = runner.run()
+    # Errors from the runner itself (no wrapper, timeout) are not part of the streamed output
+    last_line = output.rstrip().rsplit("\n", 1)[-1]
+    if last_line.startswith("ERROR:"):
+        print(last_line)
+    print("ALL TESTS PASSED" if success else "TESTS FAILED")
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
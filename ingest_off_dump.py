@@ -0,0 +1,150 @@
+"""
+OpenFoodFacts dump ingestion
+
+Streams an official OpenFoodFacts export (JSONL or the tab-separated CSV,
+optionally gzip-compressed) from a local file and writes the products usable
+for training to a compact gzipped JSONL store. Records keep the OFF field
+names format_test_case() and the category fetchers already use:
+
+    {"code", "product_name", "brands", "ingredients_text", "nutriments",
+     "categories_tags", "lang"}
+
+Products are filtered with the same len(ingredients_text) > 20 rule as the
+live fetchers. Input is processed line by line, so memory use does not grow
+with the size of the dump.
+
+Usage:
+    python ingest_off_dump.py openfoodfacts-products.jsonl.gz
+    python ingest_off_dump.py en.openfoodfacts.org.products.csv.gz --limit 50000
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+STORE_DIR = PROJECT_ROOT / "off_store"
+DEFAULT_OUTPUT = STORE_DIR / "products.jsonl.gz"
+
+MIN_INGREDIENTS_LENGTH = 20
+# Nutriment values worth keeping; the full OFF nutriments object has hundreds of keys
+KEPT_NUTRIMENTS = ("proteins_100g",)
+
+
+def open_dump(path):
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    return open(path, "r", encoding="utf-8", errors="replace", newline="")
+
+
+def is_csv_dump(path) -> bool:
+    name = Path(path).name.lower()
+    return name.endswith((".csv", ".csv.gz", ".tsv", ".tsv.gz"))
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def compact_product(code, name, brands, ingredients, nutriments, categories, lang):
+    """Store record for one product, or None if it fails the ingredient filter."""
+    ingredients = (ingredients or "").strip()
+    if len(ingredients) <= MIN_INGREDIENTS_LENGTH or not code:
+        return None
+    kept = {k: nutriments[k] for k in KEPT_NUTRIMENTS if nutriments.get(k) is not None}
+    return {
+        "code": str(code),
+        "product_name": name or "Unknown Product",
+        "brands": brands or "",
+        "ingredients_text": ingredients,
+        "nutriments": kept,
+        "categories_tags": categories,
+        "lang": lang or "",
+    }
+
+
+def iter_jsonl_dump(path):
+    """Products of an OFF JSONL export."""
+    with open_dump(path) as f:
+        for line in f:
+            try:
+                product = json.loads(line)
+            except ValueError:
+                continue
+            lang = product.get("lang") or ""
+            ingredients = product.get("ingredients_text") or product.get(f"ingredients_text_{lang}")
+            nutriments = {k: _number(v) for k, v in (product.get("nutriments") or {}).items()
+                          if k in KEPT_NUTRIMENTS}
+            yield compact_product(product.get("code"), product.get("product_name"), product.get("brands"),
+                                  ingredients, nutriments, product.get("categories_tags") or [], lang)
+
+
+def iter_csv_dump(path):
+    """Products of the OFF tab-separated CSV export."""
+    csv.field_size_limit(sys.maxsize)
+    with open_dump(path) as f:
+        reader = csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+        for row in reader:
+            nutriments = {k: _number(row.get(k)) for k in KEPT_NUTRIMENTS}
+            categories = [c for c in (row.get("categories_tags") or "").split(",") if c]
+            yield compact_product(row.get("code"), row.get("product_name"), row.get("brands"),
+                                  row.get("ingredients_text"), nutriments, categories, row.get("lang"))
+
+
+def iter_dump(path):
+    """Usable products of a dump, in dump order."""
+    reader = iter_csv_dump if is_csv_dump(path) else iter_jsonl_dump
+    for product in reader(path):
+        if product is not None:
+            yield product
+
+
+def iter_store(path=DEFAULT_OUTPUT):
+    """Read back a store written by ingest()."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def ingest(dump_path, output=DEFAULT_OUTPUT, limit=None) -> int:
+    """Stream a dump into the compact store; returns the number of products written."""
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_output = output.with_name(output.name + ".tmp")
+    written = 0
+    start = time.perf_counter()
+    with gzip.open(tmp_output, "wt", encoding="utf-8", compresslevel=6) as out:
+        for product in iter_dump(dump_path):
+            out.write(json.dumps(product, ensure_ascii=False, separators=(",", ":")) + "\n")
+            written += 1
+            if written % 100_000 == 0:
+                print(f"  {written} products ({time.perf_counter() - start:.0f}s)", file=sys.stderr)
+            if limit and written >= limit:
+                break
+    tmp_output.replace(output)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest an OpenFoodFacts dump into the local product store")
+    parser.add_argument("dump", help="OFF JSONL or CSV export (.gz supported)")
+    parser.add_argument("-o", "--output", default=str(DEFAULT_OUTPUT), help="Store file (gzipped JSONL)")
+    parser.add_argument("--limit", type=int, help="Stop after this many usable products")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = ingest(args.dump, args.output, args.limit)
+    print(f"Wrote {written} products to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Batch protein keyword matching over ingredient corpora
+
+Runs test_fixes.find_matches_batch over test cases, run folders or JSONL
+dumps and writes one JSON line per product.
+
+Usage:
+    python match_corpus.py                                  # test cases + all run folders
+    python match_corpus.py runs_archived/run_20260124_01    # one run folder
+    python match_corpus.py off_dump.jsonl.gz -o matches.jsonl
+    python match_corpus.py --workers 32                     # shard across 32 processes
+
+Output order always follows input order, whatever the worker count, so runs
+can be diffed directly.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, tee
+
+from corpus import iter_corpus
+from test_fixes import find_matches_batch
+
+
+def match_records(records):
+    """Yield (record, matches) pairs for a stream of corpus records."""
+    records, texts = tee(records)
+    return zip(records, find_matches_batch(record["ingredients"] for record in texts))
+
+
+def _match_chunk(texts):
+    """Worker entry point: each process builds the compiled matcher once and keeps it."""
+    return list(find_matches_batch(texts))
+
+
+def match_records_parallel(records, workers, chunk_size=500):
+    """Like match_records(), sharding chunks of records across a process pool.
+
+    At most a few chunks per worker are in flight, so memory stays bounded on
+    large dumps, and chunks are drained in submission order.
+    """
+    records = iter(records)
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            while len(in_flight) < workers * 4:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                in_flight.append((chunk, pool.submit(_match_chunk, [r["ingredients"] for r in chunk])))
+            if not in_flight:
+                break
+            chunk, future = in_flight.popleft()
+            yield from zip(chunk, future.result())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match protein keywords over ingredient corpora")
+    parser.add_argument("sources", nargs="*", help="protein_test_cases.json, run folders, run products files or JSONL dumps")
+    parser.add_argument("-o", "--output", help="Write JSON lines here instead of stdout")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help=f"Worker processes (0 = all {os.cpu_count()} CPUs, default 1)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Texts per worker task")
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    records = iter_corpus(args.sources)
+    if workers > 1:
+        results = match_records_parallel(records, workers, args.chunk_size)
+    else:
+        results = match_records(records)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    count = chars = 0
+    try:
+        for record, matches in results:
+            out.write(json.dumps({
+                "id": record["id"],
+                "detected": [name for name, _ in matches],
+                "matches": matches,
+            }, ensure_ascii=False) + "\n")
+            count += 1
+            chars += len(record["ingredients"])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Matched {count} texts ({chars / 1e6:.2f} MB) in {elapsed:.2f}s ({rate:.0f} texts/s, {workers} worker(s))",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
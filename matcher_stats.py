@@ -0,0 +1,226 @@
+"""
+Opt-in instrumentation for the protein keyword matcher
+
+InstrumentedMatcher is a drop-in KeywordMatcher that records, per keyword:
+
+    occurrences        occurrences the automaton reported while scanning
+    bounded_hits       texts where the keyword matched on word boundaries (the regex path)
+    substring_hits     texts accepted through the substring fallback
+    fallback_rejected  base-keyword fallbacks rejected as part of an isolate/protein word
+    short_rejected     unbounded hits ignored because the keyword has <= 3 characters
+    generic_rejected   unbounded hits of generic terms ("milk", "eiweiß") ignored for their source
+    specific_rejected  substring hits left to a more specific source's keyword ("molkenproteinisolat")
+    full_word_calls    get_full_word() calls
+    full_word_seconds  time spent in get_full_word()
+    decide_seconds     time spent applying the match rules to the keyword (includes get_full_word)
+
+plus totals for texts, characters and automaton scan time. The regular
+KeywordMatcher is untouched, so there is no cost unless instrumentation is
+switched on, either here or with PROTEIN_MATCHER_STATS=<file.json> (then
+test_fixes.get_matcher() returns an instrumented matcher and the stats are
+written to that file at exit).
+
+Usage:
+    python matcher_stats.py                              # test cases + run folders, table sorted by time
+    python matcher_stats.py --sort occurrences --top 20
+    python matcher_stats.py runs/run_20260127_01 --format prometheus
+    python matcher_stats.py --format json -o stats.json
+    python matcher_stats.py --check                      # instrumented results == KeywordMatcher's
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+
+from test_fixes import BOUNDED, FALLBACK, GENERIC, SHORT, SPECIFIC, SUBSTRING, KeywordMatcher
+
+COUNTERS = ("occurrences", "bounded_hits", "substring_hits", "fallback_rejected", "short_rejected",
+            "generic_rejected", "specific_rejected", "full_word_calls")
+TIMERS = ("full_word_seconds", "decide_seconds")
+# KeywordMatcher.decide outcome -> the counter it increments
+OUTCOME_COUNTERS = {BOUNDED: "bounded_hits", SUBSTRING: "substring_hits", FALLBACK: "fallback_rejected",
+                    SHORT: "short_rejected", GENERIC: "generic_rejected", SPECIFIC: "specific_rejected"}
+
+
+class MatcherStats:
+    """Per-keyword counters and timers collected by InstrumentedMatcher."""
+
+    def __init__(self, matcher: KeywordMatcher = None):
+        self.keywords = defaultdict(lambda: dict.fromkeys(COUNTERS, 0) | dict.fromkeys(TIMERS, 0.0))
+        self.protein_of = {}
+        if matcher is not None:
+            for name, keywords in matcher.protein_keywords.items():
+                for keyword in keywords:
+                    self.protein_of.setdefault(keyword, name)
+        self.texts = 0
+        self.chars = 0
+        self.scan_seconds = 0.0
+
+    def reset(self):
+        self.keywords.clear()
+        self.texts = self.chars = 0
+        self.scan_seconds = 0.0
+
+    def rows(self, sort="decide_seconds", top=None) -> list:
+        rows = [{"keyword": kw, "protein": self.protein_of.get(kw, ""), **counts}
+                for kw, counts in self.keywords.items()]
+        rows.sort(key=lambda r: (r[sort], r["occurrences"]), reverse=True)
+        return rows[:top] if top else rows
+
+    def to_dict(self, sort="decide_seconds", top=None) -> dict:
+        return {
+            "texts": self.texts,
+            "chars": self.chars,
+            "scan_seconds": self.scan_seconds,
+            "decide_seconds": sum(c["decide_seconds"] for c in self.keywords.values()),
+            "keywords": self.rows(sort, top),
+        }
+
+    def to_json(self, sort="decide_seconds", top=None) -> str:
+        return json.dumps(self.to_dict(sort, top), indent=2, ensure_ascii=False)
+
+    def to_table(self, sort="decide_seconds", top=None) -> str:
+        header = (f"{'keyword':<28} {'protein':<22} {'occur':>7} {'bound':>7} {'substr':>7} {'rej':>5} "
+                  f"{'short':>6} {'gen':>5} {'spec':>5} {'fw':>6} {'fw ms':>8} {'rule ms':>8}")
+        lines = [
+            f"{self.texts} texts, {self.chars / 1e6:.2f} MB, scan {self.scan_seconds * 1000:.1f} ms, "
+            f"rules {sum(c['decide_seconds'] for c in self.keywords.values()) * 1000:.1f} ms",
+            header,
+            "-" * len(header),
+        ]
+        for r in self.rows(sort, top):
+            lines.append(f"{r['keyword'][:28]:<28} {r['protein'][:22]:<22} {r['occurrences']:>7} "
+                         f"{r['bounded_hits']:>7} {r['substring_hits']:>7} {r['fallback_rejected']:>5} "
+                         f"{r['short_rejected']:>6} {r['generic_rejected']:>5} {r['specific_rejected']:>5} "
+                         f"{r['full_word_calls']:>6} "
+                         f"{r['full_word_seconds'] * 1000:>8.2f} {r['decide_seconds'] * 1000:>8.2f}")
+        return "\n".join(lines)
+
+    def to_prometheus(self, prefix="protein_matcher") -> str:
+        def label(value: str) -> str:
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        lines = []
+        for name, value, kind, help_text in (
+                ("texts_total", self.texts, "counter", "Texts matched"),
+                ("chars_total", self.chars, "counter", "Characters scanned"),
+                ("scan_seconds_total", self.scan_seconds, "counter", "Time in the keyword automaton")):
+            lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} {kind}",
+                      f"{prefix}_{name} {value}"]
+        for metric in COUNTERS + TIMERS:
+            name = f"{prefix}_keyword_{metric}_total"
+            lines += [f"# HELP {name} Per-keyword {metric.replace('_', ' ')}", f"# TYPE {name} counter"]
+            for keyword, counts in sorted(self.keywords.items()):
+                lines.append(f'{name}{{keyword="{label(keyword)}",protein="{label(self.protein_of.get(keyword, ""))}"}} '
+                             f"{counts[metric]}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, fmt="table", sort="decide_seconds", top=None) -> str:
+        if fmt == "json":
+            return self.to_json(sort, top)
+        if fmt == "prometheus":
+            return self.to_prometheus()
+        return self.to_table(sort, top)
+
+
+class InstrumentedMatcher(KeywordMatcher):
+    """KeywordMatcher that records per-keyword cost in self.stats (same results, slower).
+
+    Only the hooks are overridden: scan() reports occurrences through its
+    on_occurrence callback, decide() and full_word() are timed around the
+    KeywordMatcher implementations, so the match rules exist once.
+    """
+
+    def __init__(self, protein_keywords, base_keywords, stats: MatcherStats = None, **options):
+        super().__init__(protein_keywords, base_keywords, **options)
+        self.stats = stats or MatcherStats(self)
+        self._counts = None
+
+    def scan(self, text, on_occurrence=None):
+        occurrences = []
+        start_time = time.perf_counter()
+        hits = super().scan(text, occurrences.append)
+        self.stats.scan_seconds += time.perf_counter() - start_time
+        for keyword, count in Counter(occurrences).items():
+            self.stats.keywords[keyword]["occurrences"] += count
+        if on_occurrence is not None:
+            for keyword in occurrences:
+                on_occurrence(keyword)
+        return hits
+
+    def full_word(self, text, start, end):
+        start_time = time.perf_counter()
+        word = super().full_word(text, start, end)
+        self._counts["full_word_seconds"] += time.perf_counter() - start_time
+        self._counts["full_word_calls"] += 1
+        return word
+
+    def decide(self, hits, text, protein_name, keyword) -> str:
+        counts = self._counts = self.stats.keywords[keyword]
+        start_time = time.perf_counter()
+        outcome = super().decide(hits, text, protein_name, keyword)
+        counts["decide_seconds"] += time.perf_counter() - start_time
+        counts[OUTCOME_COUNTERS[outcome]] += 1
+        return outcome
+
+    def find_matches(self, ingredients: str) -> list:
+        self.stats.texts += 1
+        self.stats.chars += len(ingredients)
+        return super().find_matches(ingredients)
+
+
+def mismatches(texts, matcher: KeywordMatcher = None) -> list:
+    """(text, plain result, instrumented result) for every text where instrumentation changes the matches."""
+    from test_fixes import PROTEIN_BASE_KEYWORDS, PROTEIN_KEYWORDS
+    matcher = matcher or KeywordMatcher(PROTEIN_KEYWORDS, PROTEIN_BASE_KEYWORDS)
+    instrumented = InstrumentedMatcher(matcher.protein_keywords, matcher.base_keywords,
+                                       protein_suffixes=matcher.protein_suffixes, generic_terms=matcher.generic_terms,
+                                       tables=matcher.tables())
+    differences = []
+    for text in texts:
+        expected, got = matcher.find_matches(text), instrumented.find_matches(text)
+        if got != expected:
+            differences.append((text, expected, got))
+    return differences
+
+
+def main():
+    from corpus import iter_corpus
+
+    parser = argparse.ArgumentParser(description="Per-keyword cost of the protein matcher")
+    parser.add_argument("sources", nargs="*", help="Corpus sources (default: test cases + all run folders)")
+    parser.add_argument("--format", choices=("table", "json", "prometheus"), default="table")
+    parser.add_argument("--sort", choices=COUNTERS + TIMERS, default="decide_seconds")
+    parser.add_argument("--top", type=int, help="Only the N most expensive keywords")
+    parser.add_argument("--repeat", type=int, default=1, help="Match the corpus this many times")
+    parser.add_argument("-o", "--output", help="Write the export to a file instead of stdout")
+    parser.add_argument("--check", action="store_true",
+                        help="Only check that instrumentation does not change any match result")
+    args = parser.parse_args()
+
+    from test_fixes import PROTEIN_BASE_KEYWORDS, PROTEIN_KEYWORDS
+    texts = [record["ingredients"] for record in iter_corpus(args.sources or None)]
+    if args.check:
+        differences = mismatches(texts)
+        for text, expected, got in differences[:10]:
+            print(f"MISMATCH {text[:60]!r}: {expected} != {got}")
+        print(f"{len(texts) - len(differences)}/{len(texts)} texts match KeywordMatcher")
+        sys.exit(1 if differences else 0)
+
+    matcher = InstrumentedMatcher(PROTEIN_KEYWORDS, PROTEIN_BASE_KEYWORDS)
+    for _ in range(args.repeat):
+        for text in texts:
+            matcher.find_matches(text)
+
+    report = matcher.stats.export(args.format, args.sort, args.top)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + ("" if report.endswith("\n") else "\n"))
+    else:
+        sys.stdout.write(report + ("" if report.endswith("\n") else "\n"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Near-duplicate filter for training products
+
+Runs contain stretches of products whose ingredient lists are practically the
+same (a row of Arabic-only cheeses, one brand's flavours). Each of them costs
+a full training iteration and teaches nothing new. This module finds them
+before a run is created:
+
+    signature   MinHash over character 5-gram shingles of the normalized
+                ingredient text (NUM_PERM 32-bit hashes)
+    index       LSH over the signatures (BANDS bands of ROWS hashes), so only
+                texts sharing a band are compared; the estimated Jaccard
+                similarity of those candidates decides
+
+The index over the test cases (protein_test_cases.json + pending case log) is
+kept in off_store/near_duplicates.sqlite3 and synced incrementally: only cases
+whose ingredient text changed are re-hashed. It is rebuilt when the signature
+parameters change.
+
+Usage:
+    python near_duplicates.py sync                          # index the test cases
+    python near_duplicates.py query "Zutaten: Milch, Salz"  # closest test cases
+    python near_duplicates.py check runs/run_20260127_01    # near-duplicates in a run folder
+    python near_duplicates.py stats
+"""
+
+import argparse
+import hashlib
+import random
+import sqlite3
+import zlib
+from array import array
+from collections import defaultdict
+from pathlib import Path
+
+from normalization import normalize
+
+PROJECT_ROOT = Path(__file__).parent
+INDEX_FILE = PROJECT_ROOT / "off_store" / "near_duplicates.sqlite3"
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SEED = 20260127
+DEFAULT_THRESHOLD = 0.8
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+_rng = random.Random(SEED)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(NUM_PERM)]
+PARAMS = f"shingle={SHINGLE_SIZE};perm={NUM_PERM};bands={BANDS};seed={SEED}"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    content BLOB NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket BLOB NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets(band, bucket);
+CREATE INDEX IF NOT EXISTS buckets_key ON buckets(key);
+"""
+
+
+def shingles(text: str) -> set:
+    """Hashed character shingles of the normalized ingredient text."""
+    text = normalize(text).text
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode("utf-8"))}
+    return {zlib.crc32(text[i:i + SHINGLE_SIZE].encode("utf-8")) for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(text: str) -> list:
+    """MinHash signature: the minimum of each of NUM_PERM universal hashes over the shingles."""
+    hashed = shingles(text)
+    return [min(((a * x + b) % _PRIME) & _MASK for x in hashed) for a, b in _PERMUTATIONS]
+
+
+def similarity(sig_a, sig_b) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+def band_buckets(sig) -> list:
+    """One bucket id per band; texts sharing any bucket are candidate near-duplicates."""
+    return [hashlib.blake2b(array("I", sig[band * ROWS:(band + 1) * ROWS]).tobytes(), digest_size=8).digest()
+            for band in range(BANDS)]
+
+
+def _content_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+class BatchIndex:
+    """In-memory LSH index, for near-duplicates within one batch of products."""
+
+    def __init__(self):
+        self.signatures = {}
+        self.buckets = defaultdict(list)
+
+    def add(self, key: str, sig):
+        self.signatures[key] = sig
+        for band, bucket in enumerate(band_buckets(sig)):
+            self.buckets[band, bucket].append(key)
+
+    def candidates(self, sig) -> set:
+        return {key for band, bucket in enumerate(band_buckets(sig)) for key in self.buckets.get((band, bucket), ())}
+
+
+class NearDuplicateIndex:
+    """Persistent LSH index of test case ingredient texts, keyed by test case id."""
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.executescript(SCHEMA)
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+        if row is None or row[0] != PARAMS:
+            # Signatures from other parameters are not comparable: start over
+            self.db.execute("DELETE FROM entries")
+            self.db.execute("DELETE FROM buckets")
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('params', ?)", (PARAMS,))
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _remove(self, key: str):
+        self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self.db.execute("DELETE FROM buckets WHERE key = ?", (key,))
+
+    def add(self, key: str, text: str, commit=True) -> bool:
+        """Index a text under `key`; False if it is already indexed with the same text."""
+        content = _content_key(text)
+        row = self.db.execute("SELECT content FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None and row[0] == content:
+            return False
+        self._remove(key)
+        sig = signature(text)
+        self.db.execute("INSERT INTO entries (key, content, signature) VALUES (?, ?, ?)",
+                        (key, content, array("I", sig).tobytes()))
+        self.db.executemany("INSERT INTO buckets (band, bucket, key) VALUES (?, ?, ?)",
+                            [(band, bucket, key) for band, bucket in enumerate(band_buckets(sig))])
+        if commit:
+            self.db.commit()
+        return True
+
+    def sync_test_cases(self, test_cases=None) -> int:
+        """Bring the index in line with the test cases (default: canonical file + case log); cases re-hashed."""
+        if test_cases is None:
+            from case_log import get_case_log
+            test_cases = get_case_log().merged().get("test_cases", [])
+        texts = {case["id"]: case["ingredients"] for case in test_cases if case.get("id") and case.get("ingredients")}
+        changed = sum(self.add(key, text, commit=False) for key, text in texts.items())
+        for (key,) in self.db.execute("SELECT key FROM entries").fetchall():
+            if key not in texts:
+                self._remove(key)
+        self.db.commit()
+        return changed
+
+    def candidates(self, sig) -> set:
+        keys = set()
+        for band, bucket in enumerate(band_buckets(sig)):
+            keys.update(key for (key,) in self.db.execute(
+                "SELECT key FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)))
+        return keys
+
+    def signature_of(self, key: str):
+        row = self.db.execute("SELECT signature FROM entries WHERE key = ?", (key,)).fetchone()
+        return array("I", row[0]).tolist() if row else None
+
+    def query(self, text: str = None, threshold=DEFAULT_THRESHOLD, sig=None) -> list:
+        """(key, similarity) of the indexed texts at least `threshold` similar, most similar first."""
+        sig = sig if sig is not None else signature(text)
+        matches = [(key, similarity(sig, self.signature_of(key))) for key in self.candidates(sig)]
+        return sorted(((k, s) for k, s in matches if s >= threshold), key=lambda m: (-m[1], m[0]))
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+def find_near_duplicates(products, index: NearDuplicateIndex = None, threshold=DEFAULT_THRESHOLD) -> dict:
+    """{position: (duplicate_of, similarity)} for products near-identical to a test case or an earlier product.
+
+    Test case matches are reported by test case id, matches within the batch
+    as "product <position>".
+    """
+    batch = BatchIndex()
+    duplicates = {}
+    for position, product in enumerate(products):
+        text = product.get("ingredients") or ""
+        if not text:
+            continue
+        sig = signature(text)
+        best = index.query(sig=sig, threshold=threshold)[:1] if index is not None else []
+        for key in batch.candidates(sig):
+            score = similarity(sig, batch.signatures[key])
+            if score >= threshold and (not best or score > best[0][1]):
+                best = [(key, score)]
+        if best:
+            duplicates[position] = best[0]
+        else:
+            batch.add(f"product {position}", sig)
+    return duplicates
+
+
+def filter_near_duplicates(products, limit=None, threshold=DEFAULT_THRESHOLD, index_path=INDEX_FILE) -> tuple:
+    """(products, dropped) with near-duplicates moved out of the way.
+
+    Products near-identical to a test case or to an earlier product are
+    dropped; if fewer than `limit` distinct products remain, the
+    near-duplicates fill the rest, last and tagged with "near_duplicate_of".
+    """
+    with NearDuplicateIndex(index_path) as index:
+        index.sync_test_cases()
+        duplicates = find_near_duplicates(products, index, threshold)
+    kept = [p for i, p in enumerate(products) if i not in duplicates]
+    rest = []
+    for position, (duplicate_of, score) in duplicates.items():
+        product = dict(products[position])
+        product["near_duplicate_of"] = duplicate_of
+        product["near_duplicate_similarity"] = round(score, 3)
+        rest.append(product)
+    if limit is None:
+        return kept, rest
+    fill = max(0, limit - len(kept))
+    return kept[:limit] + rest[:fill], rest[fill:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate detection over ingredient texts")
+    parser.add_argument("command", choices=("sync", "query", "check", "stats"))
+    parser.add_argument("target", nargs="?", help="Ingredient text (query) or run folder / products file (check)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum estimated Jaccard similarity (default: 0.8)")
+    parser.add_argument("--index", default=str(INDEX_FILE), help="Index database")
+    args = parser.parse_args()
+
+    with NearDuplicateIndex(args.index) as index:
+        if args.command == "stats":
+            print(f"{index.count()} indexed test cases ({PARAMS}) in {index.path}")
+            return
+        changed = index.sync_test_cases()
+        if args.command == "sync":
+            print(f"Indexed {changed} new or changed test cases, {index.count()} total")
+            return
+        if not args.target:
+            parser.error(f"{args.command} needs a target")
+
+        if args.command == "query":
+            for key, score in index.query(args.target, args.threshold):
+                print(f"{score:.2f}  {key}")
+            return
+
+        from run_products import iter_products
+        products = list(iter_products(args.target))
+        duplicates = find_near_duplicates(products, index, args.threshold)
+    for position, (duplicate_of, score) in sorted(duplicates.items()):
+        product = products[position]
+        print(f"#{position:<3} {product.get('barcode', '')} {product.get('name', '')[:40]!r} "
+              f"~ {duplicate_of} ({score:.2f})")
+    print(f"{len(duplicates)} of {len(products)} products are near-duplicates (threshold {args.threshold})")
+
+
+if __name__ == "__main__":
+    main()
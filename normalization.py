@@ -0,0 +1,146 @@
+"""
+Memoized ingredient-text normalization
+
+Every detector starts from the same few views of an ingredient text:
+
+    lower       the whole text lowercased (what the keyword matcher scans)
+    extracted   the text after the earliest "Zutaten:/Ingredients:/Ingrédients:..."
+                marker that is not part of an origin statement ("Herkunft Zutaten:")
+    text        extracted, without markdown _/* , lowercased, whitespace runs collapsed
+                (what analyzeProteinQuality scans)
+
+normalize() computes all three once per distinct text and keeps them in an
+LRU cache keyed by a content hash, so the matcher, the engine, the evaluator
+and report passes over the same corpus share one normalization, and repeat
+evaluations in the same process skip it entirely.
+
+Usage:
+    python normalization.py                 # normalize test cases + run folders twice, print cache stats
+    python normalization.py "Zutaten: _Weizen_mehl, Wasser"
+"""
+
+import argparse
+import hashlib
+import re
+import time
+from collections import OrderedDict
+
+from protein_data import load_data
+
+# Java's \s (and so the Kotlin Regex("\\s+")) only covers ASCII whitespace
+JAVA_SPACE = "[ \t\n\x0b\f\r]"
+_WHITESPACE_RUN = re.compile(JAVA_SPACE + "+")
+
+_RULES = load_data()["rules"]
+INGREDIENT_MARKERS = tuple(_RULES["ingredientMarkers"])
+ORIGIN_PREFIXES = tuple(_RULES["originPrefixes"])
+
+DEFAULT_CACHE_SIZE = 50_000
+
+
+def content_key(text: str) -> bytes:
+    """Cache key of a text: a 128-bit hash, so the cache never holds on to the raw texts."""
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def extract_ingredients(text: str, text_lower: str = None) -> str:
+    """The text after the earliest ingredient marker that is not part of an origin statement."""
+    if text_lower is None:
+        text_lower = text.lower()
+    starts = []
+    for marker in INGREDIENT_MARKERS:
+        idx = text_lower.find(marker)
+        if idx < 0:
+            continue
+        before = text_lower[max(0, idx - 15):idx].strip()
+        if any(before.endswith(prefix) for prefix in ORIGIN_PREFIXES):
+            continue
+        starts.append(idx + len(marker))
+    return text[min(starts):].strip() if starts else text
+
+
+def clean_ingredients(extracted: str) -> str:
+    """Drop markdown underscores/asterisks, lowercase and collapse whitespace runs."""
+    return _WHITESPACE_RUN.sub(" ", extracted.replace("_", "").replace("*", "").lower())
+
+
+class NormalizedText:
+    """The normalized views of one ingredient text (see the module docstring)."""
+
+    __slots__ = ("lower", "extracted", "text")
+
+    def __init__(self, raw: str):
+        self.lower = raw.lower()
+        self.extracted = extract_ingredients(raw, self.lower)
+        self.text = clean_ingredients(self.extracted)
+
+
+class Normalizer:
+    """normalize() with an LRU cache of NormalizedText keyed by content_key()."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def normalize(self, text: str) -> NormalizedText:
+        key = content_key(text)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+        normalized = NormalizedText(text)
+        self._cache[key] = normalized
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return normalized
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"size": len(self._cache), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+_normalizer = Normalizer()
+
+
+def get_normalizer() -> Normalizer:
+    """The process-wide normalizer shared by the matcher, the engine and the corpus tools."""
+    return _normalizer
+
+
+def normalize(text: str) -> NormalizedText:
+    return _normalizer.normalize(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize ingredient texts (memoized)")
+    parser.add_argument("text", nargs="?", help="Show the normalized views of this text")
+    parser.add_argument("--sources", nargs="*", help="Corpus sources (default: test cases + all run folders)")
+    args = parser.parse_args()
+
+    if args.text is not None:
+        normalized = normalize(args.text)
+        for name in NormalizedText.__slots__:
+            print(f"{name:<10} {getattr(normalized, name)!r}")
+        return
+
+    from corpus import iter_corpus
+    texts = [record["ingredients"] for record in iter_corpus(args.sources or None)]
+    for label in ("cold", "warm"):
+        start = time.perf_counter()
+        for text in texts:
+            normalize(text)
+        print(f"{label}: {len(texts)} texts in {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(_normalizer.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+On-disk HTTP cache for OpenFoodFacts requests
+
+Every OpenFoodFacts call in the training scripts goes through one SQLite
+cache keyed by URL and query parameters. Entries expire after a TTL, the
+cache is kept under a size limit by evicting least recently used entries,
+and offline mode serves only from the cache (any age) without touching the
+network. Randomly sorted searches (sort_by=random) are not deterministic:
+they always go to the network (the response is still stored, for offline
+mode), otherwise every run within the TTL would get the same "random" page.
+
+Environment:
+    OFF_CACHE_DIR       cache directory (default: .off_cache/ in the project)
+    OFF_CACHE_OFFLINE   1 = never hit the network, fail on cache misses
+    OFF_CACHE_TTL       entry lifetime in seconds (default: 1 day)
+    OFF_CACHE_MAX_MB    size limit before LRU eviction (default: 500)
+
+Usage:
+    python off_cache.py stats      # entries, size, hit/miss counters
+    python off_cache.py prune      # drop expired entries and enforce the size limit
+    python off_cache.py clear
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+PROJECT_ROOT = Path(__file__).parent
+CACHE_DIR = Path(os.environ.get("OFF_CACHE_DIR", PROJECT_ROOT / ".off_cache"))
+CACHE_FILE = CACHE_DIR / "http_cache.sqlite3"
+
+DEFAULT_TTL = float(os.environ.get("OFF_CACHE_TTL", 24 * 3600))
+DEFAULT_MAX_BYTES = int(float(os.environ.get("OFF_CACHE_MAX_MB", 500)) * 1024 * 1024)
+OFFLINE = os.environ.get("OFF_CACHE_OFFLINE", "") not in ("", "0", "false", "no")
+
+USER_AGENT = "ProteinScannerTraining/1.0 (protein detection training scripts)"
+
+
+class OfflineCacheMiss(requests.ConnectionError):
+    """Raised in offline mode when a request is not in the cache."""
+
+
+class CachedResponse:
+    """The subset of requests.Response the training scripts use."""
+
+    def __init__(self, url: str, status_code: int, content: bytes, from_cache: bool):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def is_random(params) -> bool:
+    """Whether a request asks for randomly sorted results, which must not be served from the cache."""
+    return str((params or {}).get("sort_by", "")) == "random"
+
+
+def cache_key(url: str, params=None) -> str:
+    """Stable key for a request: URL plus parameters in sorted order."""
+    query = urlencode(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    return hashlib.sha256(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+
+class HttpCache:
+    """SQLite-backed GET cache with TTL, LRU size bound and an offline mode.
+
+    get() has the same call shape as requests.get/Session.get, so an
+    HttpCache can be passed wherever a session is expected.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES,
+                 offline=OFFLINE, session=None):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._session = session
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_access)")
+        self._db.commit()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=16)
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+            self._session.headers["User-Agent"] = USER_AGENT
+        return self._session
+
+    def _lookup(self, key: str, ttl: float):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status, body, fetched_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            url, status, body, fetched_at = row
+            if not self.offline and time.time() - fetched_at > ttl:
+                return None
+            self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return CachedResponse(url, status, body, from_cache=True)
+
+    def _store(self, key: str, url: str, status: int, body: bytes):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, url, status, body, size, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (key, url, status, body, len(body), now, now))
+            self._db.commit()
+        self.evict()
+
+    def get(self, url: str, params=None, timeout=30, ttl=None, refresh=False) -> CachedResponse:
+        """GET through the cache. `refresh` skips the lookup but still stores the response.
+
+        Randomly sorted searches are always refreshed, except in offline mode.
+        """
+        key = cache_key(url, params)
+        refresh = refresh or (is_random(params) and not self.offline)
+        if not refresh:
+            cached = self._lookup(key, self.ttl if ttl is None else ttl)
+            if cached is not None:
+                self.hits += 1
+                return cached
+        self.misses += 1
+        if self.offline:
+            raise OfflineCacheMiss(f"Offline mode: {url} not in cache")
+
+        response = self.session.get(url, params=params, timeout=timeout)
+        result = CachedResponse(response.url, response.status_code, response.content, from_cache=False)
+        if response.status_code == 200:
+            self._store(key, response.url, response.status_code, response.content)
+        return result
+
+    def iter_responses(self, url_contains: str = ""):
+        """(url, body) of every cached response whose URL contains `url_contains`."""
+        with self._lock:
+            rows = self._db.execute("SELECT url, body FROM responses WHERE instr(url, ?) > 0",
+                                    (url_contains,)).fetchall()
+        yield from rows
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in self._db.execute(
+                    "SELECT key, size FROM responses ORDER BY last_access").fetchall():
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            self._db.commit()
+
+    def prune(self):
+        """Delete expired entries, then enforce the size limit."""
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.ttl,))
+            self._db.commit()
+        self.evict()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": size, "hits": self.hits, "misses": self.misses,
+                "offline": self.offline, "path": str(self.path)}
+
+
+_shared_cache = None
+
+
+def get_cache() -> HttpCache:
+    """Process-wide cache shared by all OpenFoodFacts callers."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = HttpCache()
+    return _shared_cache
+
+
+def cached_get(url: str, params=None, timeout=30, **kwargs) -> CachedResponse:
+    """Drop-in replacement for requests.get on OpenFoodFacts URLs."""
+    return get_cache().get(url, params=params, timeout=timeout, **kwargs)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = get_cache()
+    if command == "clear":
+        cache.clear()
+    elif command == "prune":
+        cache.prune()
+    elif command != "stats":
+        print(f"Unknown command: {command} (use stats, prune or clear)", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(cache.stats(), indent=2))
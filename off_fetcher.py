@@ -0,0 +1,153 @@
+"""
+Concurrent OpenFoodFacts category fetcher
+
+Fetches category search pages in parallel on a pooled HTTP session, paced by
+a token-bucket rate limiter instead of a fixed sleep per request. Barcodes
+are deduplicated as pages arrive and outstanding requests are cancelled as
+soon as the target product count is reached.
+
+The search URL is a parameter, so the fetcher can be pointed at a local stub
+server.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+SEARCH_URL = "https://world.openfoodfacts.org/cgi/search.pl"
+SEARCH_FIELDS = "code,product_name,ingredients_text,brands"
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE = 2.0  # requests per second
+
+
+class TokenBucket:
+    """Asyncio token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def make_session(concurrency: int = DEFAULT_CONCURRENCY) -> requests.Session:
+    """requests session whose connection pool fits the concurrency limit."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def product_from_search(product: dict, category: str):
+    """Run-folder product record for a search hit, or None if its ingredients are unusable."""
+    ingredients = product.get("ingredients_text")
+    if not ingredients or len(ingredients) <= 20:
+        return None
+    return {
+        "barcode": product.get("code", "unknown"),
+        "name": product.get("product_name", "Unknown Product"),
+        "brand": product.get("brands", ""),
+        "ingredients": ingredients,
+        "category": category,
+    }
+
+
+def category_params(category: str, count: int) -> dict:
+    return {
+        "action": "process",
+        "tagtype_0": "categories",
+        "tag_contains_0": "contains",
+        "tag_0": category,
+        "sort_by": "random",
+        "page_size": count,
+        "json": 1,
+        "fields": SEARCH_FIELDS,
+    }
+
+
+class CategoryFetcher:
+    """Fetches products from many categories at once until a target count is reached."""
+
+    def __init__(self, search_url=SEARCH_URL, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+                 timeout=30, session=None, exclude_barcodes=()):
+        self.search_url = search_url
+        self.concurrency = concurrency
+        self.rate = rate
+        self.timeout = timeout
+        self.session = session or make_session(concurrency)
+        self.seen_barcodes = set(exclude_barcodes)
+
+    def _get(self, params: dict) -> dict:
+        response = self.session.get(self.search_url, params=params, timeout=self.timeout)
+        if response.status_code != 200:
+            return {}
+        return response.json()
+
+    async def _fetch_page(self, loop, executor, semaphore, bucket, category, page_size):
+        async with semaphore:
+            await bucket.acquire()
+            data = await loop.run_in_executor(executor, self._get, category_params(category, page_size))
+            return category, data
+
+    async def fetch(self, categories, target=100, page_size=15) -> list:
+        """Fetch one random page per category concurrently; stop once `target` products are in."""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate)
+        products = []
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        tasks = [
+            asyncio.ensure_future(self._fetch_page(loop, executor, semaphore, bucket, category, page_size))
+            for category in categories
+        ]
+        try:
+            for done in asyncio.as_completed(tasks):
+                try:
+                    category, data = await done
+                except Exception as e:
+                    print(f"  Error fetching page: {e}")
+                    continue
+                for hit in data.get("products", []):
+                    product = product_from_search(hit, category)
+                    if product is None or product["barcode"] in self.seen_barcodes:
+                        continue
+                    self.seen_barcodes.add(product["barcode"])
+                    products.append(product)
+                    if len(products) >= target:
+                        return products
+        finally:
+            # Early cancellation: queued requests never hit the network, in-flight ones are abandoned
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            executor.shutdown(wait=False, cancel_futures=True)
+        return products
+
+
+def fetch_category_products(categories, target=100, page_size=15, **kwargs) -> list:
+    """Synchronous wrapper around CategoryFetcher.fetch()."""
+    fetcher = CategoryFetcher(**kwargs)
+    return asyncio.run(fetcher.fetch(categories, target=target, page_size=page_size))
@@ -0,0 +1,225 @@
+"""
+Coverage-driven product selection for training runs
+
+Random products mostly re-exercise keywords the test cases already cover
+well. The selector scores candidate products by what they would add to the
+test cases, and fills a run greedily with the highest-yield ones:
+
+    uncovered   protein-looking words ("lupinenprotein", "proteína") that no
+                keyword of the detector matches
+    rule        exclusion rules the product triggers (trace warnings, lecithin,
+                oils, malt, flavors, ...), rarer rules score higher
+    keyword     keywords the detector accepts, rarely tested ones score higher
+    language    the product's language, scored higher the fewer cases it has
+    token       ingredient words no test case contains yet (capped, so long
+                texts do not win on length alone)
+
+Every feature is worth weight / (1 + how often the test cases already have
+it). After a product is picked its features count as covered, so the next
+pick favours something different (lazy greedy).
+
+Candidates come from the local product store and from search pages in the
+OFF HTTP cache; barcodes that already have a test case or were evaluated
+in a run (barcode_index) are left out.
+
+Usage:
+    python product_selector.py                          # best 100 local candidates
+    python product_selector.py --count 20 --json
+    python product_selector.py runs/run_20260127_01     # rank a run folder's products
+"""
+
+import argparse
+import heapq
+import json
+import re
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+
+from normalization import normalize
+from protein_engine import get_engine
+
+TOKEN_RE = re.compile(r"\w{2,}")
+PROTEIN_HINTS = ("protein", "protéin", "proteín", "proteïn", "eiweiß", "eiweiss", "eiwit", "białk", "whey", "molke")
+
+WEIGHTS = {"uncovered": 3.0, "rule": 2.0, "language": 2.0, "keyword": 1.0, "token": 0.1}
+TOKEN_GAIN_CAP = 1.0
+DEFAULT_COUNT = 100
+DEFAULT_CANDIDATES = 5000
+
+# Frequent ingredient-list words per language, for texts without a language tag
+LANGUAGE_WORDS = {
+    "en": {"and", "sugar", "salt", "water", "milk", "contains", "may", "flour", "wheat", "oil", "ingredients"},
+    "de": {"und", "zucker", "salz", "wasser", "milch", "enthält", "kann", "spuren", "mehl", "weizen", "zutaten"},
+    "fr": {"et", "sucre", "sel", "eau", "lait", "contient", "peut", "farine", "blé", "huile", "ingrédients"},
+    "es": {"y", "azúcar", "sal", "agua", "leche", "contiene", "puede", "harina", "trigo", "aceite", "ingredientes"},
+    "it": {"zucchero", "sale", "acqua", "latte", "contiene", "può", "farina", "grano", "olio", "ingredienti"},
+    "nl": {"en", "suiker", "zout", "melk", "bevat", "kan", "bloem", "tarwe", "olie", "ingrediënten"},
+    "pl": {"cukier", "sól", "woda", "mleko", "zawiera", "może", "mąka", "pszenna", "olej", "składniki"},
+}
+SCRIPTS = (("ar", "؀", "ۿ"), ("ru", "Ѐ", "ӿ"), ("el", "Ͱ", "Ͽ"),
+           ("th", "฀", "๿"), ("zh", "一", "鿿"), ("ja", "぀", "ヿ"))
+
+
+def guess_language(text: str, lang: str = "") -> str:
+    """The product's language: its OFF tag if known, else by script or frequent ingredient words."""
+    if lang:
+        return lang.lower()
+    letters = [c for c in text if c.isalpha()]
+    for code, low, high in SCRIPTS:
+        if sum(1 for c in letters if low <= c <= high) > len(letters) / 3:
+            return code
+    words = Counter(TOKEN_RE.findall(text.lower()) + re.findall(r"\b\w\b", text.lower()))
+    scores = {code: sum(words[w] for w in vocabulary) for code, vocabulary in LANGUAGE_WORDS.items()}
+    best = max(scores, key=scores.get)
+    return best if scores[best] else "unknown"
+
+
+def rule_family(reason: str) -> str:
+    """A rejection reason without the pattern that triggered it ("Part of trace/allergen warning")."""
+    return re.sub(r"\s*\([^)]*\)", "", reason).split("'")[0].rstrip(": ")
+
+
+def features(product: dict, engine=None) -> list:
+    """The coverage features of a product (see the module docstring), as (kind, value) pairs."""
+    engine = engine or get_engine()
+    ingredients = product.get("ingredients") or ""
+    text = normalize(ingredients).text
+    _, debug = engine.find_matches(text)
+
+    found = set()
+    covered = []
+    for match in debug:
+        if match["was_accepted"]:
+            found.add(("keyword", match["keyword"]))
+            covered.append((match["char_position"], match["char_position"] + len(match["matched_text"])))
+        else:
+            found.add(("rule", rule_family(match["rejection_reason"])))
+    for token in TOKEN_RE.finditer(text):
+        word = token.group()
+        found.add(("token", word))
+        if any(hint in word for hint in PROTEIN_HINTS) and not any(
+                start < token.end() and token.start() < end for start, end in covered):
+            found.add(("uncovered", word))
+    found.add(("language", guess_language(ingredients, product.get("lang", ""))))
+    return sorted(found)
+
+
+def coverage_profile(test_cases=None, engine=None) -> Counter:
+    """How often each feature occurs in the test cases (default: canonical file + case log)."""
+    if test_cases is None:
+        from case_log import get_case_log
+        test_cases = get_case_log().merged().get("test_cases", [])
+    engine = engine or get_engine()
+    profile = Counter()
+    for case in test_cases:
+        profile.update(features(case, engine))
+    return profile
+
+
+def gain(product_features, counts: Counter) -> float:
+    total = tokens = 0.0
+    for feature in product_features:
+        value = WEIGHTS[feature[0]] / (1 + counts[feature])
+        if feature[0] == "token":
+            tokens += value
+        else:
+            total += value
+    return total + min(tokens, TOKEN_GAIN_CAP)
+
+
+def explain(product_features, counts: Counter, top=3) -> list:
+    """The features contributing most to a product's score, e.g. 'uncovered: lupinenprotein'."""
+    ranked = sorted((f for f in product_features if f[0] != "token"),
+                    key=lambda f: WEIGHTS[f[0]] / (1 + counts[f]), reverse=True)
+    return [f"{kind}: {value}" for kind, value in ranked[:top] if WEIGHTS[kind] / (1 + counts[kind, value]) >= 0.5]
+
+
+def select_products(candidates, count=DEFAULT_COUNT, profile: Counter = None, engine=None) -> list:
+    """The `count` candidates adding the most coverage, best first, tagged with selection_score/_reasons."""
+    engine = engine or get_engine()
+    counts = Counter(profile if profile is not None else coverage_profile(engine=engine))
+    candidate_features = [features(product, engine) for product in candidates]
+    heap = [(-gain(f, counts), i) for i, f in enumerate(candidate_features)]
+    heapq.heapify(heap)
+
+    selected = []
+    while heap and len(selected) < count:
+        _, i = heapq.heappop(heap)
+        score = gain(candidate_features[i], counts)
+        if heap and score < -heap[0][0]:
+            # Gains only shrink as coverage grows: re-queue with the current score
+            heapq.heappush(heap, (-score, i))
+            continue
+        product = dict(candidates[i])
+        product["selection_score"] = round(score, 3)
+        product["selection_reasons"] = explain(candidate_features[i], counts)
+        selected.append(product)
+        counts.update(candidate_features[i])
+    return selected
+
+
+def cached_search_products() -> list:
+    """Products in search pages of the OFF HTTP cache."""
+    from off_cache import get_cache
+    from off_fetcher import product_from_search
+    products = []
+    for url, body in get_cache().iter_responses("search"):
+        try:
+            hits = json.loads(body).get("products", [])
+        except (ValueError, AttributeError):
+            continue
+        query = parse_qs(urlparse(url).query)
+        category = (query.get("tag_0") or query.get("categories_tags_en") or ["cache"])[0]
+        products.extend(p for p in (product_from_search(hit, category) for hit in hits) if p is not None)
+    return products
+
+
+def local_candidates(limit=DEFAULT_CANDIDATES) -> list:
+    """Distinct products from the store and the HTTP cache with a barcode not known yet."""
+    from barcode_index import get_barcode_index
+    from product_store import ProductStore
+
+    known = get_barcode_index()
+    with ProductStore() as store:
+        store.sync()
+        # Run products have no case either; over-fetch so the known ones do not eat into the limit
+        products = store.uncased_products(limit + len(known) if limit else None)
+    products += cached_search_products()
+
+    candidates, seen = [], set()
+    for product in products:
+        barcode = product.get("barcode")
+        if barcode in seen or barcode in known:
+            continue
+        seen.add(barcode)
+        candidates.append(product)
+    return candidates[:limit] if limit else candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick the products that add the most test coverage")
+    parser.add_argument("source", nargs="?", help="Run folder or products file to rank (default: local candidates)")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="Products to select")
+    parser.add_argument("--candidates", type=int, default=DEFAULT_CANDIDATES, help="Local candidates to score")
+    parser.add_argument("--json", action="store_true", help="Print the selected products as JSON lines")
+    args = parser.parse_args()
+
+    if args.source:
+        from run_products import iter_products
+        candidates = list(iter_products(args.source))
+    else:
+        candidates = local_candidates(args.candidates)
+    selected = select_products(candidates, args.count)
+
+    if args.json:
+        for product in selected:
+            print(json.dumps(product, ensure_ascii=False))
+        return
+    for rank, product in enumerate(selected, 1):
+        print(f"{rank:>3} {product['selection_score']:6.2f}  {product.get('barcode', ''):<14} "
+              f"{(product.get('name') or '')[:32]:<32} {'; '.join(product['selection_reasons'])}")
+    print(f"Selected {len(selected)} of {len(candidates)} candidates")
+
+
+if __name__ == "__main__":
+    main()
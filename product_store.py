@@ -0,0 +1,385 @@
+"""
+Indexed local product store
+
+One SQLite database indexing every product the training tools have seen:
+test cases, run folders (runs/ and runs_archived/) and ingested OFF dumps.
+Barcodes, categories, sources, run ids, test case ids and ingredient tokens
+are all indexed, so "have we seen barcode X?", "everything in en:cheeses" or
+"products mentioning erbsenprotein" are single index lookups instead of
+loading and scanning every JSON file.
+
+File sources are synced incrementally: a file is only re-imported when its
+size or modification time changed. A product's name, brand, protein and
+language follow its latest sighting (empty values do not blank out known
+ones), and products left without any sighting, because their case or run
+product was removed or their source file is gone, are deleted.
+
+Usage:
+    python product_store.py sync                        # index test cases + all run folders
+    python product_store.py import-dump off_store/products.jsonl.gz
+    python product_store.py lookup 6111246721261
+    python product_store.py category en:cheeses
+    python product_store.py search soja protein
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+from run_products import iter_products, run_products_files
+
+PROJECT_ROOT = Path(__file__).parent
+STORE_FILE = PROJECT_ROOT / "off_store" / "products.sqlite3"
+TEST_CASES_FILE = PROJECT_ROOT / "app/src/test/resources/protein_test_cases.json"
+RUN_ROOTS = [PROJECT_ROOT / "runs", PROJECT_ROOT / "runs_archived"]
+
+TOKEN_RE = re.compile(r"\w{2,}")
+CASE_ID_PREFIXES = ("off_", "training_")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    barcode TEXT PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT '',
+    brand TEXT NOT NULL DEFAULT '',
+    ingredients TEXT NOT NULL DEFAULT '',
+    proteins_100g REAL,
+    lang TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS sightings (
+    barcode TEXT NOT NULL,
+    source TEXT NOT NULL,
+    run_id TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    case_id TEXT NOT NULL DEFAULT '',
+    origin TEXT NOT NULL DEFAULT '',
+    UNIQUE (barcode, source, run_id, category, case_id, origin)
+);
+CREATE INDEX IF NOT EXISTS sightings_barcode ON sightings(barcode);
+CREATE INDEX IF NOT EXISTS sightings_category ON sightings(category);
+CREATE INDEX IF NOT EXISTS sightings_run ON sightings(run_id);
+CREATE INDEX IF NOT EXISTS sightings_source ON sightings(source);
+CREATE INDEX IF NOT EXISTS sightings_case ON sightings(case_id);
+CREATE INDEX IF NOT EXISTS sightings_origin ON sightings(origin);
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT NOT NULL,
+    barcode TEXT NOT NULL,
+    PRIMARY KEY (token, barcode)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS synced_files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+
+def tokenize(text: str) -> set:
+    """Lowercased word tokens (2+ characters) of an ingredient text."""
+    return set(TOKEN_RE.findall((text or "").lower()))
+
+
+def barcode_from_case(test_case: dict) -> str:
+    """Barcode of a test case: its barcode field or the off_/training_ id suffix."""
+    if test_case.get("barcode"):
+        return str(test_case["barcode"])
+    case_id = test_case.get("id", "")
+    for prefix in CASE_ID_PREFIXES:
+        if case_id.startswith(prefix):
+            return case_id[len(prefix):]
+    return ""
+
+
+class ProductStore:
+    """SQLite product index with barcode, category, source, run and token lookups."""
+
+    def __init__(self, path=STORE_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # --- writes -------------------------------------------------------------
+
+    def _upsert_product(self, barcode, name="", brand="", ingredients="", proteins_100g=None, lang=""):
+        row = self.db.execute("SELECT ingredients FROM products WHERE barcode = ?", (barcode,)).fetchone()
+        # Metadata is always refreshed; the token index only when the ingredients changed
+        self.db.execute(
+            "INSERT INTO products (barcode, name, brand, ingredients, proteins_100g, lang) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (barcode) DO UPDATE SET "
+            "name = coalesce(nullif(excluded.name, ''), name), "
+            "brand = coalesce(nullif(excluded.brand, ''), brand), "
+            "ingredients = excluded.ingredients, "
+            "proteins_100g = coalesce(excluded.proteins_100g, proteins_100g), "
+            "lang = coalesce(nullif(excluded.lang, ''), lang)",
+            (barcode, name or "", brand or "", ingredients or "", proteins_100g, lang or ""))
+        if row is not None and row[0] == (ingredients or ""):
+            return
+        if row is not None:
+            self.db.execute("DELETE FROM tokens WHERE barcode = ?", (barcode,))
+        self.db.executemany("INSERT OR IGNORE INTO tokens (token, barcode) VALUES (?, ?)",
+                            ((token, barcode) for token in tokenize(ingredients)))
+
+    def _prune_products(self, barcodes) -> int:
+        """Delete the given products that no longer have any sighting; returns how many."""
+        orphans = [(b,) for b in barcodes if self.db.execute(
+            "SELECT 1 FROM sightings WHERE barcode = ? LIMIT 1", (b,)).fetchone() is None]
+        self.db.executemany("DELETE FROM tokens WHERE barcode = ?", orphans)
+        self.db.executemany("DELETE FROM products WHERE barcode = ?", orphans)
+        return len(orphans)
+
+    def _add_sighting(self, barcode, source, run_id="", category="", case_id="", origin=""):
+        self.db.execute(
+            "INSERT OR IGNORE INTO sightings (barcode, source, run_id, category, case_id, origin) "
+            "VALUES (?, ?, ?, ?, ?, ?)", (barcode, source, run_id or "", category or "", case_id or "", origin or ""))
+
+    def add_product(self, barcode, name="", brand="", ingredients="", proteins_100g=None, lang="",
+                    source="", run_id="", category="", case_id="", origin="", commit=True):
+        """Index one product and record where it was seen."""
+        barcode = str(barcode)
+        self._upsert_product(barcode, name, brand, ingredients, proteins_100g, lang)
+        self._add_sighting(barcode, source, run_id, category, case_id, origin)
+        if commit:
+            self.db.commit()
+
+    def add_test_case(self, test_case: dict, origin=str(TEST_CASES_FILE), commit=True):
+        """Index a test case (products without a barcode are keyed by case id)."""
+        barcode = barcode_from_case(test_case) or f"case:{test_case['id']}"
+        self.add_product(barcode, name=test_case.get("name", ""), ingredients=test_case.get("ingredients", ""),
+                         source=test_case.get("source", "test_case"), case_id=test_case["id"],
+                         origin=origin, commit=commit)
+
+    def add_run_products(self, run_id: str, products, origin="", commit=True) -> int:
+        """Index the products of a run folder."""
+        count = 0
+        for p in products:
+            self.add_product(p.get("barcode", "unknown"), p.get("name", ""), p.get("brand", ""),
+                             p.get("ingredients", ""), source="run", run_id=run_id,
+                             category=p.get("category", ""), origin=origin, commit=False)
+            count += 1
+        if commit:
+            self.db.commit()
+        return count
+
+    def import_dump_store(self, path) -> int:
+        """Index a store written by ingest_off_dump.py."""
+        from ingest_off_dump import iter_store
+        count = 0
+        origin = str(Path(path))
+        for p in iter_store(path):
+            barcode = p["code"]
+            self._upsert_product(barcode, p.get("product_name", ""), p.get("brands", ""), p.get("ingredients_text", ""),
+                                 (p.get("nutriments") or {}).get("proteins_100g"), p.get("lang", ""))
+            categories = p.get("categories_tags") or [""]
+            for category in categories:
+                self._add_sighting(barcode, "dump", category=category, origin=origin)
+            count += 1
+            if count % 10_000 == 0:
+                self.db.commit()
+        self.db.commit()
+        return count
+
+    # --- incremental file sync ----------------------------------------------
+
+    def _file_changed(self, path: Path) -> bool:
+        stat = path.stat()
+        row = self.db.execute("SELECT mtime_ns, size FROM synced_files WHERE path = ?", (str(path),)).fetchone()
+        return row is None or row != (stat.st_mtime_ns, stat.st_size)
+
+    def _mark_synced(self, path: Path):
+        stat = path.stat()
+        self.db.execute("INSERT OR REPLACE INTO synced_files (path, mtime_ns, size) VALUES (?, ?, ?)",
+                        (str(path), stat.st_mtime_ns, stat.st_size))
+
+    def _origin_barcodes(self, origin: str) -> list:
+        return [r[0] for r in self.db.execute("SELECT DISTINCT barcode FROM sightings WHERE origin = ?", (origin,))]
+
+    def _resync_file(self, path: Path, load):
+        previous = self._origin_barcodes(str(path))
+        self.db.execute("DELETE FROM sightings WHERE origin = ?", (str(path),))
+        load(path)
+        self._prune_products(previous)
+        self._mark_synced(path)
+        self.db.commit()
+
+    def forget_file(self, path) -> int:
+        """Drop a source file's sightings and the products only it had; returns how many products went."""
+        origin = str(Path(path))
+        previous = self._origin_barcodes(origin)
+        self.db.execute("DELETE FROM sightings WHERE origin = ?", (origin,))
+        self.db.execute("DELETE FROM synced_files WHERE path = ?", (origin,))
+        removed = self._prune_products(previous)
+        self.db.commit()
+        return removed
+
+    def sync_test_cases(self, path=TEST_CASES_FILE) -> bool:
+        path = Path(path)
+        if not path.exists() or not self._file_changed(path):
+            return False
+
+        def load(p):
+            with open(p, "r", encoding="utf-8") as f:
+                for tc in json.load(f).get("test_cases", []):
+                    self.add_test_case(tc, origin=str(p), commit=False)
+
+        self._resync_file(path, load)
+        return True
+
+    def sync_run(self, products_file) -> bool:
+        products_file = Path(products_file)
+        if not products_file.exists() or not self._file_changed(products_file):
+            return False
+
+        def load(p):
+            self.add_run_products(p.parent.name, iter_products(p), origin=str(p), commit=False)
+
+        self._resync_file(products_file, load)
+        return True
+
+    def sync_case_log(self, path=None) -> bool:
+        """Index cases still pending in the append-only case log."""
+        from case_log import CASE_LOG_FILE, CaseLog
+        path = Path(path or CASE_LOG_FILE)
+        if not path.exists() or not self._file_changed(path):
+            return False
+
+        def load(p):
+            for entry in CaseLog(log=p).entries():
+                self.add_test_case(entry["case"], origin=str(p), commit=False)
+
+        self._resync_file(path, load)
+        return True
+
+    def sync(self, test_cases_file=TEST_CASES_FILE, run_roots=None) -> int:
+        """Re-import every changed source file and forget vanished ones; returns how many changed."""
+        from case_log import CASE_LOG_FILE
+        changed = int(self.sync_test_cases(test_cases_file)) + int(self.sync_case_log())
+        run_files = run_products_files(run_roots or RUN_ROOTS)
+        for products_file in run_files:
+            changed += self.sync_run(products_file)
+        sources = {str(Path(p)) for p in (test_cases_file, CASE_LOG_FILE, *run_files) if Path(p).exists()}
+        for (path,) in self.db.execute("SELECT path FROM synced_files").fetchall():
+            if path not in sources:
+                self.forget_file(path)
+                changed += 1
+        return changed
+
+    def mark_file_synced(self, path):
+        """Record that a file's current contents are already indexed (after writing it ourselves)."""
+        self._mark_synced(Path(path))
+        self.db.commit()
+
+    # --- queries ------------------------------------------------------------
+
+    def has_barcode(self, barcode) -> bool:
+        return self.db.execute("SELECT 1 FROM products WHERE barcode = ?", (str(barcode),)).fetchone() is not None
+
+    def has_case(self, case_id: str) -> bool:
+        return self.db.execute("SELECT 1 FROM sightings WHERE case_id = ? LIMIT 1", (case_id,)).fetchone() is not None
+
+    def get(self, barcode):
+        row = self.db.execute(
+            "SELECT barcode, name, brand, ingredients, proteins_100g, lang FROM products WHERE barcode = ?",
+            (str(barcode),)).fetchone()
+        if row is None:
+            return None
+        keys = ("barcode", "name", "brand", "ingredients", "proteins_100g", "lang")
+        product = dict(zip(keys, row))
+        product["sightings"] = self.sightings(barcode)
+        return product
+
+    def sightings(self, barcode) -> list:
+        rows = self.db.execute(
+            "SELECT source, run_id, category, case_id FROM sightings WHERE barcode = ?", (str(barcode),)).fetchall()
+        return [dict(zip(("source", "run_id", "category", "case_id"), r)) for r in rows]
+
+    def by_category(self, category: str) -> list:
+        return [r[0] for r in self.db.execute(
+            "SELECT DISTINCT barcode FROM sightings WHERE category = ? ORDER BY barcode", (category,))]
+
+    def by_run(self, run_id: str) -> list:
+        return [r[0] for r in self.db.execute(
+            "SELECT DISTINCT barcode FROM sightings WHERE run_id = ? ORDER BY barcode", (run_id,))]
+
+    def by_source(self, source: str) -> list:
+        return [r[0] for r in self.db.execute(
+            "SELECT DISTINCT barcode FROM sightings WHERE source = ? ORDER BY barcode", (source,))]
+
+    def search_tokens(self, *tokens, limit=None) -> list:
+        """Barcodes whose ingredients contain every given token."""
+        tokens = [t.lower() for t in tokens if t]
+        if not tokens:
+            return []
+        query = " INTERSECT ".join("SELECT barcode FROM tokens WHERE token = ?" for _ in tokens)
+        query += " ORDER BY barcode"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return [r[0] for r in self.db.execute(query, tokens)]
+
+    def uncased_products(self, limit=None, min_ingredients=20) -> list:
+        """Products no test case was written for yet (random order), as run product records."""
+        query = """
+            SELECT p.barcode, p.name, p.brand, p.ingredients, p.lang,
+                   (SELECT category FROM sightings s WHERE s.barcode = p.barcode AND category != '' LIMIT 1)
+            FROM products p
+            WHERE length(p.ingredients) > ?
+              AND NOT EXISTS (SELECT 1 FROM sightings s WHERE s.barcode = p.barcode AND s.case_id != '')
+            ORDER BY random()"""
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        keys = ("barcode", "name", "brand", "ingredients", "lang", "category")
+        return [dict(zip(keys, (v or "" for v in row))) for row in self.db.execute(query, (min_ingredients,))]
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexed local product store")
+    parser.add_argument("--store", default=str(STORE_FILE), help="SQLite store file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("sync", help="Index test cases and all run folders (changed files only)")
+    dump = sub.add_parser("import-dump", help="Index a store written by ingest_off_dump.py")
+    dump.add_argument("path")
+    lookup = sub.add_parser("lookup", help="Show one product and where it was seen")
+    lookup.add_argument("barcode")
+    category = sub.add_parser("category", help="Barcodes seen in a category")
+    category.add_argument("category")
+    search = sub.add_parser("search", help="Barcodes whose ingredients contain all tokens")
+    search.add_argument("tokens", nargs="+")
+    args = parser.parse_args()
+
+    with ProductStore(args.store) as store:
+        if args.command == "sync":
+            changed = store.sync()
+            print(f"Re-imported {changed} file(s); {store.count()} products indexed")
+        elif args.command == "import-dump":
+            print(f"Indexed {store.import_dump_store(args.path)} products")
+        elif args.command == "lookup":
+            product = store.get(args.barcode)
+            if product is None:
+                print(f"Barcode {args.barcode} not in store", file=sys.stderr)
+                sys.exit(1)
+            print(json.dumps(product, indent=2, ensure_ascii=False))
+        elif args.command == "category":
+            print("\n".join(store.by_category(args.category)))
+        elif args.command == "search":
+            print("\n".join(store.search_tokens(*args.tokens)))
+
+
+if __name__ == "__main__":
+    main()
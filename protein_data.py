@@ -0,0 +1,238 @@
+"""
+Generated protein data table shared by the Python tools
+
+protein_data.json holds, in one file, everything the detectors need from
+ProteinDatabase.kt: the protein sources (name, PDCAAS, DIAAS, quality
+category, keywords, ...) and the named rule lists of isValidProteinMatch and
+analyzeProteinQuality (trace-warning phrases, lecithin/oil/malt/flavor
+exclusions, base keywords, isolated/base ingredient names, ...):
+
+    {"format": "protein-data", "version": 1, "source": ..., "source_sha1": ...,
+     "rules": {"traceWarningPhrases": [...], "genericTerms": {"milk": ["Milk Protein"]}, ...},
+     "sources": [{"name": ..., "pdcaas": ..., "keywords": [...], ...}, ...]}
+
+ProteinDatabase.kt stays the place where keywords are edited (the training
+loop works on it); this file is generated from it and checked for drift.
+load_data() notices a Kotlin file newer than the generated table (by content
+hash) and rebuilds the table in memory, so detectors never score with stale
+keywords.
+
+Usage:
+    python protein_data.py generate         # rewrite protein_data.json (+ the compiled matcher cache)
+    python protein_data.py check            # validate it and fail if it is out of date
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from protein_sources import PROTEIN_DB_FILE, parse_collection, parse_protein_sources
+
+PROJECT_ROOT = Path(__file__).parent
+DATA_FILE = PROJECT_ROOT / "protein_data.json"
+
+FORMAT_NAME = "protein-data"
+FORMAT_VERSION = 1
+
+SOURCE_FIELDS = ("name", "pdcaas", "diaas", "qualityCategory", "digestionSpeed", "keywords",
+                 "limitingAminoAcids", "description", "notes")
+# Named Kotlin collections copied into "rules" (string lists/sets, or maps for mapOf)
+RULE_NAMES = (
+    "ingredientMarkers", "originPrefixes", "proteinBaseKeywords", "proteinSuffixes",
+    "lecithinPatterns", "oilPatterns", "chocolatePhrases", "excludeCompounds", "plantMilkPrefixes",
+    "cocoaTerms", "maltTerms", "extractTerms", "flavorPatterns",
+    "soySources", "oilWords", "milkSources", "starchSources", "starchTerms", "glutenSources", "cornContextTerms",
+    "maltSources", "poultrySources", "nutSources", "nutmegTerms", "frenchNutNames", "linseedTerms",
+    "compoundPrefixes", "compoundSuffixes",
+    "traceWarningPhrases", "allergenListPhrases",
+    "genericTerms", "specificTerms", "germanBaseWords", "corruptionPatterns",
+    "proteinFamilies", "proteinBlendWords", "isolatedProteinNames", "baseIngredientNames", "purposeBuiltKeywords",
+)
+
+# (data file mtime, Kotlin mtime) -> loaded data
+_data_cache = {}
+
+
+def source_sha1(path=PROTEIN_DB_FILE) -> str:
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+
+
+def build_data(path=PROTEIN_DB_FILE) -> dict:
+    """The data table for a ProteinDatabase.kt file."""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    sources = [{field: source.get(field) for field in SOURCE_FIELDS} for source in parse_protein_sources(text)]
+    for source in sources:
+        source["digestionSpeed"] = source["digestionSpeed"] or "Medium"
+        source["limitingAminoAcids"] = source["limitingAminoAcids"] or []
+        source["notes"] = source["notes"] or ""
+    try:
+        relative = path.resolve().relative_to(PROJECT_ROOT.resolve()).as_posix()
+    except ValueError:
+        relative = str(path)
+    return {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "source": relative,
+        "source_sha1": hashlib.sha1(text.encode("utf-8")).hexdigest(),
+        "rules": {name: parse_collection(text, name) for name in RULE_NAMES},
+        "sources": sources,
+    }
+
+
+def dumps(data: dict) -> str:
+    """Compact JSON with one rule list / source per line, so diffs stay readable."""
+    def line(value):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+    header = {k: v for k, v in data.items() if k not in ("rules", "sources")}
+    lines = ["{"]
+    lines += [f"{line(k)}:{line(v)}," for k, v in header.items()]
+    lines.append('"rules":{')
+    rules = list(data["rules"].items())
+    lines += [f"{line(k)}:{line(v)}" + ("," if i < len(rules) - 1 else "") for i, (k, v) in enumerate(rules)]
+    lines.append("},")
+    lines.append('"sources":[')
+    sources = data["sources"]
+    lines += [line(s) + ("," if i < len(sources) - 1 else "") for i, s in enumerate(sources)]
+    lines.append("]}")
+    return "\n".join(lines) + "\n"
+
+
+def write_data(data: dict, path=DATA_FILE) -> Path:
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(dumps(data))
+    os.replace(tmp, path)
+    return path
+
+
+def load_data(path=DATA_FILE, kotlin=PROTEIN_DB_FILE) -> dict:
+    """The shared data table; rebuilt from ProteinDatabase.kt when the file is missing or stale."""
+    path, kotlin = Path(path), Path(kotlin)
+    key = (str(path), path.stat().st_mtime_ns if path.exists() else None,
+           kotlin.stat().st_mtime_ns if kotlin.exists() else None)
+    if key in _data_cache:
+        return _data_cache[key]
+
+    data = None
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    if kotlin.exists() and (data is None or data.get("source_sha1") != source_sha1(kotlin)):
+        data = build_data(kotlin)
+    if data is None:
+        raise FileNotFoundError(f"Neither {path} nor {kotlin} exists")
+    _data_cache.clear()
+    _data_cache[key] = data
+    return data
+
+
+def rules_digest(data: dict) -> str:
+    """Changes whenever any rule list changes (for result caches keyed on the rules)."""
+    return hashlib.sha1(json.dumps(data["rules"], sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def validate(data: dict) -> tuple[list, list]:
+    """(errors, warnings) for a data table."""
+    errors, warnings = [], []
+    if data.get("format") != FORMAT_NAME or data.get("version") != FORMAT_VERSION:
+        errors.append(f"Unsupported format {data.get('format')!r} version {data.get('version')!r}")
+    rules = data.get("rules", {})
+    for name in RULE_NAMES:
+        if not rules.get(name):
+            errors.append(f"Rule list {name} is missing or empty")
+
+    names = set()
+    keyword_owner = {}
+    for i, source in enumerate(data.get("sources", [])):
+        name = source.get("name")
+        label = name or f"source #{i}"
+        if not name:
+            errors.append(f"{label}: no name")
+        elif name in names:
+            errors.append(f"{label}: duplicate name")
+        names.add(name)
+        pdcaas = source.get("pdcaas")
+        if not isinstance(pdcaas, (int, float)) or not 0 <= pdcaas <= 1:
+            errors.append(f"{label}: PDCAAS {pdcaas!r} is not between 0 and 1")
+        diaas = source.get("diaas")
+        if diaas is not None and not isinstance(diaas, int):
+            errors.append(f"{label}: DIAAS {diaas!r} is not an integer")
+        if not source.get("qualityCategory"):
+            errors.append(f"{label}: no quality category")
+        keywords = source.get("keywords") or []
+        if not keywords:
+            errors.append(f"{label}: no keywords")
+        seen = set()
+        for keyword in keywords:
+            if not keyword or keyword != keyword.strip() or keyword != keyword.lower():
+                errors.append(f"{label}: keyword {keyword!r} is empty, padded or not lowercase")
+            if keyword in seen:
+                warnings.append(f"{label}: keyword {keyword!r} listed twice")
+            seen.add(keyword)
+            owner = keyword_owner.setdefault(keyword, name)
+            if owner != name:
+                warnings.append(f"{label}: keyword {keyword!r} is also a keyword of {owner} (both match it)")
+
+    for rule in ("isolatedProteinNames", "baseIngredientNames"):
+        for name in rules.get(rule, []):
+            if name not in names:
+                warnings.append(f"{rule}: {name!r} is not a protein source")
+    return errors, warnings
+
+
+def check(path=DATA_FILE, kotlin=PROTEIN_DB_FILE) -> bool:
+    """Validate the data file and that it matches ProteinDatabase.kt; prints the findings."""
+    path = Path(path)
+    if not path.exists():
+        print(f"ERROR: {path.name} does not exist; run: python protein_data.py generate")
+        return False
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    errors, warnings = validate(data)
+    if Path(kotlin).exists():
+        current = build_data(kotlin)
+        if current["sources"] != data["sources"] or current["rules"] != data["rules"]:
+            errors.append(f"{path.name} is out of date with {Path(kotlin).name}; run: python protein_data.py generate")
+    for warning in warnings:
+        print(f"WARNING: {warning}")
+    for error in errors:
+        print(f"ERROR: {error}")
+    keywords = sum(len(s.get("keywords") or []) for s in data.get("sources", []))
+    print(f"{path.name}: {len(data.get('sources', []))} sources, {keywords} keywords, "
+          f"{len(data.get('rules', {}))} rule lists - {len(errors)} errors, {len(warnings)} warnings")
+    return not errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate or check the shared protein data table")
+    parser.add_argument("command", choices=("generate", "check"))
+    parser.add_argument("--file", default=str(DATA_FILE), help="Data file (default: protein_data.json)")
+    parser.add_argument("--kotlin", default=str(PROTEIN_DB_FILE), help="ProteinDatabase.kt to read")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        sys.exit(0 if check(args.file, args.kotlin) else 1)
+
+    data = build_data(args.kotlin)
+    errors, _ = validate(data)
+    for error in errors:
+        print(f"ERROR: {error}")
+    path = write_data(data, args.file)
+    keywords = sum(len(s["keywords"]) for s in data["sources"])
+    print(f"Wrote {path.name}: {len(data['sources'])} sources, {keywords} keywords, {len(data['rules'])} rule lists")
+
+    from test_fixes import MATCHER_CACHE_FILE, load_matcher
+    load_matcher(rebuild=True)
+    print(f"Wrote {MATCHER_CACHE_FILE.name}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,602 @@
+"""
+Python port of ProteinDatabase.analyzeProteinQuality
+
+Scores ingredient texts the way the app does, without an Android JVM:
+
+    ingredient-marker extraction   "Zutaten:", "Ingredients:", ... (normalization.py, memoized)
+    keyword search                 first \\b-bounded hit, else a substring hit for compounds
+    isValidProteinMatch rules      lecithin/oil/starch/malt/flavor/nutmeg/... exclusions,
+                                   trace-warning and allergen-list exclusion, boundary rules
+    sub-ingredient dedup           "milk protein (casein, whey)" counts as milk protein only
+    blend merging                  "protein blend (pea, rice)" becomes one averaged source
+    ordinal weighting              1.0 / 0.7 / 0.5 / 0.3 by position, base ingredients at
+                                   0.1x once an isolated protein is present, traces at 0
+    weighted PDCAAS                with the Excellent/Good/Medium/Low label
+
+The protein sources and the named rule lists (trace-warning phrases, lecithin,
+oil and malt exclusions, the source sets each exclusion applies to, ...) come
+from protein_data.json, the table generated from ProteinDatabase.kt. Only the
+matched-keyword checks written inline in the Kotlin conditions ("milk",
+"gluten", "frei"/"sans", ...) are spelled out here as well.
+Results are plain dicts mirroring the Kotlin ProteinAnalysis, in snake_case.
+
+Usage:
+    python protein_engine.py "Zutaten: Wasser, Sojaproteinisolat, Reismehl"
+    python protein_engine.py --corpus                  # score test cases + run folders as NDJSON
+    python protein_engine.py --corpus runs/run_20260127_01 -o scores.ndjson
+"""
+
+import argparse
+import json
+import re
+import sys
+
+from normalization import JAVA_SPACE, normalize
+from protein_data import load_data
+
+# isValidProteinMatch: characters that count as a word boundary next to a match,
+# and the narrower set used when expanding a match to its full (compound) word
+BOUNDARY_CHARS = frozenset(" ,.;:()[]-\t\n")
+WORD_STOP_CHARS = frozenset(" ,.;:()[]\t\n")
+
+# The named rule lists of ProteinDatabase.kt, from the shared data table
+RULES = load_data()["rules"]
+
+# Base keywords that must not partial-match inside an isolate/protein compound
+PROTEIN_BASE_KEYWORDS = frozenset(RULES["proteinBaseKeywords"])
+PROTEIN_SUFFIXES = tuple(RULES["proteinSuffixes"])
+
+SOY_SOURCES = frozenset(RULES["soySources"])
+LECITHIN_PATTERNS = tuple(RULES["lecithinPatterns"])
+SOY_OIL_PATTERNS = tuple(RULES["oilPatterns"])
+OIL_WORDS = tuple(RULES["oilWords"])
+
+MILK_SOURCES = frozenset(RULES["milkSources"])
+CHOCOLATE_PHRASES = tuple(RULES["chocolatePhrases"])
+MILK_EXCLUDE_COMPOUNDS = tuple(RULES["excludeCompounds"])
+PLANT_MILK_PREFIXES = tuple(RULES["plantMilkPrefixes"])
+COCOA_TERMS = tuple(RULES["cocoaTerms"])
+_COCOA_BUTTER_ROMANCE = re.compile(JAVA_SPACE + "*(de|di)" + JAVA_SPACE + "+(cacao|cocoa|kakao).*")
+
+STARCH_SOURCES = frozenset(RULES["starchSources"])
+STARCH_TERMS = tuple(RULES["starchTerms"])
+GLUTEN_SOURCES = frozenset(RULES["glutenSources"])
+CORN_CONTEXT_TERMS = tuple(RULES["cornContextTerms"])
+MALT_SOURCES = frozenset(RULES["maltSources"])
+MALT_TERMS = tuple(RULES["maltTerms"])
+EXTRACT_TERMS = tuple(RULES["extractTerms"])
+POULTRY_SOURCES = frozenset(RULES["poultrySources"])
+FLAVOR_PATTERNS = tuple(RULES["flavorPatterns"])
+NUT_SOURCES = frozenset(RULES["nutSources"])
+NUTMEG_TERMS = tuple(RULES["nutmegTerms"])
+FRENCH_NUT_NAMES = tuple(RULES["frenchNutNames"])
+LINSEED_TERMS = tuple(RULES["linseedTerms"])
+
+TRACE_WARNING_PHRASES = tuple(RULES["traceWarningPhrases"])
+# Phrases that open a whole allergen list: everything up to the next period is excluded
+ALLERGEN_LIST_PHRASES = tuple(RULES["allergenListPhrases"])
+TRACE_DISTANCE = 80
+
+GENERIC_TERMS = {keyword: frozenset(names) for keyword, names in RULES["genericTerms"].items()}
+# A generic term glued to one of these is a compound word, not the generic protein
+COMPOUND_PREFIXES = tuple(RULES["compoundPrefixes"])
+COMPOUND_SUFFIXES = tuple(RULES["compoundSuffixes"])
+SPECIFIC_TERMS = frozenset(RULES["specificTerms"])
+GERMAN_BASE_WORDS = frozenset(RULES["germanBaseWords"])
+CORRUPTION_PATTERNS = tuple(RULES["corruptionPatterns"])
+
+PROTEIN_FAMILIES = dict(RULES["proteinFamilies"])
+_SUB_INGREDIENT_GAP = re.compile(r"[ \t\n\x0b\f\r,;:%0-9.]*")
+PROTEIN_BLEND_WORDS = tuple(RULES["proteinBlendWords"])
+
+ISOLATED_PROTEIN_NAMES = frozenset(RULES["isolatedProteinNames"])
+BASE_INGREDIENT_NAMES = frozenset(RULES["baseIngredientNames"])
+# A base-ingredient keyword containing one of these is a purpose-built protein ("weizenprotein")
+PURPOSE_BUILT_KEYWORDS = tuple(RULES["purposeBuiltKeywords"])
+ORDINAL_WEIGHTS = (1.0, 0.7, 0.5)
+LATER_WEIGHT = 0.3
+BASE_WEIGHT_FACTOR = 0.1
+MATCH_CONFIDENCE = 0.9
+
+
+def quality_label(pdcaas: float) -> str:
+    if pdcaas >= 0.9:
+        return "Excellent"
+    if pdcaas >= 0.75:
+        return "Good"
+    if pdcaas >= 0.5:
+        return "Medium"
+    return "Low"
+
+
+def ordinal_weight(index: int) -> float:
+    """1st protein 1.0, 2nd 0.7, 3rd 0.5, later ones 0.3."""
+    return ORDINAL_WEIGHTS[index] if index < len(ORDINAL_WEIGHTS) else LATER_WEIGHT
+
+
+def word_start(text: str, position: int) -> int:
+    for i in range(position - 1, -1, -1):
+        if text[i] in WORD_STOP_CHARS:
+            return i + 1
+    return 0
+
+
+def word_end(text: str, position: int) -> int:
+    for i in range(position, len(text)):
+        if text[i] in WORD_STOP_CHARS:
+            return i
+    return len(text)
+
+
+def _reject_soy(matched, position, text):
+    end = position + len(matched)
+    immediate = text[max(0, position - 25):min(len(text), end + 25)]
+    for pattern in LECITHIN_PATTERNS:
+        if matched + " " + pattern in immediate:
+            return f"Part of emulsifier ({matched} {pattern}), not protein source"
+        if (pattern + " de " + matched in immediate or pattern + " (" + matched in immediate or
+                pattern + "s de " + matched in immediate or pattern + "s (" + matched in immediate):
+            return f"Part of emulsifier ({pattern} de {matched}), not protein source"
+    if "(" + matched + ")" in immediate and any(p in immediate for p in LECITHIN_PATTERNS):
+        return "Part of emulsifier (lecithin with soy), not protein source"
+
+    full_word = text[word_start(text, position):word_end(text, end)]
+    if any(p in full_word for p in LECITHIN_PATTERNS):
+        return f"Part of compound word containing lecithin ({full_word}), not protein source"
+
+    for pattern in SOY_OIL_PATTERNS:
+        if pattern in immediate:
+            return f"Part of oil ({pattern}), not protein source"
+    # Oil word earlier in the same ingredient (after the last comma/semicolon)
+    same_ingredient_before = immediate[:25].rsplit(",", 1)[-1].rsplit(";", 1)[-1]
+    if any(word in same_ingredient_before for word in OIL_WORDS):
+        return "Part of oil phrase (oil precedes soja/soy), not protein source"
+    return None
+
+
+def _reject_milk(matched, position, text):
+    end = position + len(matched)
+    if matched in ("milk", "lait", "milch"):
+        text_after = text[end:min(len(text), end + 15)].lstrip()
+        if any(text_after.startswith(p) for p in CHOCOLATE_PHRASES):
+            return f"Part of '{matched} {text_after.split(' ')[0]}', not protein source"
+    if matched in ("milk", "milch", "milchpulver"):
+        full_word = text[word_start(text, position):word_end(text, end)]
+        if any(full_word.startswith(c) for c in MILK_EXCLUDE_COMPOUNDS):
+            return f"Part of compound word ({full_word}), not protein source"
+        if any(full_word.startswith(p) for p in PLANT_MILK_PREFIXES):
+            return f"Part of plant-based milk ({full_word}), not dairy protein"
+    return None
+
+
+def _reject_cocoa_butter(matched, position, text):
+    end = position + len(matched)
+    full_word = text[word_start(text, position):word_end(text, end)]
+    if any(term in full_word for term in COCOA_TERMS):
+        return f"Part of cocoa butter compound ({full_word}), not dairy"
+    text_before = text[max(0, position - 10):position].rstrip()
+    if any(text_before.endswith(term) for term in COCOA_TERMS):
+        return "Part of cocoa butter, not dairy"
+    if _COCOA_BUTTER_ROMANCE.fullmatch(text[end:min(len(text), end + 15)]):
+        return "Part of cocoa butter (romance language pattern), not dairy"
+    return None
+
+
+def _reject_gluten_free(matched, position, text):
+    end = position + len(matched)
+    if matched in ("gluten", "weizengluten", "maisgluten", "corn gluten"):
+        text_after = text[end:min(len(text), end + 10)]
+        if text_after.startswith(("frei", "free", "-free", "-frei")):
+            return "Part of 'gluten free' label, not protein source"
+    if matched in ("gluten", "glutine"):
+        text_before = text[max(0, position - 10):position].rstrip()
+        if text_before.endswith(("sans", "senza", "sin", "ohne")):
+            return "Part of 'gluten free' label, not protein source"
+    full_word = text[position:word_end(text, end)]
+    if "frei" in full_word or "free" in full_word:
+        return f"Part of compound word ({full_word}), not protein source"
+    return None
+
+
+def _reject_malt(matched, position, text):
+    end = position + len(matched)
+    full_word = text[position:word_end(text, end)]
+    if any(term in full_word for term in MALT_TERMS):
+        return f"Part of malt/extract ({full_word}), not protein source"
+    if "matz" in full_word and any(term in full_word for term in EXTRACT_TERMS):
+        return f"Part of malt/extract with typo ({full_word}), not protein source"
+    if any(term in full_word for term in EXTRACT_TERMS):
+        return f"Part of extract ({full_word}), not protein source"
+    text_after = text[end:min(len(text), end + 15)].lstrip()
+    if text_after.startswith(("malt", "malz")):
+        return "Part of malt phrase, not protein source"
+    return None
+
+
+def _reject_nut(matched, position, text):
+    end = position + len(matched)
+    context = text[max(0, position - 10):min(len(text), end + 20)]
+    if any(term in context for term in NUTMEG_TERMS):
+        return "Part of nutmeg (spice), not nut protein"
+    if matched == "noix":
+        after = text[end:min(len(text), end + 15)]
+        # "noix de coco/cajou/..." is another nut; a trailing "de noix" means walnuts
+        if after.startswith((" de ", " du ")) and not re.fullmatch(r" de [^a-z].*|^$", after):
+            after_phrase = re.sub(r"^ de | du ", "", after)
+            if after_phrase.startswith(FRENCH_NUT_NAMES):
+                return "Part of French compound nut name (noix de/du X)"
+    return None
+
+
+def _reject_trace_warning(matched, position, text):
+    start = max(0, position - 250)
+    context = text[start:min(len(text), position + len(matched) + 50)]
+    match_pos = position - start
+    for phrase in TRACE_WARNING_PHRASES:
+        phrase_pos = context.find(phrase)
+        if phrase_pos < 0 or phrase_pos >= match_pos:
+            continue
+        if any(p in phrase or p in context[phrase_pos:match_pos] for p in ALLERGEN_LIST_PHRASES):
+            # Allergen lists run until the next period
+            if "." not in context[phrase_pos + len(phrase):match_pos]:
+                return f"Part of trace/allergen warning list: '{phrase}'"
+        elif match_pos - phrase_pos < TRACE_DISTANCE:
+            return f"Part of trace/allergen warning: '{phrase}'"
+    return None
+
+
+def is_valid_protein_match(keyword: str, matched: str, position: int, text: str, source_name: str):
+    """(accepted, rejection reason) for a keyword hit, the rules of ProteinDatabase.isValidProteinMatch."""
+    end = position + len(matched)
+    before_char = text[position - 1] if position > 0 else " "
+    after_char = text[end] if end < len(text) else " "
+    bounded = before_char in BOUNDARY_CHARS and after_char in BOUNDARY_CHARS
+
+    # Source-specific exclusions: emulsifiers, oils, chocolate, starch, malt, flavors, ...
+    reason = None
+    if source_name in SOY_SOURCES:
+        reason = _reject_soy(matched, position, text)
+    if reason is None and source_name in MILK_SOURCES:
+        reason = _reject_milk(matched, position, text)
+    if reason is None and source_name == "Dairy Trace Protein" and matched in ("butter", "beurre"):
+        reason = _reject_cocoa_butter(matched, position, text)
+    if reason is None and source_name == "Sunflower Seed Protein":
+        text_after = text[end:min(len(text), end + 15)].lstrip()
+        if text_after.startswith(("oil", "öl", "lecithin", "lezithin", "seed oil")):
+            reason = "Part of oil/lecithin, not protein source"
+    if reason is None and source_name in STARCH_SOURCES:
+        if any(term in text[max(0, position - 35):position] for term in STARCH_TERMS):
+            reason = "Part of starch, not protein source"
+    if reason is None and source_name in GLUTEN_SOURCES:
+        reason = _reject_gluten_free(matched, position, text)
+    if reason is None and source_name == "Corn Protein":
+        if any(term in text[max(0, position - 50):min(len(text), end + 10)] for term in CORN_CONTEXT_TERMS):
+            reason = "Part of fiber/starch context, not protein source"
+    if reason is None and source_name in MALT_SOURCES:
+        reason = _reject_malt(matched, position, text)
+    if reason is None and source_name in POULTRY_SOURCES:
+        context = text[max(0, position - 40):min(len(text), end + 20)]
+        pattern = next((p for p in FLAVOR_PATTERNS if p in context), None)
+        if pattern is not None:
+            reason = f"Part of flavor/aroma ({pattern}), not actual protein"
+    if reason is None and source_name in NUT_SOURCES:
+        reason = _reject_nut(matched, position, text)
+    if reason is None and source_name == "Lentil Protein":
+        if any(term in text[max(0, position - 5):min(len(text), end + 10)] for term in LINSEED_TERMS):
+            reason = "Part of linseed/flax, not lentil"
+    if reason is None:
+        reason = _reject_trace_warning(matched, position, text)
+    if reason is not None:
+        return False, reason
+
+    keyword_lower = keyword.lower()
+    # Generic terms only count as standalone words
+    if source_name in GENERIC_TERMS.get(keyword_lower, ()):
+        if not bounded:
+            context_before = text[max(0, position - 10):position]
+            context_after = text[end:end + 10]
+            full_context = context_before + matched + context_after
+            invalid_compounds = [prefix + keyword_lower for prefix in COMPOUND_PREFIXES]
+            invalid_compounds += [keyword_lower + suffix for suffix in COMPOUND_SUFFIXES]
+            for pattern in invalid_compounds:
+                if pattern in full_context:
+                    return False, f"Part of compound word '{pattern}'"
+            return False, "Generic term not at word boundary"
+        return True, None
+
+    if keyword_lower in SPECIFIC_TERMS or keyword_lower in GERMAN_BASE_WORDS:
+        return True, None
+
+    if position >= 5 and end + 5 <= len(text):
+        window = text[position - 5:end + 5]
+        for pattern in CORRUPTION_PATTERNS:
+            if pattern in window:
+                return False, f"Corrupted data pattern '{pattern}'"
+
+    if len(keyword) <= 4 and not bounded:
+        return False, "Short keyword not at word boundary"
+    return True, None
+
+
+def load_sources() -> list:
+    """The shared protein source table (name, pdcaas, qualityCategory, keywords, diaas, ...)."""
+    return load_data()["sources"]
+
+
+class ProteinEngine:
+    """analyzeProteinQuality over a protein source table, with the keyword regexes compiled once."""
+
+    def __init__(self, sources: list = None):
+        self.sources = load_sources() if sources is None else sources
+        self._patterns = {}
+        for source in self.sources:
+            for keyword in source["keywords"]:
+                if keyword not in self._patterns:
+                    escaped = re.escape(keyword)
+                    self._patterns[keyword] = (keyword.lower(), re.compile(r"\b" + escaped + r"\b"),
+                                               re.compile(escaped, re.IGNORECASE))
+
+    def _find(self, keyword: str, text: str):
+        """(position, matched text) of a keyword's first usable hit, like the Kotlin regex search."""
+        keyword_lower, bounded, partial = self._patterns[keyword]
+        if keyword_lower not in text:
+            return None
+        match = bounded.search(text)
+        if match is None and len(keyword) > 3:
+            match = partial.search(text)
+            # A base keyword inside an isolate/protein compound leaves the match to the specific source
+            if match is not None and keyword_lower in PROTEIN_BASE_KEYWORDS:
+                full_word = text[word_start(text, match.start()):word_end(text, match.end())]
+                if any(suffix in full_word for suffix in PROTEIN_SUFFIXES):
+                    match = None
+        return None if match is None else (match.start(), match.group())
+
+    def find_matches(self, text: str) -> tuple[list, list]:
+        """([(source, keyword, position)] in table order, debug match dicts) for normalized text."""
+        matches = []
+        debug = []
+        matched_names = set()
+        for source in self.sources:
+            for keyword in source["keywords"]:
+                found = self._find(keyword, text)
+                if found is None:
+                    continue
+                position, matched = found
+                accepted, reason = is_valid_protein_match(keyword, matched, position, text, source["name"])
+                end = position + len(matched)
+                debug.append({
+                    "keyword": keyword,
+                    "protein_source_name": source["name"],
+                    "char_position": position,
+                    "matched_text": matched,
+                    "context_before": text[max(0, position - 15):position],
+                    "context_after": text[end:min(len(text), end + 15)],
+                    "was_accepted": accepted,
+                    "rejection_reason": reason,
+                })
+                if accepted:
+                    if source["name"] not in matched_names:
+                        matched_names.add(source["name"])
+                        matches.append((source, keyword, position))
+                    break
+        return matches, debug
+
+    def analyze(self, ingredients_text: str, protein_per_100g: float = None) -> dict:
+        """Score an ingredient text: weighted PDCAAS, quality label and the detected proteins."""
+        if not ingredients_text.strip():
+            return _analysis(0.0, "Unknown", 0.1, "No ingredients information available", None,
+                             ["No ingredients found"], [], [], "", [], False)
+
+        normalized = normalize(ingredients_text)
+        extracted, text = normalized.extracted, normalized.text
+        matches, debug = self.find_matches(text)
+        merged = merge_sub_ingredients(matches, text)
+        sorted_matches = sorted(merged, key=lambda m: m[2])
+
+        isolated_positions = [pos for source, _, pos in sorted_matches if source["name"] in ISOLATED_PROTEIN_NAMES]
+        has_isolated = bool(isolated_positions)
+        first_isolated = min(isolated_positions) if isolated_positions else sys.maxsize
+
+        filtered = []
+        detected = []
+        total_score = total_weight = 0.0
+        for index, (source, keyword, position) in enumerate(sorted_matches):
+            name = source["name"]
+            is_base = name in BASE_INGREDIENT_NAMES
+            if name in ISOLATED_PROTEIN_NAMES:
+                status = "ISOLATED ✓ (full weight toward PDCAAS)"
+            elif is_base and has_isolated:
+                status = "BASE ingredient → 0.1x weight (isolated proteins present)"
+            elif is_base:
+                status = "BASE ingredient (full weight - no isolated proteins found)"
+            else:
+                status = "OTHER"
+            filtered.append({"protein_name": name, "reason": status, "was_filtered": False})
+
+            purpose_built = any(word in keyword.lower() for word in PURPOSE_BUILT_KEYWORDS)
+            before_isolated = position < first_isolated
+            weight = ordinal_weight(index)
+            if "Trace" in name:
+                weight = 0.0
+            elif has_isolated and is_base and not purpose_built and not before_isolated:
+                weight *= BASE_WEIGHT_FACTOR
+            detected.append({
+                "name": name,
+                "pdcaas": source["pdcaas"],
+                "quality_category": source.get("qualityCategory", ""),
+                "diaas": source.get("diaas"),
+                "matched_keyword": keyword,
+                "position": index + 1,
+                "match_confidence": MATCH_CONFIDENCE,
+                "weight": weight,
+                "is_primary": not has_isolated or not is_base or purpose_built or before_isolated,
+            })
+            total_score += source["pdcaas"] * weight
+            total_weight += weight
+
+        weighted_pdcaas = round(total_score / total_weight * 100) / 100 if total_weight > 0 else 0.0
+        label = quality_label(weighted_pdcaas)
+        warnings = []
+        if any("collagen" in d["name"].lower() for d in detected):
+            warnings.append("Contains collagen - very low PDCAAS score, not ideal for muscle building")
+        if not detected:
+            warnings.append("No recognizable protein sources found")
+        effective = None
+        if protein_per_100g is not None:
+            effective = round(protein_per_100g * weighted_pdcaas * 10) / 10
+        return _analysis(weighted_pdcaas, label, 0.8 if detected else 0.1,
+                         f"{label} protein quality (PDCAAS: {weighted_pdcaas:.2f})", effective, warnings, detected,
+                         sorted(debug, key=lambda d: d["char_position"]), extracted, filtered, has_isolated)
+
+    def detect(self, ingredients_text: str) -> list:
+        """Names of the detected protein sources, as ProteinDetectionTest sees them."""
+        return [d["name"] for d in self.analyze(ingredients_text)["detected_proteins"]]
+
+
+def _analysis(weighted_pdcaas, label, confidence, feedback, effective, warnings, detected, debug, raw,
+              filtered, has_isolated) -> dict:
+    return {
+        "weighted_pdcaas": weighted_pdcaas,
+        "quality_label": label,
+        "confidence_score": confidence,
+        "feedback_text": feedback,
+        "effective_protein_per_100g": effective,
+        "warnings": warnings,
+        "detected_proteins": detected,
+        "debug_matches": debug,
+        "raw_ingredient_text": raw,
+        "filtered_proteins": filtered,
+        "has_isolated_protein": has_isolated,
+    }
+
+
+def paren_groups(text: str) -> list:
+    """(open, close) index of every balanced parenthesis pair, in order of the closing paren."""
+    groups = []
+    stack = []
+    for i, ch in enumerate(text):
+        if ch == "(":
+            stack.append(i)
+        elif ch == ")" and stack:
+            groups.append((stack.pop(), i))
+    return groups
+
+
+def merge_sub_ingredients(matches: list, text: str) -> list:
+    """Drop same-family sub-ingredients and merge parenthesized protein blends into one source."""
+    groups = paren_groups(text)
+
+    # "milk protein (casein, whey)": the parenthesized parts belong to the protein before them
+    sub_ingredients = set()
+    for idx, (source, _, position) in enumerate(matches):
+        containing = [g for g in groups if g[0] < position < g[1]]
+        if not containing:
+            continue
+        group_open = min(containing, key=lambda g: g[1] - g[0])[0]
+        for other_idx, (other, other_keyword, other_position) in enumerate(matches):
+            if other_idx == idx:
+                continue
+            other_end = other_position + len(other_keyword)
+            if other_end <= group_open and group_open - other_end < 20:
+                if _SUB_INGREDIENT_GAP.fullmatch(text[other_end:group_open]):
+                    family = PROTEIN_FAMILIES.get(other["name"])
+                    if family is not None and family == PROTEIN_FAMILIES.get(source["name"]):
+                        sub_ingredients.add(idx)
+                        break
+
+    # "protein blend (pea, rice)": one source with averaged PDCAAS in the first component's slot
+    blended = set()
+    blends = []
+    for group_open, group_close in groups:
+        in_group = [(idx, m) for idx, m in enumerate(matches)
+                    if idx not in sub_ingredients and group_open < m[2] < group_close]
+        if len(in_group) < 2:
+            continue
+        if not any(word in text[max(0, group_open - 30):group_open] for word in PROTEIN_BLEND_WORDS):
+            continue
+        components = sorted(in_group, key=lambda item: item[1][2])
+        sources = [m[0] for _, m in components]
+        names = [s["name"] for s in sources]
+        avg_pdcaas = sum(s["pdcaas"] for s in sources) / len(sources)
+        diaas = [s["diaas"] for s in sources if s.get("diaas") is not None]
+        limiting = []
+        for s in sources:
+            limiting += [a for a in s.get("limitingAminoAcids", []) if a not in limiting]
+        blend = {
+            "name": "Protein Blend: " + " + ".join(names),
+            "pdcaas": avg_pdcaas,
+            "qualityCategory": quality_label(avg_pdcaas),
+            "keywords": [],
+            "description": "Blend of " + ", ".join(names),
+            "diaas": int(sum(diaas) / len(diaas)) if diaas else None,
+            "limitingAminoAcids": limiting,
+            "digestionSpeed": "Medium",
+            "notes": "",
+        }
+        blends.append((blend, "blend", components[0][1][2]))
+        blended.update(idx for idx, _ in components)
+
+    return [m for idx, m in enumerate(matches) if idx not in sub_ingredients and idx not in blended] + blends
+
+
+_engine = None
+
+
+def get_engine() -> ProteinEngine:
+    """Shared engine over the default source table, built on first use."""
+    global _engine
+    if _engine is None:
+        _engine = ProteinEngine()
+    return _engine
+
+
+def analyze_protein_quality(ingredients_text: str, protein_per_100g: float = None) -> dict:
+    return get_engine().analyze(ingredients_text, protein_per_100g)
+
+
+def detect(ingredients_text: str) -> list:
+    return get_engine().detect(ingredients_text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score ingredient texts like ProteinDatabase.analyzeProteinQuality")
+    parser.add_argument("text", nargs="?", help="Ingredient text to analyze")
+    parser.add_argument("--protein", type=float, help="Protein per 100 g (for the effective protein)")
+    parser.add_argument("--corpus", nargs="*", metavar="SOURCE",
+                        help="Score corpus sources as NDJSON (default: test cases + all run folders)")
+    parser.add_argument("--debug", action="store_true", help="Include debug matches in the output")
+    parser.add_argument("-o", "--output", help="Write NDJSON to this file instead of stdout")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if args.corpus is None:
+        if args.text is None:
+            parser.error("give an ingredient text or --corpus")
+        analysis = engine.analyze(args.text, args.protein)
+        if not args.debug:
+            analysis.pop("debug_matches")
+        print(json.dumps(analysis, indent=2, ensure_ascii=False))
+        return
+
+    from corpus import iter_corpus
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for record in iter_corpus(args.corpus or None):
+            analysis = engine.analyze(record["ingredients"])
+            line = {
+                "id": record["id"],
+                "origin": record["origin"],
+                "weighted_pdcaas": analysis["weighted_pdcaas"],
+                "quality_label": analysis["quality_label"],
+                "proteins": [d["name"] for d in analysis["detected_proteins"]],
+            }
+            if args.debug:
+                line["debug_matches"] = analysis["debug_matches"]
+            out.write(json.dumps(line, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
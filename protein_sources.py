@@ -0,0 +1,280 @@
+"""
+Reader/editor for the proteinSources table in ProteinDatabase.kt
+
+Parses the `private val proteinSources = listOf(ProteinSource(...), ...)`
+declaration into plain dicts (name, pdcaas, qualityCategory, keywords, ...)
+and makes small structural edits to it: appending keywords to a source or
+appending whole ProteinSource entries. Edits only touch the keyword list or
+the end of the table, so comments and formatting elsewhere survive.
+
+Usage:
+    python protein_sources.py                  # summary of the table
+    python protein_sources.py --json           # the parsed table as JSON
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+PROTEIN_DB_FILE = PROJECT_ROOT / "app/src/main/java/com/proteinscannerandroid/ProteinDatabase.kt"
+
+TABLE_START = re.compile(r"\bval\s+proteinSources\s*=\s*listOf\(")
+SOURCE_START = re.compile(r"\bProteinSource\(")
+FIELD = re.compile(r"(\w+)\s*=\s*")
+STRING = re.compile(r'"((?:[^"\\]|\\.)*)"')
+COLLECTION_START = r"\bval\s+{name}\s*=\s*(listOf|setOf|mapOf)\("
+
+
+def _skip_literal(text: str, i: int) -> int:
+    """If a string or comment starts at i, return the index after it, else i."""
+    if text.startswith("//", i):
+        end = text.find("\n", i)
+        return len(text) if end < 0 else end
+    if text.startswith("/*", i):
+        end = text.find("*/", i + 2)
+        return len(text) if end < 0 else end + 2
+    if text[i] == '"':
+        j = i + 1
+        while j < len(text) and text[j] != '"':
+            j += 2 if text[j] == "\\" else 1
+        return j + 1
+    if text[i] == "'":
+        j = i + 1
+        while j < len(text) and text[j] != "'":
+            j += 2 if text[j] == "\\" else 1
+        return j + 1
+    return i
+
+
+def matching_paren(text: str, open_index: int) -> int:
+    """Index of the ')' closing the '(' at open_index, ignoring strings and comments."""
+    depth = 0
+    i = open_index
+    while i < len(text):
+        skipped = _skip_literal(text, i)
+        if skipped != i:
+            i = skipped
+            continue
+        if text[i] == "(":
+            depth += 1
+        elif text[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError("Unbalanced parentheses in Kotlin source")
+
+
+def table_span(text: str) -> tuple[int, int]:
+    """(start, end) of the proteinSources listOf(...) arguments."""
+    m = TABLE_START.search(text)
+    if not m:
+        raise ValueError("proteinSources table not found")
+    open_index = m.end() - 1
+    return open_index + 1, matching_paren(text, open_index)
+
+
+def source_spans(text: str) -> list:
+    """(start, end) of each ProteinSource(...) call in the table, end exclusive."""
+    start, end = table_span(text)
+    spans = []
+    i = start
+    while i < end:
+        skipped = _skip_literal(text, i)
+        if skipped != i:
+            i = skipped
+            continue
+        m = SOURCE_START.match(text, i)
+        if m:
+            close = matching_paren(text, m.end() - 1)
+            spans.append((i, close + 1))
+            i = close + 1
+            continue
+        i += 1
+    return spans
+
+
+def _strip_comments(text: str) -> str:
+    out = []
+    i = 0
+    while i < len(text):
+        skipped = _skip_literal(text, i)
+        if skipped != i:
+            if text[i] in "\"'":
+                out.append(text[i:skipped])
+            i = skipped
+            continue
+        out.append(text[i])
+        i += 1
+    return "".join(out)
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", lambda m: {"n": "\n", "t": "\t"}.get(m.group(1), m.group(1)), value)
+
+
+def _parse_value(raw: str):
+    raw = raw.strip()
+    if raw.startswith("listOf("):
+        return [_unescape(s) for s in STRING.findall(raw)]
+    if raw.startswith("emptyList("):
+        return []
+    if raw == "null":
+        return None
+    if raw.startswith('"'):
+        m = STRING.match(raw)
+        return _unescape(m.group(1)) if m else raw
+    try:
+        return int(raw)
+    except ValueError:
+        return float(raw)
+
+
+def _split_arguments(body: str) -> list:
+    """Top-level comma-separated arguments of a call body (comments already stripped)."""
+    args, depth, current, i = [], 0, [], 0
+    while i < len(body):
+        skipped = _skip_literal(body, i)
+        if skipped != i:
+            current.append(body[i:skipped])
+            i = skipped
+            continue
+        ch = body[i]
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            args.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+        i += 1
+    if "".join(current).strip():
+        args.append("".join(current))
+    return args
+
+
+def parse_source(call_text: str) -> dict:
+    """Named arguments of one ProteinSource(...) call as a dict."""
+    body = _strip_comments(call_text[call_text.index("(") + 1:-1])
+    source = {}
+    for arg in _split_arguments(body):
+        m = FIELD.match(arg.strip())
+        if m:
+            source[m.group(1)] = _parse_value(arg.strip()[m.end():])
+    return source
+
+
+def parse_protein_sources(text: str = None, path=PROTEIN_DB_FILE) -> list:
+    """The proteinSources table in declaration order."""
+    if text is None:
+        text = Path(path).read_text(encoding="utf-8")
+    return [parse_source(text[s:e]) for s, e in source_spans(text)]
+
+
+def parse_collection(text: str, name: str):
+    """A `val <name> = listOf/setOf/mapOf(...)` of string literals: a list, or a dict for mapOf.
+
+    Map values may be strings or listOf/setOf collections of strings (returned as lists).
+    """
+    m = re.search(COLLECTION_START.format(name=re.escape(name)), text)
+    if not m:
+        raise ValueError(f"Collection {name} not found")
+    body = _strip_comments(text[m.end():matching_paren(text, m.end() - 1)])
+    if m.group(1) != "mapOf":
+        return [_unescape(s) for s in STRING.findall(body)]
+    mapping = {}
+    for arg in _split_arguments(body):
+        key, _, value = arg.partition(" to ")
+        values = [_unescape(s) for s in STRING.findall(value)]
+        mapping[_unescape(STRING.search(key).group(1))] = values if re.match(r"\s*(listOf|setOf)\(", value) else values[0]
+    return mapping
+
+
+def _kotlin_string(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def add_keywords(text: str, name: str, keywords) -> str:
+    """Append keywords (those not already present) to the named source's keyword list."""
+    for start, end in source_spans(text):
+        call = text[start:end]
+        if parse_source(call).get("name") != name:
+            continue
+        existing = parse_source(call).get("keywords", [])
+        new = [k for k in keywords if k not in existing]
+        if not new:
+            return text
+        m = re.search(r"\bkeywords\s*=\s*(listOf|emptyList)\(", call)
+        close = matching_paren(call, m.end() - 1)
+        items = ", ".join(_kotlin_string(k) for k in new)
+        if m.group(1) == "emptyList":
+            call = call[:m.start(1)] + f"listOf({items})" + call[close + 1:]
+        else:
+            separator = ", " if existing else ""
+            call = call[:close] + separator + items + call[close:]
+        return text[:start] + call + text[end:]
+    raise KeyError(f"No ProteinSource named {name!r}")
+
+
+def append_sources(text: str, calls) -> str:
+    """Append ProteinSource(...) call texts at the end of the table."""
+    calls = list(calls)
+    if not calls:
+        return text
+    spans = source_spans(text)
+    last_end = spans[-1][1]
+    indent = "        "
+    addition = "".join(f",\n{indent}{call.strip()}" for call in calls)
+    return text[:last_end] + addition + text[last_end:]
+
+
+def keyword_additions(base_text: str, new_text: str) -> tuple[dict, list]:
+    """What new_text adds to base_text's table: ({source name: [keywords]}, [new ProteinSource call texts])."""
+    base = {s.get("name"): s for s in parse_protein_sources(base_text)}
+    added_keywords = {}
+    new_sources = []
+    for start, end in source_spans(new_text):
+        call = new_text[start:end]
+        source = parse_source(call)
+        name = source.get("name")
+        if name not in base:
+            new_sources.append(call)
+            continue
+        old_keywords = set(base[name].get("keywords", []))
+        added = [k for k in source.get("keywords", []) if k not in old_keywords]
+        if added:
+            added_keywords[name] = added
+    return added_keywords, new_sources
+
+
+def apply_additions(text: str, added_keywords: dict, new_sources: list) -> str:
+    """Apply keyword_additions() output to another version of the file."""
+    present = {s.get("name") for s in parse_protein_sources(text)}
+    for name, keywords in added_keywords.items():
+        if name in present:
+            text = add_keywords(text, name, keywords)
+    return append_sources(text, [c for c in new_sources if parse_source(c).get("name") not in present])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the proteinSources table of ProteinDatabase.kt")
+    parser.add_argument("--file", default=str(PROTEIN_DB_FILE))
+    parser.add_argument("--json", action="store_true", help="Print the parsed table as JSON")
+    args = parser.parse_args()
+
+    sources = parse_protein_sources(path=args.file)
+    if args.json:
+        print(json.dumps(sources, indent=2, ensure_ascii=False))
+        return
+    keywords = sum(len(s.get("keywords", [])) for s in sources)
+    print(f"{len(sources)} protein sources, {keywords} keywords")
+    for source in sources:
+        print(f"  {source.get('name')}: PDCAAS {source.get('pdcaas')}, {len(source.get('keywords', []))} keywords")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,37 @@ Pre-fetches 100 products from OpenFoodFacts, then creates a run folder
 for iterative training of the protein detection algorithm.
 """
 
+import argparse
+import sys
+import asyncio
 import json
-import requests
 import time
 import random
 from pathlib import Path
 from datetime import datetime
 
+from barcode_index import get_barcode_index
+from case_log import get_case_log
+from near_duplicates import DEFAULT_THRESHOLD as NEAR_DUPLICATE_THRESHOLD, filter_near_duplicates
+from off_cache import get_cache
+from off_fetcher import CategoryFetcher, DEFAULT_CONCURRENCY, DEFAULT_RATE, SEARCH_FIELDS, product_from_search
+from product_selector import local_candidates, select_products
+from product_store import ProductStore
+from run_checkpoint import AUTO, DONE, FAILED, FINISHED, PENDING, RunCheckpoint, case_id_for
+from run_products import (DEFAULT_NAME as PRODUCTS_FILE_NAME, find_products_file, iter_products, product_at,
+                          write_products)
+from triage import ACCEPT, auto_case, triage_product, triage_products
+
 PROJECT_ROOT = Path(__file__).parent
 RUNS_DIR = PROJECT_ROOT / "runs"
 ARCHIVED_DIR = PROJECT_ROOT / "runs_archived"
 
+PRODUCTS_PER_RUN = 100
+# Extra products fetched so that dropped near-duplicates can be replaced
+NEAR_DUPLICATE_HEADROOM = 25
+# Candidates per run slot the coverage selector chooses from
+COVERAGE_POOL_FACTOR = 3
+
 
 def archive_old_runs():
     """Move ALL existing runs to archived folder to prevent confusion.
@@ -69,90 +89,46 @@ PROTEIN_CATEGORIES = [
 ]
 
 
-def fetch_products_by_category(category: str, count: int = 20) -> list:
-    """Fetch products from a specific category."""
-    products = []
-    try:
-        params = {
-            "action": "process",
-            "tagtype_0": "categories",
-            "tag_contains_0": "contains",
-            "tag_0": category,
-            "sort_by": "random",
-            "page_size": count,
-            "json": 1,
-            "fields": "code,product_name,ingredients_text,brands"
-        }
-
-        response = requests.get(SEARCH_URL, params=params, timeout=30)
-        if response.status_code == 200:
-            data = response.json()
-            for product in data.get("products", []):
-                if product.get("ingredients_text") and len(product["ingredients_text"]) > 20:
-                    products.append({
-                        "barcode": product.get("code", "unknown"),
-                        "name": product.get("product_name", "Unknown Product"),
-                        "brand": product.get("brands", ""),
-                        "ingredients": product.get("ingredients_text", ""),
-                        "category": category
-                    })
-    except Exception as e:
-        print(f"  Error fetching {category}: {e}")
-
-    return products
-
-
-def fetch_100_products() -> list:
-    """Fetch ~100 products from various categories."""
-    all_products = []
-    seen_barcodes = set()
+def fetch_100_products(concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE,
+                       target: int = PRODUCTS_PER_RUN) -> list:
+    """Fetch ~100 (`target`) products from various categories.
 
+    Category pages are fetched concurrently (at most `concurrency` in flight,
+    `rate` requests per second) and fetching stops as soon as `target` unique
+    products are in. Barcodes that already have a test case or were in a run
+    do not count.
+    """
     print("Fetching products from OpenFoodFacts...")
 
     # Shuffle categories and fetch from each
     categories = PROTEIN_CATEGORIES.copy()
     random.shuffle(categories)
 
-    for category in categories:
-        if len(all_products) >= 100:
-            break
-
-        print(f"  Fetching from {category}...")
-        products = fetch_products_by_category(category, count=15)
-
-        for p in products:
-            if p["barcode"] not in seen_barcodes and len(all_products) < 100:
-                seen_barcodes.add(p["barcode"])
-                all_products.append(p)
-
-        time.sleep(1)  # Be nice to the API
+    fetcher = CategoryFetcher(SEARCH_URL, concurrency=concurrency, rate=rate, session=get_cache(),
+                              exclude_barcodes=get_barcode_index().barcodes())
+    all_products = asyncio.run(fetcher.fetch(categories, target=target, page_size=15))
+    seen_barcodes = fetcher.seen_barcodes
 
     # If we don't have enough, try random search
-    if len(all_products) < 100:
+    if len(all_products) < target:
         print(f"  Only got {len(all_products)}, trying random search...")
         try:
             params = {
                 "action": "process",
                 "sort_by": "random",
-                "page_size": 100 - len(all_products),
+                "page_size": target - len(all_products),
                 "json": 1,
-                "fields": "code,product_name,ingredients_text,brands"
+                "fields": SEARCH_FIELDS
             }
-            response = requests.get(SEARCH_URL, params=params, timeout=30)
+            response = fetcher.session.get(SEARCH_URL, params=params, timeout=30)
             if response.status_code == 200:
                 data = response.json()
                 for product in data.get("products", []):
-                    if (product.get("ingredients_text") and
-                        len(product["ingredients_text"]) > 20 and
-                        product.get("code") not in seen_barcodes):
-                        all_products.append({
-                            "barcode": product.get("code", "unknown"),
-                            "name": product.get("product_name", "Unknown Product"),
-                            "brand": product.get("brands", ""),
-                            "ingredients": product.get("ingredients_text", ""),
-                            "category": "random"
-                        })
-                        if len(all_products) >= 100:
+                    record = product_from_search(product, "random")
+                    if record is not None and record["barcode"] not in seen_barcodes:
+                        seen_barcodes.add(record["barcode"])
+                        all_products.append(record)
+                        if len(all_products) >= target:
                             break
         except Exception as e:
             print(f"  Random search error: {e}")
@@ -173,15 +149,17 @@ If you see other run folders in the `runs/` directory, IGNORE THEM completely.
 
 ---
 
-## CRITICAL RULE - UPDATE HISTORY.MD AFTER EVERY PRODUCT
+## CRITICAL RULE - RECORD EVERY PRODUCT IN THE CHECKPOINT
+
+Progress lives in `{run_folder}/checkpoint.json`. Never edit it or HISTORY.md by hand;
+HISTORY.md is regenerated from the checkpoint automatically.
 
-**BEFORE you process another product, you MUST update HISTORY.md with:**
-1. The product name and barcode
-2. What proteins you expected vs detected
-3. Whether tests passed or failed
-4. Any fixes you made to the algorithm
+**BEFORE you process another product, you MUST record the finished one:**
+```
+python ralph_loop.py done <index> --tests PASS|FAIL --proteins "<Protein A>, <Protein B>" --fixes "<fix or empty>"
+```
 
-Pattern: ANALYZE -> ADD TEST -> RUN TESTS -> FIX IF NEEDED -> **LOG TO HISTORY.MD** -> repeat
+Pattern: NEXT -> ANALYZE -> ADD TEST -> RUN TESTS -> FIX IF NEEDED -> **DONE** -> repeat
 
 ---
 
@@ -190,21 +168,27 @@ Pattern: ANALYZE -> ADD TEST -> RUN TESTS -> FIX IF NEEDED -> **LOG TO HISTORY.M
 You are training the protein detection algorithm by processing {product_count} pre-fetched products.
 
 ### Files Location
-- **Products file**: `{run_folder}/products.json` (100 products to process)
-- **History file**: `{run_folder}/HISTORY.md` (your progress log)
-- **Test cases**: `app/src/test/resources/protein_test_cases.json`
+- **Products file**: `{run_folder}/{PRODUCTS_FILE_NAME}` ({product_count} products, compressed; use `python ralph_loop.py next` to read them)
+- **Checkpoint**: `{run_folder}/checkpoint.json` (progress, managed by `ralph_loop.py`)
+- **History file**: `{run_folder}/HISTORY.md` (rendered from the checkpoint, read-only)
+- **Test cases**: `app/src/test/resources/protein_test_cases.json` (never edit it by hand: record cases with
+  `python case_log.py put`, they are folded into the JSON before each test run)
 - **Algorithm**: `app/src/main/java/com/proteinscannerandroid/ProteinDatabase.kt`
 
 ### For Each Product:
 
-1. **Read** the product from products.json (process in order, check HISTORY.md for last processed index)
+1. **Get** the next product: `python ralph_loop.py next`
+   (prints its index and data; already evaluated products are skipped automatically, and products the
+   detector handles without doubt were already added as test cases by triage)
+   - `detection` shows what the current detector finds and `reasons` why the product needs your review
 
 2. **Analyze** the ingredients:
    - Identify actual protein sources (soy, milk, eggs, meat, nuts, legumes, grains, etc.)
    - Identify NON-protein mentions (trace warnings, lecithin, oils, starch)
    - Consider all three languages: English, German, French
 
-3. **Add Test Case** to `protein_test_cases.json`:
+3. **Add Test Case**: write it to `case.json` and record it with `python case_log.py put case.json`
+   (the same command replaces an existing case with the same id):
    ```json
    {{
      "id": "off_<barcode>",
@@ -218,7 +202,8 @@ You are training the protein detection algorithm by processing {product_count} p
    }}
    ```
 
-4. **Run Tests**: `gradlew.bat :app:testDebugUnitTest`
+4. **Run Tests**: `python gradle_runner.py`
+   (folds the recorded cases into protein_test_cases.json, then runs :app:testDebugUnitTest on the warm daemon)
 
 5. **If Tests Fail**:
    - Read the failure message
@@ -226,7 +211,9 @@ You are training the protein detection algorithm by processing {product_count} p
    - Consider: does this fix need to be applied in all 3 languages?
    - Run tests again until they pass
 
-6. **Update HISTORY.md** with results
+6. **Record** the result: `python ralph_loop.py done <index> --tests PASS --proteins "..." --fixes "..."`
+   - Use `--failed` instead if the product cannot be evaluated
+   - Log algorithm changes with `python ralph_loop.py improve "<change>" --language EN/DE/FR --reason "..."`
 
 7. **Repeat** for next product
 
@@ -261,19 +248,65 @@ When ALL products are processed and tests pass, output:
 
 ## MANDATORY WORKFLOW
 
-**STEP 1: READ** - Check HISTORY.md for last processed product index
-**STEP 2: GET** - Read next product from products.json
+**STEP 1: NEXT** - Run `python ralph_loop.py next` (prints ALL_PRODUCTS_DONE when finished)
+**STEP 2: GET** - Use the product it printed
 **STEP 3: ANALYZE** - Determine expected_detected and expected_not_detected
-**STEP 4: ADD** - Add test case to protein_test_cases.json
-**STEP 5: TEST** - Run gradlew.bat :app:testDebugUnitTest
-**STEP 6: FIX** - If tests fail, fix ProteinDatabase.kt and re-test
-**STEP 7: LOG** - Update HISTORY.md IMMEDIATELY (BLOCKING!)
+**STEP 4: ADD** - Write the test case to case.json, run `python case_log.py put case.json`
+**STEP 5: TEST** - Run `python gradle_runner.py`
+**STEP 6: FIX** - If tests fail, fix ProteinDatabase.kt, run `python protein_data.py generate` and re-test
+**STEP 7: LOG** - Run `python ralph_loop.py done <index> ...` IMMEDIATELY (BLOCKING!)
 **STEP 8: DECIDE** - All done? -> output promise, More products? -> STEP 1
 """
 
 
-def create_new_run() -> Path:
-    """Create a new run folder with pre-fetched products."""
+def coverage_candidates(concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE) -> list:
+    """Candidates for coverage selection: local products without a test case, topped up from OpenFoodFacts."""
+    candidates = local_candidates()
+    wanted = PRODUCTS_PER_RUN * COVERAGE_POOL_FACTOR
+    print(f"{len(candidates)} local candidate products")
+    if len(candidates) < wanted:
+        barcodes = {p.get("barcode") for p in candidates}
+        fetched = fetch_100_products(concurrency=concurrency, rate=rate, target=wanted - len(candidates))
+        candidates += [p for p in fetched if p["barcode"] not in barcodes]
+    return candidates
+
+
+def triage_run(checkpoint: RunCheckpoint) -> int:
+    """Auto-accept the pending products the detector handles uncontroversially; returns how many."""
+    pending = [entry["index"] for entry in checkpoint.products if entry["status"] == PENDING]
+    if not pending:
+        return 0
+    products = list(iter_products(checkpoint.run_dir))
+    results = triage_products([products[index] for index in pending])
+    case_log = get_case_log()
+    accepted = 0
+    for index, result in zip(pending, results):
+        if result["decision"] != ACCEPT:
+            continue
+        case_log.add(auto_case(products[index], result))
+        checkpoint.finish(index, AUTO, proteins=result["detected"])
+        accepted += 1
+    if accepted:
+        with ProductStore() as store:
+            store.sync_case_log()
+    return accepted
+
+
+def create_new_run(concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE,
+                   near_duplicate_threshold: float = NEAR_DUPLICATE_THRESHOLD, select: str = "coverage",
+                   triage: bool = True) -> Path:
+    """Create a new run folder with pre-fetched products.
+
+    With select="coverage" the run is filled greedily with the candidates
+    that add the most test coverage (product_selector); "random" keeps the
+    random category products. Products whose ingredients are near-identical
+    to an existing test case or to another candidate are dropped
+    (near_duplicate_threshold >= 1 keeps everything); they only fill up a run
+    that would otherwise be short, at the end. Barcodes that already have a
+    test case or were in an earlier run are never included. With `triage`,
+    products the detector handles uncontroversially are recorded as test
+    cases right away (status auto) and only the rest is left for the agent.
+    """
     RUNS_DIR.mkdir(parents=True, exist_ok=True)
 
     date_str = datetime.now().strftime("%Y%m%d")
@@ -288,36 +321,142 @@ def create_new_run() -> Path:
     folder_path.mkdir(parents=True)
 
     # Fetch products
-    products = fetch_100_products()
-
-    # Save products.json
-    products_file = folder_path / "products.json"
-    with open(products_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            "fetched_at": datetime.now().isoformat(),
-            "count": len(products),
-            "products": products
-        }, f, indent=2, ensure_ascii=False)
-
-    # Create HISTORY.md
-    history_file = folder_path / "HISTORY.md"
-    with open(history_file, 'w', encoding='utf-8') as f:
-        f.write(f"# Protein Detection Training - Run {folder_name}\n\n")
-        f.write(f"Started: {datetime.now()}\n")
-        f.write(f"Products to process: {len(products)}\n\n")
-        f.write("## Progress Tracker\n\n")
-        f.write("| # | Product | Proteins Found | Tests | Fixes Made |\n")
-        f.write("|---|---------|---------------|-------|------------|\n\n")
-        f.write("## Algorithm Improvements\n\n")
-        f.write("| Iteration | Change | Language | Reason |\n")
-        f.write("|-----------|--------|----------|--------|\n\n")
-        f.write("## Iteration Log\n\n")
-        f.write("### Last Processed Index: 0\n\n")
+    if select == "coverage":
+        products = coverage_candidates(concurrency=concurrency, rate=rate)
+    elif near_duplicate_threshold < 1:
+        products = fetch_100_products(concurrency=concurrency, rate=rate,
+                                      target=PRODUCTS_PER_RUN + NEAR_DUPLICATE_HEADROOM)
+    else:
+        products = fetch_100_products(concurrency=concurrency, rate=rate)
+
+    # The sources skip known barcodes already; this also covers cases added while fetching
+    known = get_barcode_index()
+    products = [p for p in products if p["barcode"] not in known]
+
+    near_duplicates = []
+    if near_duplicate_threshold < 1:
+        products, near_duplicates = filter_near_duplicates(products, threshold=near_duplicate_threshold)
+        print(f"Dropped {len(near_duplicates)} near-duplicate products")
+    if select == "coverage":
+        products = select_products(products, PRODUCTS_PER_RUN)
+        print(f"Selected {len(products)} products by coverage")
+    # Near-duplicates only fill up a run that would otherwise be short, at the end
+    products = products[:PRODUCTS_PER_RUN] + near_duplicates[:max(0, PRODUCTS_PER_RUN - len(products))]
+
+    # Save products (header record + one product per line)
+    products_file = write_products(folder_path / PRODUCTS_FILE_NAME, products,
+                                   fetched_at=datetime.now().isoformat(), count=len(products))
+
+    # Index the run's products (barcode, category, run id) in the local store
+    with ProductStore() as store:
+        store.sync_run(products_file)
+
+    # Checkpoint (source of truth for progress) and HISTORY.md rendered from it
+    checkpoint = RunCheckpoint.create(folder_path, products)
+    checkpoint.skip_evaluated(get_case_log().ids(), get_barcode_index().case_barcodes())
+    if triage:
+        accepted = triage_run(checkpoint)
+        print(f"Triage: {accepted} products auto-accepted, "
+              f"{sum(1 for e in checkpoint.products if e['status'] == PENDING)} left for the agent")
+    checkpoint.commit()
 
     return folder_path, len(products)
 
 
-if __name__ == "__main__":
+def current_run_dir() -> Path:
+    """The active run folder (latest in runs/)."""
+    runs = sorted(p for p in RUNS_DIR.glob("*") if find_products_file(p)) if RUNS_DIR.exists() else []
+    if not runs:
+        sys.exit("No run folder in runs/ - create one with: python ralph_loop.py")
+    return runs[-1]
+
+
+def load_checkpoint(run=None) -> RunCheckpoint:
+    run_dir = Path(run) if run else current_run_dir()
+    checkpoint = RunCheckpoint.load(run_dir)
+    # Products whose test case was added in the meantime (other runs, parallel workers) need no work
+    checkpoint.skip_evaluated(get_case_log().ids(), get_barcode_index().case_barcodes())
+    return checkpoint
+
+
+def write_prompt(run_folder: Path, product_count: int) -> Path:
+    prompt_file = PROJECT_ROOT / "PROMPT.md"
+    with open(prompt_file, 'w', encoding='utf-8') as f:
+        f.write(get_prompt_template(str(run_folder.relative_to(PROJECT_ROOT)), product_count))
+    return prompt_file
+
+
+def cmd_next(args):
+    """Hand out the first unprocessed product and mark it in progress."""
+    # Fold cases recorded since the last test run (triage, parallel workers) into the canonical JSON
+    get_case_log().compact()
+    checkpoint = load_checkpoint(args.run)
+    index = checkpoint.next_index()
+    if index is None:
+        checkpoint.commit()
+        print("ALL_PRODUCTS_DONE")
+        return
+    checkpoint.start(index)
+    checkpoint.commit()
+    product = product_at(checkpoint.run_dir, index)
+    remaining = sum(1 for e in checkpoint.products if e["status"] not in FINISHED)
+    # The current detector's result and why the product was not auto-accepted
+    result = triage_product(product)
+    detection = {key: result[key] for key in ("reasons", "detected", "not_detected", "matcher_detected")}
+    print(json.dumps({"index": index, "remaining": remaining, "test_case_id": case_id_for(product.get("barcode")),
+                      "product": product, "detection": detection}, indent=2, ensure_ascii=False))
+
+
+def cmd_done(args):
+    checkpoint = load_checkpoint(args.run)
+    proteins = [p.strip() for p in (args.proteins or "").split(",") if p.strip()]
+    entry = checkpoint.finish(args.index, FAILED if args.failed else DONE, args.tests, proteins, args.fixes)
+    checkpoint.commit()
+    next_index = checkpoint.next_index()
+    print(f"Recorded #{entry['index']} {entry['name']}: {entry['status']}"
+          f" - next: {'none (all products processed)' if next_index is None else next_index}")
+
+
+def cmd_improve(args):
+    checkpoint = load_checkpoint(args.run)
+    checkpoint.add_improvement(args.change, args.language, args.reason)
+    checkpoint.commit()
+    print(f"Recorded improvement: {args.change}")
+
+
+def cmd_triage(args):
+    """Auto-accept the pending products of a run the current detector handles uncontroversially."""
+    checkpoint = load_checkpoint(args.run)
+    accepted = triage_run(checkpoint)
+    checkpoint.commit()
+    print(f"Auto-accepted {accepted} products, "
+          f"{sum(1 for e in checkpoint.products if e['status'] == PENDING)} left for the agent")
+
+
+def cmd_status(args):
+    checkpoint = load_checkpoint(args.run)
+    checkpoint.commit()
+    counts = checkpoint.counts()
+    print(f"Run {checkpoint.data['run_id']}: " + ", ".join(f"{n} {status}" for status, n in counts.items()))
+    next_index = checkpoint.next_index()
+    print(f"Next product index: {'none (complete)' if next_index is None else next_index}")
+
+
+def cmd_resume(args):
+    """Continue the current run: refresh its checkpoint, HISTORY.md and PROMPT.md without fetching."""
+    checkpoint = load_checkpoint(args.run)
+    checkpoint.commit()
+    prompt_file = write_prompt(checkpoint.run_dir, len(checkpoint.products))
+    next_index = checkpoint.next_index()
+    print(f"Resuming {checkpoint.run_dir.name} at product {next_index} "
+          f"({sum(checkpoint.counts()[s] for s in ('pending', 'in_progress'))} remaining)")
+    print(f"Prompt saved to: {prompt_file}")
+
+
+def cmd_new(args):
+    if args.offline:
+        get_cache().offline = True
+
     print("=" * 60)
     print("Ralph Wiggum Loop - Protein Detection Training")
     print("=" * 60)
@@ -330,16 +469,58 @@ if __name__ == "__main__":
     else:
         print("No completed runs to archive")
 
-    run_folder, product_count = create_new_run()
-    rel_path = run_folder.relative_to(PROJECT_ROOT)
+    run_folder, product_count = create_new_run(concurrency=args.concurrency, rate=args.rate,
+                                               near_duplicate_threshold=args.near_duplicate_threshold,
+                                               select=args.select, triage=not args.no_triage)
 
     # Save PROMPT.md
-    prompt_file = PROJECT_ROOT / "PROMPT.md"
-    with open(prompt_file, 'w', encoding='utf-8') as f:
-        f.write(get_prompt_template(str(rel_path), product_count))
+    prompt_file = write_prompt(run_folder, product_count)
 
     print(f"\nCreated run folder: {run_folder.name}")
     print(f"Products fetched: {product_count}")
     print(f"Prompt saved to: {prompt_file}")
     print(f"\nTo start the loop, run:")
     print(f'  /ralph-loop "Read PROMPT.md and follow all instructions." --max-iterations 150 --completion-promise "TRAINING COMPLETE"')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and track Ralph Wiggum training runs")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Category pages fetched in parallel")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="Maximum OpenFoodFacts requests per second")
+    parser.add_argument("--offline", action="store_true", help="Serve OpenFoodFacts responses from the local cache only")
+    parser.add_argument("--select", choices=("coverage", "random"), default="coverage",
+                        help="Fill the run with the products adding the most test coverage, or random ones")
+    parser.add_argument("--no-triage", action="store_true",
+                        help="Hand every product to the agent instead of auto-accepting uncontroversial ones")
+    parser.add_argument("--near-duplicate-threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD,
+                        help="Drop products at least this similar to a test case or another product (1 = keep all)")
+    parser.set_defaults(func=cmd_new)
+    sub = parser.add_subparsers(dest="command", help="Without a command a new run is created")
+
+    run_arg = argparse.ArgumentParser(add_help=False)
+    run_arg.add_argument("--run", help="Run folder (default: latest in runs/)")
+
+    sub.add_parser("next", parents=[run_arg], help="Print the next unprocessed product").set_defaults(func=cmd_next)
+    done = sub.add_parser("done", parents=[run_arg], help="Record the outcome of a product")
+    done.add_argument("index", type=int)
+    done.add_argument("--tests", choices=("PASS", "FAIL"), help="Test outcome after adding the case")
+    done.add_argument("--proteins", help="Comma-separated proteins found")
+    done.add_argument("--fixes", default="", help="Algorithm fixes made for this product")
+    done.add_argument("--failed", action="store_true", help="Product could not be evaluated")
+    done.set_defaults(func=cmd_done)
+    improve = sub.add_parser("improve", parents=[run_arg], help="Record an algorithm improvement")
+    improve.add_argument("change")
+    improve.add_argument("--language", default="")
+    improve.add_argument("--reason", default="")
+    improve.set_defaults(func=cmd_improve)
+    sub.add_parser("triage", parents=[run_arg],
+                   help="Auto-accept pending products the detector handles uncontroversially").set_defaults(
+        func=cmd_triage)
+    sub.add_parser("status", parents=[run_arg], help="Show run progress").set_defaults(func=cmd_status)
+    sub.add_parser("resume", parents=[run_arg],
+                   help="Continue the current run (refresh PROMPT.md, no fetching)").set_defaults(func=cmd_resume)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,212 @@
+"""
+Structured checkpoints for ralph training runs
+
+Each run folder keeps a checkpoint.json next to its products file with one entry
+per product: status, start/finish time and test outcome. It is the source of
+truth for progress; HISTORY.md is rendered from it after every update.
+
+Statuses:
+    pending       not looked at yet
+    in_progress   handed out by next(), not finished
+    done          evaluated, test case added
+    auto          accepted by triage: the detector's result was added as the test case
+    skipped       already evaluated elsewhere (its test case exists)
+    failed        could not be evaluated
+
+Resuming picks the first product that is pending (or was left in_progress),
+so no product is processed twice and none is left behind.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from run_products import iter_products, read_header
+
+CHECKPOINT_NAME = "checkpoint.json"
+HISTORY_NAME = "HISTORY.md"
+# Hand-written HISTORY.md of runs that predate checkpoints is kept under this name
+LEGACY_HISTORY_NAME = "HISTORY.legacy.md"
+GENERATED_MARKER = "<!-- Generated from checkpoint.json"
+
+PENDING, IN_PROGRESS, DONE, AUTO, SKIPPED, FAILED = "pending", "in_progress", "done", "auto", "skipped", "failed"
+FINISHED = (DONE, AUTO, SKIPPED, FAILED)
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def case_id_for(barcode) -> str:
+    """Test case id the ralph prompt uses for a run product."""
+    return f"off_{barcode}"
+
+
+class RunCheckpoint:
+    """Per-product progress of one run folder."""
+
+    def __init__(self, run_dir, data: dict):
+        self.run_dir = Path(run_dir)
+        self.data = data
+
+    @property
+    def path(self) -> Path:
+        return self.run_dir / CHECKPOINT_NAME
+
+    @property
+    def products(self) -> list:
+        return self.data["products"]
+
+    @classmethod
+    def create(cls, run_dir, products: list, started_at: str = None) -> "RunCheckpoint":
+        entries = [{
+            "index": i,
+            "barcode": p.get("barcode", "unknown"),
+            "name": p.get("name", ""),
+            "status": PENDING,
+            "started_at": None,
+            "finished_at": None,
+            "seconds": None,
+            "tests": None,
+            "proteins": [],
+            "fixes": "",
+        } for i, p in enumerate(products)]
+        data = {
+            "run_id": Path(run_dir).name,
+            "started_at": started_at or _now(),
+            "updated_at": _now(),
+            "products": entries,
+            "improvements": [],
+        }
+        return cls(run_dir, data)
+
+    @classmethod
+    def load(cls, run_dir) -> "RunCheckpoint":
+        """Load a run's checkpoint, creating one from the products file for older runs."""
+        run_dir = Path(run_dir)
+        path = run_dir / CHECKPOINT_NAME
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(run_dir, json.load(f))
+        header = read_header(run_dir)
+        checkpoint = cls.create(run_dir, iter_products(run_dir), started_at=header.get("fetched_at"))
+        history = run_dir / HISTORY_NAME
+        if history.exists() and GENERATED_MARKER not in history.read_text(encoding="utf-8"):
+            history.rename(run_dir / LEGACY_HISTORY_NAME)
+        checkpoint.save()
+        return checkpoint
+
+    def save(self):
+        self.data["updated_at"] = _now()
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    # --- progress -----------------------------------------------------------
+
+    def skip_evaluated(self, known_case_ids, known_barcodes=()) -> int:
+        """Mark pending products whose test case already exists (by off_ id or by barcode) as skipped."""
+        skipped = 0
+        for entry in self.products:
+            if entry["status"] == PENDING and (case_id_for(entry["barcode"]) in known_case_ids
+                                               or str(entry["barcode"]) in known_barcodes):
+                entry["status"] = SKIPPED
+                entry["finished_at"] = _now()
+                skipped += 1
+        return skipped
+
+    def next_index(self):
+        """Index of the first product still to process (in_progress ones are resumed), or None."""
+        for entry in self.products:
+            if entry["status"] not in FINISHED:
+                return entry["index"]
+        return None
+
+    def start(self, index: int) -> dict:
+        entry = self.products[index]
+        entry["status"] = IN_PROGRESS
+        entry["started_at"] = _now()
+        return entry
+
+    def finish(self, index: int, status=DONE, tests=None, proteins=(), fixes="") -> dict:
+        entry = self.products[index]
+        entry["status"] = status
+        entry["finished_at"] = _now()
+        if entry["started_at"]:
+            started = datetime.fromisoformat(entry["started_at"])
+            entry["seconds"] = (datetime.fromisoformat(entry["finished_at"]) - started).total_seconds()
+        entry["tests"] = tests
+        entry["proteins"] = list(proteins)
+        entry["fixes"] = fixes or ""
+        return entry
+
+    def add_improvement(self, change: str, language: str = "", reason: str = ""):
+        self.data["improvements"].append({"change": change, "language": language, "reason": reason, "at": _now()})
+
+    def counts(self) -> dict:
+        counts = {status: 0 for status in (PENDING, IN_PROGRESS, DONE, AUTO, SKIPPED, FAILED)}
+        for entry in self.products:
+            counts[entry["status"]] += 1
+        return counts
+
+    def is_complete(self) -> bool:
+        return self.next_index() is None
+
+    # --- HISTORY.md ---------------------------------------------------------
+
+    def render_history(self) -> str:
+        counts = self.counts()
+        total = len(self.products)
+        next_index = self.next_index()
+        lines = [
+            f"# Protein Detection Training - Run {self.data['run_id']}",
+            "",
+            f"{GENERATED_MARKER} by ralph_loop.py - do not edit by hand -->",
+            "",
+            f"Started: {self.data['started_at']}",
+            f"Updated: {self.data['updated_at']}",
+            f"Products to process: {total}",
+            f"Progress: {counts[DONE]} done, {counts[AUTO]} auto-accepted, {counts[SKIPPED]} skipped, "
+            f"{counts[FAILED]} failed, "
+            f"{counts[PENDING] + counts[IN_PROGRESS]} remaining",
+            "",
+            "## Progress Tracker",
+            "",
+            "| # | Product | Proteins Found | Tests | Fixes Made | Time |",
+            "|---|---------|---------------|-------|------------|------|",
+        ]
+        for entry in self.products:
+            if entry["status"] == PENDING:
+                continue
+            proteins = ", ".join(entry["proteins"]) or (
+                "None" if entry["status"] in (DONE, AUTO) else f"({entry['status']})")
+            seconds = f"{entry['seconds']:.0f}s" if entry["seconds"] is not None else "-"
+            lines.append(f"| {entry['index']} | {entry['name']} ({entry['barcode']}) | {proteins} | "
+                         f"{entry['tests'] or '-'} | {entry['fixes'] or '-'} | {seconds} |")
+        lines += [
+            "",
+            "## Algorithm Improvements",
+            "",
+            "| Iteration | Change | Language | Reason |",
+            "|-----------|--------|----------|--------|",
+        ]
+        for i, improvement in enumerate(self.data["improvements"], 1):
+            lines.append(f"| {i} | {improvement['change']} | {improvement['language'] or '-'} | "
+                         f"{improvement['reason'] or '-'} |")
+        lines += ["", "## Iteration Log", ""]
+        if next_index is None:
+            lines.append("### Next Product Index: none (ALL COMPLETE)")
+        else:
+            lines.append(f"### Next Product Index: {next_index}")
+        return "\n".join(lines) + "\n"
+
+    def write_history(self):
+        with open(self.run_dir / HISTORY_NAME, "w", encoding="utf-8") as f:
+            f.write(self.render_history())
+
+    def commit(self):
+        """Save the checkpoint and re-render HISTORY.md from it."""
+        self.save()
+        self.write_history()
@@ -0,0 +1,216 @@
+"""
+Streaming storage for run products
+
+Run folders store their products as newline-delimited JSON, optionally
+gzip- or zstd-compressed (zstd needs the optional `zstandard` module). The
+first line is a header record, every following line one product:
+
+    {"type": "header", "format": "run-products", "version": 1, "fetched_at": ..., "count": 3}
+    {"barcode": ..., "name": ..., "brand": ..., "ingredients": ..., "category": ...}
+    ...
+
+Products are read and written one at a time, so memory use does not depend
+on the size of a run. Run folders written before this format (a single
+indented products.json) are read through the same functions.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .zst runs
+    zstandard = None
+
+FORMAT_NAME = "run-products"
+FORMAT_VERSION = 1
+
+LEGACY_NAME = "products.json"
+# Lookup order when a run folder is given instead of a file
+PRODUCT_FILE_NAMES = ("products.ndjson.zst", "products.ndjson.gz", "products.ndjson", LEGACY_NAME)
+DEFAULT_NAME = "products.ndjson.gz"
+
+
+def _open(path: Path, mode: str, suffix: str = None):
+    """Open a products file as text, (de)compressing by suffix (default: the path's own)."""
+    suffix = suffix or path.suffix
+    if suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError("zstd-compressed products files need the optional 'zstandard' package")
+        if mode == "r":
+            return zstandard.open(path, "rt", encoding="utf-8")
+        return zstandard.open(path, "wt", encoding="utf-8", cctx=zstandard.ZstdCompressor(level=10))
+    return open(path, mode, encoding="utf-8")
+
+
+def is_products_file(path) -> bool:
+    return Path(path).name in PRODUCT_FILE_NAMES
+
+
+def find_products_file(run_dir):
+    """The products file of a run folder (new formats first), or None."""
+    run_dir = Path(run_dir)
+    for name in PRODUCT_FILE_NAMES:
+        if (run_dir / name).exists():
+            return run_dir / name
+    return None
+
+
+def resolve(path) -> Path:
+    """Accept either a run folder or a products file."""
+    path = Path(path)
+    if path.is_dir():
+        found = find_products_file(path)
+        if found is None:
+            raise FileNotFoundError(f"No products file in {path}")
+        return found
+    return path
+
+
+def run_products_files(roots) -> list:
+    """Products file of every run folder under the given roots, sorted."""
+    files = []
+    for root in roots:
+        root = Path(root)
+        if root.exists():
+            files.extend(f for f in (find_products_file(d) for d in root.iterdir() if d.is_dir()) if f)
+    return sorted(files)
+
+
+def _load_legacy(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_header(path) -> dict:
+    """Header record of a products file ({fetched_at, count, ...})."""
+    path = resolve(path)
+    if path.name == LEGACY_NAME:
+        data = _load_legacy(path)
+        return {"type": "header", "format": FORMAT_NAME, "version": 0,
+                "fetched_at": data.get("fetched_at"), "count": data.get("count", len(data.get("products", [])))}
+    with _open(path, "r") as f:
+        first = f.readline()
+    header = json.loads(first) if first.strip() else {}
+    if header.get("type") != "header":
+        raise ValueError(f"{path} has no header record")
+    return header
+
+
+def iter_products(path):
+    """Yield the products of a run folder or products file, in order."""
+    path = resolve(path)
+    if path.name == LEGACY_NAME:
+        yield from _load_legacy(path).get("products", [])
+        return
+    with _open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("type") == "header":
+                continue
+            yield record
+
+
+def product_at(path, index: int):
+    """The product at `index` (streams up to it), or None if out of range."""
+    for i, product in enumerate(iter_products(path)):
+        if i == index:
+            return product
+    return None
+
+
+class ProductWriter:
+    """Writes a products file one product at a time.
+
+    The header carries the product count. When the count is known up front
+    (count=...), products are streamed straight into the file; otherwise they
+    are spooled to a temporary file and the header is written on close().
+    The target only appears, atomically, once close() succeeds.
+    """
+
+    def __init__(self, path, fetched_at: str = None, count: int = None):
+        self.path = Path(path)
+        if self.path.suffix == ".zst" and zstandard is None:
+            raise RuntimeError("zstd-compressed products files need the optional 'zstandard' package")
+        self.fetched_at = fetched_at or datetime.now().isoformat()
+        self.expected = count
+        self.count = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        if count is not None:
+            self._out = _open(self._tmp, "w", self.path.suffix)
+            self._write_header(self._out, count)
+            self._spool = None
+        else:
+            self._out = None
+            self._spool = tempfile.TemporaryFile("w+", encoding="utf-8", dir=self.path.parent)
+
+    def _write_header(self, f, count: int):
+        header = {"type": "header", "format": FORMAT_NAME, "version": FORMAT_VERSION,
+                  "fetched_at": self.fetched_at, "count": count}
+        f.write(json.dumps(header) + "\n")
+
+    def write(self, product: dict):
+        line = json.dumps(product, ensure_ascii=False, separators=(",", ":")) + "\n"
+        (self._out or self._spool).write(line)
+        self.count += 1
+
+    def write_all(self, products) -> int:
+        for product in products:
+            self.write(product)
+        return self.count
+
+    def close(self) -> Path:
+        if self._spool is not None:
+            with _open(self._tmp, "w", self.path.suffix) as out:
+                self._write_header(out, self.count)
+                self._spool.seek(0)
+                shutil.copyfileobj(self._spool, out)
+            self._spool.close()
+        else:
+            self._out.close()
+            if self.count != self.expected:
+                self._tmp.unlink()
+                raise ValueError(f"Header promised {self.expected} products, {self.count} were written")
+        os.replace(self._tmp, self.path)
+        return self.path
+
+    def abort(self):
+        if self._spool is not None:
+            self._spool.close()
+        if self._out is not None:
+            self._out.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def write_products(path, products, fetched_at: str = None, count: int = None) -> Path:
+    """Write an iterable of products to a products file."""
+    with ProductWriter(path, fetched_at, count) as writer:
+        writer.write_all(products)
+    return writer.path
+
+
+def convert_legacy(run_dir, name: str = DEFAULT_NAME) -> Path:
+    """Rewrite a run folder's products.json in the streaming format (the old file is kept)."""
+    run_dir = Path(run_dir)
+    header = read_header(run_dir / LEGACY_NAME)
+    return write_products(run_dir / name, iter_products(run_dir / LEGACY_NAME), fetched_at=header["fetched_at"])
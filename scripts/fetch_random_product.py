@@ -3,7 +3,10 @@
 Random Product Fetcher for Protein Detection Training
 
 This script fetches random products from OpenFoodFacts and outputs them
-in a format suitable for adding to the test cases.
+in a format suitable for adding to the test cases. Search pages are drained
+into a candidate pool that refills in the background, so --count N needs
+about N/20 requests instead of one per product. Products whose barcode is
+already known (a test case or a product evaluated in a run) are skipped.
 
 Usage:
     python fetch_random_product.py              # Fetch one random product
@@ -16,91 +19,184 @@ import random
 import requests
 import argparse
 import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 OPENFOODFACTS_API = "https://world.openfoodfacts.org/api/v2"
-TEST_CASES_FILE = Path(__file__).parent.parent / "app/src/test/resources/protein_test_cases.json"
-
-def fetch_random_product():
-    """Fetch a random product from OpenFoodFacts with ingredients"""
-    # Search for products with ingredients text
-    search_url = f"{OPENFOODFACTS_API}/search"
-
+PROJECT_DIR = Path(__file__).parent.parent
+TEST_CASES_FILE = PROJECT_DIR / "app/src/test/resources/protein_test_cases.json"
+
+SEARCH_FIELDS = "code,product_name,brands,ingredients_text,nutriments"
+PAGE_SIZE = 20
+MAX_FAILED_PAGES = 5  # consecutive failed/empty pages before giving up
+RETRY_DELAY = 0.5  # seconds before the first retry, doubling per failure
+
+PROTEIN_CATEGORIES = [
+    "protein bars", "protein powder", "milk", "cheese", "yogurt",
+    "meat", "chicken", "fish", "eggs", "tofu", "legumes", "nuts",
+    "protein shake", "sports nutrition"
+]
+
+sys.path.insert(0, str(PROJECT_DIR))
+from barcode_index import get_barcode_index  # noqa: E402
+from off_cache import cached_get, get_cache  # noqa: E402
+from case_log import get_case_log  # noqa: E402
+from product_store import ProductStore  # noqa: E402
+
+def search_params(protein=False):
+    """Search parameters for one random page of products (protein-rich categories if `protein`)"""
+    if protein:
+        # Categories likely to have protein
+        return {
+            "fields": SEARCH_FIELDS,
+            "page_size": PAGE_SIZE,
+            "page": random.randint(1, 20),
+            "categories_tags_en": random.choice(PROTEIN_CATEGORIES)
+        }
     # Random page to get variety
-    page = random.randint(1, 100)
-
-    params = {
-        "fields": "code,product_name,brands,ingredients_text,nutriments",
-        "page_size": 20,
-        "page": page,
+    return {
+        "fields": SEARCH_FIELDS,
+        "page_size": PAGE_SIZE,
+        "page": random.randint(1, 100),
         "tagtype_0": "states",
         "tag_contains_0": "contains",
         "tag_0": "en:ingredients-completed"
     }
 
-    try:
-        response = requests.get(search_url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        products = data.get("products", [])
-
-        # Filter products with actual ingredient text
-        valid_products = [
-            p for p in products
-            if p.get("ingredients_text") and len(p.get("ingredients_text", "")) > 20
-        ]
-
-        if not valid_products:
-            print("No valid products found, trying again...", file=sys.stderr)
-            return fetch_random_product()
+def search_page(protein=False):
+    """Fetch one random search page and return its products with actual ingredient text"""
+    response = cached_get(f"{OPENFOODFACTS_API}/search", params=search_params(protein), timeout=10)
+    response.raise_for_status()
+    products = response.json().get("products", [])
+    return [
+        p for p in products
+        if p.get("ingredients_text") and len(p.get("ingredients_text", "")) > 20
+    ]
 
-        return random.choice(valid_products)
+class CandidatePool:
+    """Buffered stream of distinct random products, refilled in the background.
+
+    Every search page is drained into the buffer (up to PAGE_SIZE products per
+    round trip) instead of keeping one product and discarding the rest. When
+    the buffer runs below `low_water`, more pages are requested on worker
+    threads while the caller keeps consuming. A page that fails or adds no new
+    product counts as a failed attempt; after `max_failures` in a row the pool
+    is exhausted and get() returns None. `limit` stops prefetching once that
+    many products are delivered or buffered, so --count 1 costs one request.
+    Products whose code is in `exclude` (e.g. the barcode index) are never
+    buffered.
+    """
+
+    def __init__(self, protein=False, limit=None, low_water=PAGE_SIZE // 2, workers=2,
+                 max_failures=MAX_FAILED_PAGES, fetch_page=search_page, exclude=()):
+        self.protein = protein
+        self.exclude = exclude
+        self.limit = limit
+        self.low_water = low_water
+        self.workers = workers
+        self.max_failures = max_failures
+        self.fetch_page = fetch_page
+        self.pages = 0
+        self.failures = 0
+        self._buffer = deque()
+        self._seen = set()
+        self.delivered = 0
+        self._in_flight = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="candidate-pool")
+
+    def _refill(self):
+        """Request pages until the buffer plus the pages in flight cover low_water (caller holds the lock)"""
+        while (not self._closed and self.failures < self.max_failures and self._in_flight < self.workers
+               and len(self._buffer) + self._in_flight * PAGE_SIZE <= self.low_water):
+            if self.limit is not None and (self.delivered + len(self._buffer)
+                                           + self._in_flight * PAGE_SIZE) >= self.limit:
+                return
+            self._in_flight += 1
+            # A failed protein page is retried with the general search, as before
+            self._executor.submit(self._load_page, self.protein and self.failures == 0, self.failures)
+
+    def _load_page(self, protein, failures):
+        page, error = [], None
+        try:
+            if failures:
+                time.sleep(min(RETRY_DELAY * 2 ** (failures - 1), 5.0))
+            products = self.fetch_page(protein)
+            random.shuffle(products)
+            page = [(product.get("code") or id(product), product) for product in products]
+        except Exception as e:
+            # Any failure counts as a failed page; an unexpected one must not strand get() waiting
+            page, error = [], e
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self.pages += 1
+                try:
+                    self._add_page(page, error)
+                finally:
+                    self._cond.notify_all()
+
+    def _add_page(self, page, error):
+        """Buffer a loaded page of (code, product) and request the next ones (caller holds the lock)"""
+        added = 0
+        for code, product in page:
+            if code in self._seen or code in self.exclude:
+                continue
+            self._seen.add(code)
+            self._buffer.append(product)
+            added += 1
+        if added:
+            self.failures = 0
+        else:
+            self.failures += 1
+            reason = f"Error fetching products: {error}" if error else "No new valid products found"
+            print(f"{reason} (attempt {self.failures}/{self.max_failures})", file=sys.stderr)
+        self._refill()
+
+    def get(self):
+        """Next product, waiting for a page if the buffer is empty; None once the pool is exhausted"""
+        with self._cond:
+            while True:
+                if self.limit is not None and self.delivered >= self.limit:
+                    return None
+                if self._buffer:
+                    self.delivered += 1
+                    product = self._buffer.popleft()
+                    self._refill()
+                    return product
+                self._refill()
+                if not self._in_flight:
+                    return None
+                self._cond.wait()
+
+    def __iter__(self):
+        while (product := self.get()) is not None:
+            yield product
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-    except requests.RequestException as e:
-        print(f"Error fetching product: {e}", file=sys.stderr)
-        return None
+def fetch_random_product():
+    """Fetch a random product from OpenFoodFacts with ingredients"""
+    with CandidatePool(limit=1, exclude=get_barcode_index()) as pool:
+        return pool.get()
 
 def fetch_protein_product():
     """Fetch a product likely to contain protein (better for training)"""
-    search_url = f"{OPENFOODFACTS_API}/search"
-
-    # Categories likely to have protein
-    protein_categories = [
-        "protein bars", "protein powder", "milk", "cheese", "yogurt",
-        "meat", "chicken", "fish", "eggs", "tofu", "legumes", "nuts",
-        "protein shake", "sports nutrition"
-    ]
-
-    category = random.choice(protein_categories)
-    page = random.randint(1, 20)
-
-    params = {
-        "fields": "code,product_name,brands,ingredients_text,nutriments",
-        "page_size": 20,
-        "page": page,
-        "categories_tags_en": category
-    }
-
-    try:
-        response = requests.get(search_url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        products = data.get("products", [])
-        valid_products = [
-            p for p in products
-            if p.get("ingredients_text") and len(p.get("ingredients_text", "")) > 20
-        ]
-
-        if valid_products:
-            return random.choice(valid_products)
-        else:
-            # Fallback to random product
-            return fetch_random_product()
-
-    except requests.RequestException:
-        return fetch_random_product()
+    with CandidatePool(protein=True, limit=1, exclude=get_barcode_index()) as pool:
+        return pool.get()
 
 def format_test_case(product, expected_detected=None, expected_not_detected=None):
     """Format a product as a test case"""
@@ -128,29 +224,18 @@ def format_test_case(product, expected_detected=None, expected_not_detected=None
     return test_case
 
 def load_test_cases():
-    """Load existing test cases"""
-    if TEST_CASES_FILE.exists():
-        with open(TEST_CASES_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"description": "Test cases for protein detection", "version": "1.0", "test_cases": []}
-
-def save_test_cases(data):
-    """Save test cases to file"""
-    with open(TEST_CASES_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    """Load existing test cases, including ones still pending in the case log"""
+    return get_case_log().merged()
 
 def add_test_case(test_case):
-    """Add a test case to the JSON file"""
-    data = load_test_cases()
-
-    # Check if barcode already exists
-    existing_ids = [tc["id"] for tc in data["test_cases"]]
-    if test_case["id"] in existing_ids:
+    """Append a test case to the case log (compacted into the JSON file before test runs)"""
+    # Duplicate check against the id index; the append itself is file-locked
+    if not get_case_log().add(test_case):
         print(f"Test case {test_case['id']} already exists, skipping", file=sys.stderr)
         return False
 
-    data["test_cases"].append(test_case)
-    save_test_cases(data)
+    with ProductStore() as store:
+        store.sync_case_log()
     return True
 
 def main():
@@ -159,13 +244,16 @@ def main():
     parser.add_argument("--protein", action="store_true", help="Focus on protein-rich products")
     parser.add_argument("--add", action="store_true", help="Add to test cases file (requires manual expected values)")
     parser.add_argument("--barcode", type=str, help="Fetch specific product by barcode")
+    parser.add_argument("--offline", action="store_true", help="Serve responses from the local cache only")
     args = parser.parse_args()
+    if args.offline:
+        get_cache().offline = True
 
     if args.barcode:
         # Fetch specific product
         url = f"{OPENFOODFACTS_API}/product/{args.barcode}"
         try:
-            response = requests.get(url, timeout=10)
+            response = cached_get(url, timeout=10)
             data = response.json()
             if data.get("status") == 1:
                 product = data.get("product", {})
@@ -177,14 +265,9 @@ def main():
             print(f"Error: {e}", file=sys.stderr)
         return
 
-    # Fetch random products
-    for i in range(args.count):
-        if args.protein:
-            product = fetch_protein_product()
-        else:
-            product = fetch_random_product()
-
-        if product:
+    # Fetch random products: whole pages are buffered, so N products cost about N/20 requests
+    with CandidatePool(protein=args.protein, limit=args.count, exclude=get_barcode_index()) as pool:
+        for i, product in enumerate(pool):
             test_case = format_test_case(product)
 
             print(f"\n{'='*80}")
@@ -197,6 +280,8 @@ def main():
                     print(f"\nAdded to test cases (needs expected_detected values!)")
                 else:
                     print(f"\nSkipped (already exists)")
+        if pool.delivered < args.count:
+            print(f"Only {pool.delivered}/{args.count} products found after {pool.pages} pages", file=sys.stderr)
 
 if __name__ == "__main__":
     main()
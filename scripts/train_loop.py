@@ -4,65 +4,60 @@ Protein Detection Training Loop
 
 Automatically trains the protein detection algorithm by:
 1. Fetching random products from OpenFoodFacts
-2. Running Claude Code to evaluate and add test cases
-3. Running tests and fixing issues
-4. Repeating until target test count reached
+2. Triage: products the current detector handles without doubt are added
+   as test cases directly, the rest goes to the agent with the detection
+3. Running Claude Code to evaluate and add test cases
+4. Running tests and fixing issues
+5. Repeating until target test count reached
 
 Usage:
     python train_loop.py                    # Run training loop
     python train_loop.py --iterations 10   # Run 10 iterations
     python train_loop.py --target-tests 30 # Run until 30 test cases
+    python train_loop.py --no-triage       # Let the agent fetch and judge every product itself
 """
 
-import subprocess
 import json
+import subprocess
 import sys
 import time
 import argparse
 from pathlib import Path
 
 PROJECT_DIR = Path(__file__).parent.parent
-TEST_CASES_FILE = PROJECT_DIR / "app/src/test/resources/protein_test_cases.json"
+
+sys.path.insert(0, str(PROJECT_DIR))
+from barcode_index import get_barcode_index  # noqa: E402
+from case_log import get_case_log  # noqa: E402
+from fetch_random_product import CandidatePool  # noqa: E402
+from gradle_runner import get_runner  # noqa: E402
+from product_selector import coverage_profile  # noqa: E402
+from triage import ACCEPT, auto_case, triage_product  # noqa: E402
+
+# Products auto-accepted in a row before control returns to the loop (to check the target)
+MAX_AUTO_ACCEPTED = 50
 
 def count_test_cases():
-    """Count current number of test cases"""
-    if TEST_CASES_FILE.exists():
-        with open(TEST_CASES_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return len(data.get("test_cases", []))
-    return 0
+    """Count current number of test cases, including ones pending in the case log"""
+    return len(get_case_log().merged().get("test_cases", []))
+
+def target_reached(target_tests):
+    """True once a test case target is set and reached"""
+    return target_tests > 0 and count_test_cases() >= target_tests
 
 def run_tests():
-    """Run Gradle tests and return True if all pass"""
+    """Run Gradle tests on the warm daemon and return True if all pass"""
     print("\n--- Running Tests ---")
-    result = subprocess.run(
-        ["gradlew.bat", ":app:testDebugUnitTest"],
-        cwd=PROJECT_DIR,
-        capture_output=True,
-        text=True,
-        shell=True
-    )
-
-    passed = result.returncode == 0
+    # Failure lines are printed by the runner while the build is still going
+    passed, _ = get_runner().run()
     if passed:
         print("All tests PASSED")
     else:
         print("Tests FAILED")
-        # Extract failure info
-        if "FAILED" in result.stdout:
-            for line in result.stdout.split("\n"):
-                if "FAILED" in line or "AssertionError" in line:
-                    print(f"  {line.strip()}")
 
     return passed
 
-def run_claude_iteration(iteration_num):
-    """Run one Claude Code training iteration"""
-    print(f"\n{'='*60}")
-    print(f"ITERATION {iteration_num}")
-    print(f"{'='*60}")
-
-    prompt = """Execute ONE protein detection training iteration:
+ITERATION_PROMPT = """Execute ONE protein detection training iteration:
 
 1. First, fetch a random product:
    python scripts/fetch_random_product.py --protein
@@ -71,12 +66,13 @@ def run_claude_iteration(iteration_num):
    - expected_detected: proteins that ARE actual ingredients
    - expected_not_detected: proteins from trace warnings, allergens, or emulsifiers (like soya lecithin)
 
-3. Add the test case to app/src/test/resources/protein_test_cases.json
+3. Record the test case (never edit protein_test_cases.json by hand):
+   write it to case.json, then run: python case_log.py put case.json
    - Use a unique id like "training_<barcode>"
    - Fill in expected_detected and expected_not_detected correctly
 
-4. Run tests:
-   gradlew.bat :app:testDebugUnitTest
+4. Run tests (folds the recorded cases into protein_test_cases.json first):
+   python gradle_runner.py
 
 5. If tests fail:
    - Read the test report to see what failed
@@ -90,13 +86,93 @@ Remember:
 - "soya lecithin" = emulsifier, not protein
 - Only detect actual protein ingredients"""
 
+PRODUCT_PROMPT = """Execute ONE protein detection training iteration for this product:
+
+{product}
+
+The current detector finds: {detected}
+(keyword matcher: {matcher_detected}; rejected keywords of: {not_detected})
+It needs your review because:
+{reasons}
+
+1. Analyze the ingredients and determine:
+   - expected_detected: proteins that ARE actual ingredients
+   - expected_not_detected: proteins from trace warnings, allergens, or emulsifiers (like soya lecithin)
+
+2. Record the test case (never edit protein_test_cases.json by hand):
+   write it to case.json, then run: python case_log.py put case.json
+   - Use the id "off_{barcode}"
+   - Fill in expected_detected and expected_not_detected correctly
+
+3. Run tests (folds the recorded cases into protein_test_cases.json first):
+   python gradle_runner.py
+
+4. If tests fail:
+   - Read the test report to see what failed
+   - Fix ProteinDatabase.kt (add keywords, fix trace warning detection, etc.)
+   - Run python protein_data.py generate and the tests again until they pass
+
+5. When done, output: ITERATION_COMPLETE
+
+Remember:
+- "May contain" / "traces of" / "produced in a facility" = trace warnings, don't detect
+- "soya lecithin" = emulsifier, not protein
+- Only detect actual protein ingredients"""
+
+def product_prompt(product, result):
+    """Iteration prompt for one product, with the detector's result and the triage reasons."""
+    return PRODUCT_PROMPT.format(
+        product=json.dumps(product, indent=2, ensure_ascii=False),
+        detected=", ".join(result["detected"]) or "nothing",
+        matcher_detected=", ".join(result["matcher_detected"]) or "nothing",
+        not_detected=", ".join(result["not_detected"]) or "none",
+        reasons="\n".join(f"- {reason}" for reason in result["reasons"]),
+        barcode=product.get("code", "unknown"))
+
+def next_review_product(pool, profile):
+    """Draw products until one needs the agent; uncontroversial ones are added as test cases on the way.
+
+    Returns (product, triage result, auto-accepted count, exhausted). product is None either when
+    the pool ran dry (exhausted) or when MAX_AUTO_ACCEPTED products were accepted without finding
+    one to review (not exhausted: call again to keep drawing).
+    """
+    accepted = 0
+    while accepted < MAX_AUTO_ACCEPTED:
+        product = pool.get()
+        if product is None:
+            return None, None, accepted, True
+        # Buffered before a parallel worker may have added it as a test case
+        if product.get("code") in get_barcode_index():
+            continue
+        record = {"barcode": product.get("code", "unknown"), "name": product.get("product_name", ""),
+                  "brand": product.get("brands", ""), "ingredients": product.get("ingredients_text", "")}
+        result = triage_product(record, profile)
+        if result["decision"] != ACCEPT:
+            return product, result, accepted, False
+        if get_case_log().add(auto_case(record, result)):
+            accepted += 1
+            print(f"Auto-accepted {record['name'] or record['barcode']}: {', '.join(result['detected']) or 'none'}")
+    return None, None, accepted, False
+
+# Agent invocation; {prompt} is replaced by the iteration prompt
+AGENT_COMMAND = ["claude", "-p", "{prompt}", "--allowedTools", "Bash,Read,Write,Edit,Glob,Grep"]
+
+def agent_command(prompt=ITERATION_PROMPT, template=AGENT_COMMAND) -> list:
+    """Agent argv with the prompt substituted in."""
+    return [arg.replace("{prompt}", prompt) for arg in template]
+
+def run_claude_iteration(iteration_num, prompt=ITERATION_PROMPT):
+    """Run one Claude Code training iteration"""
+    print(f"\n{'='*60}")
+    print(f"ITERATION {iteration_num}")
+    print(f"{'='*60}")
+
+    # The agent reads protein_test_cases.json: fold in auto-accepted and parallel cases first
+    get_case_log().compact()
+
     try:
         result = subprocess.run(
-            [
-                "claude",
-                "-p", prompt,
-                "--allowedTools", "Bash,Read,Write,Edit,Glob,Grep"
-            ],
+            agent_command(prompt),
             cwd=PROJECT_DIR,
             timeout=600,  # 10 minute timeout per iteration
             capture_output=True,
@@ -119,6 +195,8 @@ def main():
     parser.add_argument("--iterations", type=int, default=10, help="Number of iterations to run")
     parser.add_argument("--target-tests", type=int, default=0, help="Target number of test cases (0 = use iterations)")
     parser.add_argument("--dry-run", action="store_true", help="Just show what would be done")
+    parser.add_argument("--no-triage", action="store_true",
+                        help="Let the agent fetch and judge every product (no auto-accepted test cases)")
     args = parser.parse_args()
 
     initial_count = count_test_cases()
@@ -146,16 +224,39 @@ Target test cases: {args.target_tests if args.target_tests > 0 else 'N/A'}
             return
 
     successful_iterations = 0
+    auto_accepted = 0
+    pool = None if args.no_triage else CandidatePool(protein=True, exclude=get_barcode_index())
+    profile = None if args.no_triage else coverage_profile()
 
     for i in range(1, args.iterations + 1):
         # Check if we've reached target test count
-        if args.target_tests > 0:
-            current_count = count_test_cases()
-            if current_count >= args.target_tests:
-                print(f"\nReached target of {args.target_tests} test cases!")
-                break
+        if target_reached(args.target_tests):
+            print(f"\nReached target of {args.target_tests} test cases!")
+            break
 
-        success = run_claude_iteration(i)
+        if pool is None:
+            success = run_claude_iteration(i)
+        else:
+            product, result, accepted, exhausted = next_review_product(pool, profile)
+            auto_accepted += accepted
+            # With a target, a spent auto-accept budget only means: check the target, keep drawing.
+            # Without one it uses up the iteration, so --iterations bounds the auto-accepted cases too.
+            while (product is None and not exhausted and args.target_tests > 0
+                   and not target_reached(args.target_tests)):
+                product, result, accepted, exhausted = next_review_product(pool, profile)
+                auto_accepted += accepted
+            if product is None:
+                if exhausted:
+                    print("No more products to review")
+                    break
+                if target_reached(args.target_tests):
+                    print(f"\nReached target of {args.target_tests} test cases!")
+                    break
+                print(f"Iteration {i}: auto-accepted {accepted} products, none needed review")
+                continue
+            success = run_claude_iteration(i, product_prompt(product, result))
+            # The agent may have changed the keywords: re-profile against the grown test set
+            profile = coverage_profile()
 
         if success:
             successful_iterations += 1
@@ -165,6 +266,11 @@ Target test cases: {args.target_tests if args.target_tests > 0 else 'N/A'}
         # Brief pause between iterations
         time.sleep(2)
 
+    if pool is not None:
+        pool.close()
+    # Cases auto-accepted after the last iteration are still only in the log
+    get_case_log().compact()
+
     # Final summary
     final_count = count_test_cases()
     print(f"""
@@ -173,6 +279,7 @@ TRAINING COMPLETE
 {'='*60}
 Iterations run: {args.iterations}
 Successful iterations: {successful_iterations}
+Auto-accepted by triage: {auto_accepted}
 Test cases: {initial_count} -> {final_count} (+{final_count - initial_count})
 {'='*60}
 """)
@@ -180,6 +287,7 @@ Test cases: {initial_count} -> {final_count} (+{final_count - initial_count})
     # Final test verification
     print("Running final test verification...")
     run_tests()
+    get_runner().stop()
 
 if __name__ == "__main__":
     main()
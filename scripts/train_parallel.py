@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Parallel Protein Detection Training
+
+Runs several train_loop.py iterations at once. Every worker gets its own
+workspace (a git worktree, or a plain scratch copy with --isolation copy)
+holding a private copy of ProteinDatabase.kt and the test-case files, so
+agents never edit the same file. When an iteration finishes successfully
+its workspace is verified first (--verify):
+
+- native (default): regenerate protein_data.json from the worker's
+  ProteinDatabase.kt and run `evaluator.py --native --json` in the workspace
+- gradle: run the Kotlin tests in the workspace on its own warm daemon
+- none: trust the agent's exit status
+
+A worker whose edits do not build, or make a case fail that passed in the
+state it started from, is rejected and nothing of it is merged. Verified
+changes are merged back into the main project one at a time:
+
+- test cases: new and changed cases are appended to the main case log
+- ProteinDatabase.kt: three-way `git merge-file` against the state the
+  worker started from; on conflict, only the keyword additions and new
+  ProteinSource entries are folded in (other edits of that worker are dropped
+  and reported)
+
+The agent command is pluggable. {prompt}, {workdir} and {worker} in it are
+substituted, and the workspace is the working directory, so a local stub
+script can stand in for the real agent.
+
+Usage:
+    python train_parallel.py --workers 4 --iterations 20
+    python train_parallel.py --workers 4 --budget-minutes 60 --target-tests 500
+    python train_parallel.py --agent-cmd "python stub_agent.py {worker}" --verify none --skip-final-tests
+    python train_parallel.py --workers 2 --verify gradle
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).parent.parent
+WORKSPACES_DIR = PROJECT_DIR / ".train_workers"
+
+sys.path.insert(0, str(PROJECT_DIR))
+sys.path.insert(0, str(Path(__file__).parent))
+from case_log import CaseLog, apply_entry  # noqa: E402
+from protein_sources import apply_additions, keyword_additions  # noqa: E402
+from gradle_runner import GradleTestRunner, get_runner  # noqa: E402
+from test_results import load_results  # noqa: E402
+from protein_data import DATA_FILE, build_data, write_data  # noqa: E402
+from train_loop import AGENT_COMMAND, ITERATION_PROMPT, count_test_cases, run_tests  # noqa: E402
+
+PROTEIN_DB = "app/src/main/java/com/proteinscannerandroid/ProteinDatabase.kt"
+TEST_CASES = "app/src/test/resources/protein_test_cases.json"
+CASE_LOG = "app/src/test/resources/protein_test_cases.log.jsonl"
+# Files every worker gets a fresh private copy of and whose changes get merged back
+SYNCED_FILES = (PROTEIN_DB, TEST_CASES, CASE_LOG)
+# Untracked files a worktree needs to build (Android SDK location)
+SUPPORT_FILES = ("local.properties",)
+
+VERIFY_MODES = ("native", "gradle", "none")
+GRADLE_RESULTS = "app/build/test-results/testDebugUnitTest"
+CASE_REPORT = "app/build/test-results/protein-detection/cases.json"
+
+COPY_IGNORE = shutil.ignore_patterns(".git", "build", ".gradle", ".idea", "__pycache__", "runs", "runs_archived",
+                                     "off_store", ".off_cache", WORKSPACES_DIR.name)
+
+def read_text(path: Path):
+    return path.read_text(encoding="utf-8") if path.exists() else None
+
+def last_line(text: str) -> str:
+    lines = (text or "").strip().splitlines()
+    return lines[-1] if lines else ""
+
+class Workspace:
+    """One worker's isolated project copy."""
+
+    def __init__(self, worker_id: int, root=WORKSPACES_DIR, isolation="worktree", project_dir=PROJECT_DIR):
+        self.worker_id = worker_id
+        self.project_dir = Path(project_dir)
+        self.path = Path(root) / f"worker_{worker_id}"
+        self.isolation = isolation
+        self.runner = None
+
+    def create(self):
+        if self.path.exists():
+            self.remove()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.isolation == "worktree":
+            subprocess.run(["git", "worktree", "add", "--detach", str(self.path), "HEAD"],
+                           cwd=self.project_dir, check=True, capture_output=True)
+        else:
+            shutil.copytree(self.project_dir, self.path, ignore=COPY_IGNORE)
+        for rel in SUPPORT_FILES:
+            if (self.project_dir / rel).exists():
+                shutil.copy2(self.project_dir / rel, self.path / rel)
+
+    def reset(self) -> dict:
+        """Copy the main project's current synced files in; returns them as the merge base."""
+        base = {}
+        for rel in SYNCED_FILES:
+            source, target = self.project_dir / rel, self.path / rel
+            base[rel] = read_text(source)
+            if base[rel] is None:
+                target.unlink(missing_ok=True)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_text(base[rel], encoding="utf-8")
+        return base
+
+    def snapshot(self) -> dict:
+        return {rel: read_text(self.path / rel) for rel in SYNCED_FILES}
+
+    def verify(self, mode="native") -> tuple:
+        """Failing case keys of the workspace's current state: (set, "") or (None, why it does not build)."""
+        if mode == "gradle":
+            return self._verify_gradle()
+        generate = subprocess.run([sys.executable, "protein_data.py", "generate"], cwd=self.path,
+                                  capture_output=True, text=True, encoding="utf-8", errors="replace")
+        if generate.returncode != 0:
+            return None, f"protein_data.py generate failed: {last_line(generate.stdout + generate.stderr)}"
+        evaluate = subprocess.run([sys.executable, "evaluator.py", "--native", "--json"], cwd=self.path,
+                                  capture_output=True, text=True, encoding="utf-8", errors="replace")
+        try:
+            return set(json.loads(last_line(evaluate.stdout))["failing"]), ""
+        except (ValueError, KeyError):
+            return None, f"native evaluation failed: {last_line(evaluate.stdout + evaluate.stderr)}"
+
+    def _verify_gradle(self) -> tuple:
+        # The Kotlin test reads the canonical JSON only
+        CaseLog(self.path / TEST_CASES, self.path / CASE_LOG, index=self.path / ".case_index.json").compact()
+        if self.runner is None:
+            self.runner = GradleTestRunner(self.path, on_line=None)
+        started = time.time()
+        success, output = self.runner.run()
+        results = load_results(self.path / GRADLE_RESULTS, since=started, case_report=self.path / CASE_REPORT)
+        if results is None or not results["cases"]:
+            return None, f"Gradle test run failed: {last_line(output)}"
+        return {case["key"] for case in results["cases"] if not case["passed"]}, ""
+
+    def remove(self):
+        if self.runner is not None:
+            self.runner.stop()
+            self.runner = None
+        if self.isolation == "worktree":
+            subprocess.run(["git", "worktree", "remove", "--force", str(self.path)],
+                           cwd=self.project_dir, capture_output=True)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+def cases_by_id(canonical_text, log_text) -> dict:
+    """id -> case for a canonical JSON text with a case log text applied."""
+    cases = json.loads(canonical_text).get("test_cases", []) if canonical_text else []
+    ids = {tc["id"] for tc in cases}
+    for line in (log_text or "").splitlines():
+        try:
+            apply_entry(cases, json.loads(line), ids)
+        except (ValueError, KeyError):
+            continue
+    return {tc["id"]: tc for tc in cases}
+
+def merge_test_cases(base: dict, theirs: dict, case_log: CaseLog) -> dict:
+    """Append the cases a worker added or changed to the main case log."""
+    before = cases_by_id(base[TEST_CASES], base[CASE_LOG])
+    after = cases_by_id(theirs[TEST_CASES], theirs[CASE_LOG])
+    added = changed = 0
+    for case_id, case in after.items():
+        if case_id not in before:
+            added += case_log.add(case)
+        elif case != before[case_id]:
+            case_log.put(case)
+            changed += 1
+    return {"added": added, "changed": changed}
+
+def merge_file(ours: str, base: str, theirs: str) -> tuple:
+    """Three-way text merge with git merge-file; returns (merged text, clean)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for name, text in (("ours", ours), ("base", base), ("theirs", theirs)):
+            path = Path(tmp) / name
+            path.write_text(text, encoding="utf-8")
+            paths.append(str(path))
+        result = subprocess.run(["git", "merge-file", "-p", *paths], capture_output=True)
+    return result.stdout.decode("utf-8"), result.returncode == 0
+
+def merge_protein_database(base: str, ours: str, theirs: str) -> tuple:
+    """Merge a worker's ProteinDatabase.kt into the main one; returns (text, method)."""
+    if theirs is None or theirs == base:
+        return ours, "unchanged"
+    if ours == base:
+        return theirs, "fast-forward"
+    merged, clean = merge_file(ours, base, theirs)
+    if clean:
+        return merged, "merge-file"
+    # Conflicting edits: keep the keyword union, drop this worker's other changes
+    added_keywords, new_sources = keyword_additions(base, theirs)
+    return apply_additions(ours, added_keywords, new_sources), "keywords-only"
+
+class Orchestrator:
+    def __init__(self, workers=2, isolation="worktree", agent_cmd=None, timeout=600, project_dir=PROJECT_DIR,
+                 workspaces_dir=WORKSPACES_DIR, verify="native"):
+        self.project_dir = Path(project_dir)
+        self.agent_cmd = agent_cmd or AGENT_COMMAND
+        self.timeout = timeout
+        self.verify = verify
+        # digest of the synced files -> failing case keys of that state (None: it does not build)
+        self.baselines = {}
+        self.case_log = CaseLog(self.project_dir / TEST_CASES, self.project_dir / CASE_LOG)
+        self.workspaces = [Workspace(i, workspaces_dir, isolation, self.project_dir) for i in range(1, workers + 1)]
+        self.free = queue.Queue()
+        self.merge_lock = threading.Lock()
+        self.results = []
+
+    def _command(self, workspace: Workspace) -> list:
+        values = {"{prompt}": ITERATION_PROMPT, "{workdir}": str(workspace.path), "{worker}": str(workspace.worker_id)}
+        command = []
+        for arg in self.agent_cmd:
+            for key, value in values.items():
+                arg = arg.replace(key, value)
+            command.append(arg)
+        return command
+
+    def _baseline(self, workspace: Workspace, base: dict):
+        """Failing case keys of the state a worker starts from (right after reset), computed once per state."""
+        key = hashlib.sha1(json.dumps(base, sort_keys=True).encode("utf-8")).hexdigest()
+        if key not in self.baselines:
+            self.baselines[key] = workspace.verify(self.verify)[0]
+        return self.baselines[key]
+
+    def _rejection(self, workspace: Workspace, baseline) -> str:
+        """Why a finished worker must not be merged, or "" if its workspace verifies."""
+        failing, error = workspace.verify(self.verify)
+        if failing is None:
+            return error
+        if baseline is None:
+            return ""  # the starting state did not build either: building is an improvement
+        regressions = sorted(failing - baseline)
+        if regressions:
+            shown = ", ".join(regressions[:5]) + (", ..." if len(regressions) > 5 else "")
+            return f"{len(regressions)} previously passing case(s) fail: {shown}"
+        return ""
+
+    def _merge(self, base: dict, theirs: dict) -> dict:
+        db_path = self.project_dir / PROTEIN_DB
+        merged, method = merge_protein_database(base[PROTEIN_DB], read_text(db_path), theirs[PROTEIN_DB])
+        if method != "unchanged":
+            db_path.write_text(merged, encoding="utf-8")
+            write_data(build_data(db_path), self.project_dir / DATA_FILE.name)
+        cases = merge_test_cases(base, theirs, self.case_log)
+        return {"protein_db": method, **cases}
+
+    def run_iteration(self, iteration: int, timeout: float) -> dict:
+        workspace = self.free.get()
+        try:
+            with self.merge_lock:
+                base = workspace.reset()
+            baseline = self._baseline(workspace, base) if self.verify != "none" else None
+            env = dict(os.environ, PROTEIN_WORKER_ID=str(workspace.worker_id), PROTEIN_WORKDIR=str(workspace.path))
+            start = time.time()
+            try:
+                result = subprocess.run(self._command(workspace), cwd=workspace.path, env=env, timeout=timeout,
+                                        capture_output=True, text=True, encoding="utf-8", errors="replace")
+                output = result.stdout
+                success = "ITERATION_COMPLETE" in output or result.returncode == 0
+            except subprocess.TimeoutExpired:
+                output, success = "Iteration timed out!", False
+            report = {"iteration": iteration, "worker": workspace.worker_id, "success": success,
+                      "seconds": round(time.time() - start, 1), "output": output[-2000:]}
+            if success and self.verify != "none":
+                rejection = self._rejection(workspace, baseline)
+                if rejection:
+                    report.update(success=False, rejected=rejection)
+            if report["success"]:
+                with self.merge_lock:
+                    report["merge"] = self._merge(base, workspace.snapshot())
+            return report
+        finally:
+            self.free.put(workspace)
+
+    def run(self, iterations: int, budget_seconds=None, target_tests=0) -> list:
+        """Run up to `iterations` iterations, `len(workspaces)` at a time, within the time budget."""
+        deadline = time.time() + budget_seconds if budget_seconds else None
+        for workspace in self.workspaces:
+            workspace.create()
+            self.free.put(workspace)
+
+        started = 0
+        pending = set()
+        with ThreadPoolExecutor(max_workers=len(self.workspaces)) as executor:
+            while started < iterations or pending:
+                budget_left = deadline is None or time.time() < deadline
+                target_reached = target_tests > 0 and count_test_cases() >= target_tests
+                while (started < iterations and len(pending) < len(self.workspaces)
+                       and budget_left and not target_reached):
+                    started += 1
+                    timeout = self.timeout if deadline is None else max(1.0, min(self.timeout, deadline - time.time()))
+                    pending.add(executor.submit(self.run_iteration, started, timeout))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report = future.result()
+                    self.results.append(report)
+                    merge = report.get("merge")
+                    status = "OK" if report["success"] else (
+                        f"REJECTED ({report['rejected']})" if "rejected" in report else "FAILED")
+                    details = (f" - db: {merge['protein_db']}, +{merge['added']} cases, {merge['changed']} changed"
+                               if merge else "")
+                    print(f"[worker {report['worker']}] iteration {report['iteration']} {status} "
+                          f"in {report['seconds']}s{details}", flush=True)
+        return self.results
+
+    def cleanup(self):
+        for workspace in self.workspaces:
+            workspace.remove()
+        if all(ws.isolation == "worktree" for ws in self.workspaces):
+            subprocess.run(["git", "worktree", "prune"], cwd=self.project_dir, capture_output=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel Protein Detection Training")
+    parser.add_argument("--workers", type=int, default=2, help="Iterations running at the same time")
+    parser.add_argument("--iterations", type=int, default=10, help="Total iterations (global budget)")
+    parser.add_argument("--budget-minutes", type=float, default=0, help="Wall-clock budget (0 = unlimited)")
+    parser.add_argument("--target-tests", type=int, default=0, help="Stop starting iterations at this many test cases")
+    parser.add_argument("--timeout", type=int, default=600, help="Per-iteration timeout in seconds")
+    parser.add_argument("--isolation", choices=("worktree", "copy"), default="worktree",
+                        help="git worktree per worker, or a plain scratch copy of the project")
+    parser.add_argument("--agent-cmd", help="Agent command line; {prompt}, {workdir} and {worker} are substituted")
+    parser.add_argument("--keep-workspaces", action="store_true", help="Leave worker workspaces on disk")
+    parser.add_argument("--verify", choices=VERIFY_MODES, default="native",
+                        help="How a finished worker is checked before its changes are merged")
+    parser.add_argument("--skip-final-tests", action="store_true",
+                        help="Skip the final Gradle test run (per-worker checks are --verify)")
+    args = parser.parse_args()
+
+    agent_cmd = shlex.split(args.agent_cmd, posix=os.name != "nt") if args.agent_cmd else None
+    orchestrator = Orchestrator(args.workers, args.isolation, agent_cmd, args.timeout, verify=args.verify)
+    initial_count = count_test_cases()
+    print(f"""
+{'='*60}
+PARALLEL PROTEIN DETECTION TRAINING
+{'='*60}
+Project: {PROJECT_DIR}
+Workers: {args.workers} ({args.isolation})
+Iterations: {args.iterations}
+Budget: {f'{args.budget_minutes:g} min' if args.budget_minutes else 'unlimited'}
+Current test cases: {initial_count}
+{'='*60}
+""")
+
+    start = time.time()
+    try:
+        results = orchestrator.run(args.iterations, args.budget_minutes * 60 or None, args.target_tests)
+    finally:
+        if not args.keep_workspaces:
+            orchestrator.cleanup()
+
+    successful = sum(1 for r in results if r["success"])
+    rejected = sum(1 for r in results if "rejected" in r)
+    fallbacks = sum(1 for r in results if r.get("merge", {}).get("protein_db") == "keywords-only")
+    final_count = count_test_cases()
+    print(f"""
+{'='*60}
+TRAINING COMPLETE
+{'='*60}
+Iterations run: {len(results)} in {time.time() - start:.0f}s
+Successful iterations: {successful}
+Rejected by verification: {rejected}
+Keyword-only merges (conflicts): {fallbacks}
+Test cases: {initial_count} -> {final_count} (+{final_count - initial_count})
+{'='*60}
+""")
+
+    if not args.skip_final_tests:
+        print("Running final test verification...")
+        run_tests()
+        get_runner().stop()
+
+if __name__ == "__main__":
+    main()
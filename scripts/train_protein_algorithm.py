@@ -20,7 +20,6 @@ USAGE:
     python train_protein_algorithm.py --auto    # Auto-fetch and test
 """
 
-import json
 import subprocess
 import sys
 import os
@@ -36,6 +35,12 @@ PROTEIN_DB_FILE = PROJECT_DIR / "app/src/main/java/com/proteinscannerandroid/Pro
 
 OPENFOODFACTS_API = "https://world.openfoodfacts.org/api/v2"
 
+sys.path.insert(0, str(PROJECT_DIR))
+from barcode_index import get_barcode_index  # noqa: E402
+from off_cache import cached_get  # noqa: E402
+from case_log import get_case_log  # noqa: E402
+from product_store import ProductStore  # noqa: E402
+
 def fetch_protein_product():
     """Fetch a product likely to contain protein"""
     protein_categories = [
@@ -55,14 +60,16 @@ def fetch_protein_product():
     }
 
     try:
-        response = requests.get(f"{OPENFOODFACTS_API}/search", params=params, timeout=15)
+        response = cached_get(f"{OPENFOODFACTS_API}/search", params=params, timeout=15)
         response.raise_for_status()
         data = response.json()
 
         products = data.get("products", [])
+        known = get_barcode_index()
         valid_products = [
             p for p in products
             if p.get("ingredients_text") and len(p.get("ingredients_text", "")) > 30
+            and p.get("code") not in known
         ]
 
         if valid_products:
@@ -74,16 +81,8 @@ def fetch_protein_product():
     return None
 
 def load_test_cases():
-    """Load existing test cases"""
-    if TEST_CASES_FILE.exists():
-        with open(TEST_CASES_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"description": "Test cases", "version": "1.0", "test_cases": []}
-
-def save_test_cases(data):
-    """Save test cases"""
-    with open(TEST_CASES_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    """Load existing test cases, including ones still pending in the case log"""
+    return get_case_log().merged()
 
 def add_test_case_for_training(product):
     """Add a product as a test case for Claude to evaluate"""
@@ -107,12 +106,10 @@ def add_test_case_for_training(product):
         "notes": f"Protein: {protein}g/100g. AWAITING CLAUDE EVALUATION."
     }
 
-    data = load_test_cases()
-
-    # Remove any existing training case with this barcode
-    data["test_cases"] = [tc for tc in data["test_cases"] if tc["id"] != test_case["id"]]
-    data["test_cases"].append(test_case)
-    save_test_cases(data)
+    # Replaces any existing training case with this barcode once the log is compacted
+    get_case_log().put(test_case)
+    with ProductStore() as store:
+        store.sync_case_log()
 
     return test_case
 
@@ -125,6 +122,9 @@ def run_gradle_tests():
     # Change to project directory
     os.chdir(PROJECT_DIR)
 
+    # The Kotlin test reads the canonical JSON, so fold pending cases into it first
+    get_case_log().compact()
+
     try:
         # Run Gradle test
         if sys.platform == "win32":
@@ -1,83 +1,321 @@
 """Test matching the refined Kotlin logic"""
+import atexit
+import hashlib
+import json
+import os
+import pickle
 import re
+from collections import deque
+from pathlib import Path
 
-PROTEIN_KEYWORDS = {
-    "Rice Protein": ["rice protein", "reisprotein", "reiseiweiß", "reiseiweiss", "brown rice protein"],
-    "Whey Concentrate": ["whey protein concentrate", "whey concentrate", "whey powder", "whey", "molkenproteinkonzentrat", "molkenpulver", "molkeneiweiß", "molkeneiweiss"],
-    "Whey Isolate": ["whey protein isolate", "whey isolate", "molkenproteinisolat", "molkenisolat"],
-    "Soy Protein": ["soy protein", "soja", "soya", "sojaeiweiß", "sojaeiweiss", "tofu", "tempeh"],
-    "Soy Protein Isolate": ["soy protein isolate", "soy isolate", "sojaproteinisolat", "sojaisolat"],
-    "Pea Protein": ["pea protein", "pea", "erbsen", "peas", "protéine de pois"],
-    "Pea Protein Isolate": ["pea protein isolate", "pea isolate", "erbsenproteinisolat", "erbsenisolat"],
-    "Wheat Protein": ["wheat protein", "wheat", "weizen", "gluten", "wheat flour", "weizenmehl"],
-}
-
-PROTEIN_BASE_KEYWORDS = {
-    "soja", "soya", "erbsen", "peas", "pea", "reis", "rice", "whey", "molke", "molken"
-}
+from normalization import normalize
+from protein_data import load_data
+
+# Keywords and rule lists come from the shared protein_data.json (generated from ProteinDatabase.kt)
+_DATA = load_data()
+PROTEIN_KEYWORDS = {source["name"]: list(source["keywords"]) for source in _DATA["sources"]}
+PROTEIN_BASE_KEYWORDS = set(_DATA["rules"]["proteinBaseKeywords"])
+# A base keyword inside a word containing one of these is left to the more specific source
+PROTEIN_SUFFIXES = tuple(_DATA["rules"]["proteinSuffixes"])
+# Generic keywords ("milk", "eiweiß") that only count as whole words for these sources
+GENERIC_TERMS = {keyword: set(names) for keyword, names in _DATA["rules"]["genericTerms"].items()}
+
+# Compiled automaton of the last matcher built for the shared table
+MATCHER_CACHE_FILE = Path(__file__).parent / ".protein_matcher.pickle"
+MATCHER_FORMAT = 1
+
+WORD_BOUNDARIES = frozenset(' ,.:;()[]\t\n')
+
+# Outcomes of the match rules for one keyword hit (KeywordMatcher.decide); only BOUNDED and SUBSTRING match
+BOUNDED, SUBSTRING = "bounded", "substring"
+SHORT, GENERIC, FALLBACK, SPECIFIC = "short", "generic", "fallback", "specific"
+MATCHED = frozenset({BOUNDED, SUBSTRING})
 
 def get_full_word(text, start, end):
-    boundaries = set(' ,.:;()[]\t\n')
     word_start = 0
     for i in range(start - 1, -1, -1):
-        if text[i] in boundaries:
+        if text[i] in WORD_BOUNDARIES:
             word_start = i + 1
             break
     word_end = len(text)
     for i in range(end, len(text)):
-        if text[i] in boundaries:
+        if text[i] in WORD_BOUNDARIES:
             word_end = i
             break
     return text[word_start:word_end]
 
-def find_matches(ingredients: str) -> list:
-    ingredients_lower = ingredients.lower()
-    matches = []
-    
-    for protein_name, keywords in PROTEIN_KEYWORDS.items():
-        for keyword in keywords:
-            found = False
-            
-            if len(keyword) <= 3:
-                pattern = r'\b' + re.escape(keyword) + r'\b'
-                if re.search(pattern, ingredients_lower):
-                    matches.append((protein_name, keyword))
-                    found = True
-            else:
-                pattern = r'\b' + re.escape(keyword) + r'\b'
-                if re.search(pattern, ingredients_lower):
+def _is_word_char(ch):
+    """Same notion of a word character as the regex \\b assertion."""
+    return ch.isalnum() or ch == '_'
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over every keyword of a protein keyword table.
+
+    One pass over the text records, for each keyword, its first occurrence and
+    whether any occurrence sits on \\b word boundaries. That is everything the
+    per-keyword re.search / str.find rules need, so find_matches() returns the
+    same (protein_name, keyword) list as searching keyword by keyword.
+
+    A substring hit inside a word that is itself a keyword of another source
+    yields to that more specific source: "molkenprotein" does not match inside
+    "molkenproteinisolat", which is Whey Protein Isolate only.
+    """
+
+    def __init__(self, protein_keywords, base_keywords, protein_suffixes=PROTEIN_SUFFIXES,
+                 generic_terms=GENERIC_TERMS, tables=None):
+        self.protein_keywords = {name: list(kws) for name, kws in protein_keywords.items()}
+        self.base_keywords = frozenset(base_keywords)
+        self.protein_suffixes = tuple(protein_suffixes)
+        self.generic_terms = {kw: frozenset(names) for kw, names in generic_terms.items()}
+
+        keywords = list(dict.fromkeys(kw for kws in self.protein_keywords.values() for kw in kws if kw))
+        self.keywords = keywords
+        self._sources_of = {}
+        for name, kws in self.protein_keywords.items():
+            for kw in kws:
+                self._sources_of.setdefault(kw, set()).add(name)
+        self._lengths = [len(kw) for kw in keywords]
+        self._first_is_word = [_is_word_char(kw[0]) for kw in keywords]
+        self._last_is_word = [_is_word_char(kw[-1]) for kw in keywords]
+
+        if tables is not None and tables["keywords"] == keywords:
+            goto, fail, out = tables["goto"], tables["fail"], tables["out"]
+        else:
+            goto, fail, out = self._build(keywords)
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        # While in the root state, jump straight to the next character that can start a keyword
+        self._start_chars = re.compile('[' + ''.join(re.escape(ch) for ch in goto[0]) + ']') if goto[0] else None
+
+    @staticmethod
+    def _build(keywords):
+        """goto/fail/out tables of the automaton over keywords."""
+        # Trie
+        goto = [{}]
+        out = [[]]
+        for index, kw in enumerate(keywords):
+            state = 0
+            for ch in kw:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(index)
+
+        # Failure links (BFS), merging outputs of the fallback state
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        return goto, fail, out
+
+    def tables(self) -> dict:
+        """The compiled automaton, for KeywordMatcher(..., tables=...) to skip building it."""
+        return {"keywords": self.keywords, "goto": self._goto, "fail": self._fail, "out": self._out}
+
+    def scan(self, text, on_occurrence=None):
+        """Return {keyword: [first_start, has_bounded_occurrence]} for keywords found in text.
+
+        on_occurrence, if given, is called with the keyword of every occurrence the automaton reports.
+        """
+        hits = {}
+        if self._start_chars is None:
+            return hits
+        goto, fail, out = self._goto, self._fail, self._out
+        keywords, lengths = self.keywords, self._lengths
+        first_is_word, last_is_word = self._first_is_word, self._last_is_word
+        search_start = self._start_chars.search
+        n = len(text)
+        state = 0
+        i = 0
+        while i < n:
+            if state == 0:
+                m = search_start(text, i)
+                if m is None:
+                    break
+                i = m.start()
+            ch = text[i]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                keyword = keywords[index]
+                if on_occurrence is not None:
+                    on_occurrence(keyword)
+                hit = hits.get(keyword)
+                if hit is not None and hit[1]:
+                    continue
+                start = i - lengths[index] + 1
+                before = text[start - 1] if start > 0 else ''
+                after = text[i + 1] if i + 1 < n else ''
+                bounded = (_is_word_char(before) != first_is_word[index] and
+                           _is_word_char(after) != last_is_word[index])
+                if hit is None:
+                    hits[keyword] = [start, bounded]
+                elif bounded:
+                    hit[1] = True
+            i += 1
+        return hits
+
+    def full_word(self, text, start, end):
+        """The word around text[start:end] (get_full_word; a hook for instrumentation)."""
+        return get_full_word(text, start, end)
+
+    def yields_to_specific(self, hits, text, start, keyword, protein_name) -> bool:
+        """True when the unbounded hit of keyword at start lies in a word that another source has as a keyword."""
+        full_word = self.full_word(text, start, start + len(keyword))
+        if full_word == keyword:
+            return False
+        hit = hits.get(full_word)
+        return hit is not None and hit[1] and bool(self._sources_of.get(full_word, set()) - {protein_name})
+
+    def decide(self, hits, text, protein_name, keyword) -> str:
+        """Outcome of the match rules for a keyword of protein_name found by scan(); a match if in MATCHED."""
+        start, bounded = hits[keyword]
+        if bounded:
+            return BOUNDED
+        if len(keyword) <= 3:
+            return SHORT
+        if protein_name in self.generic_terms.get(keyword.lower(), ()):
+            return GENERIC
+        if keyword.lower() in self.base_keywords:
+            full_word = self.full_word(text, start, start + len(keyword))
+            return FALLBACK if any(suffix in full_word for suffix in self.protein_suffixes) else SUBSTRING
+        return SPECIFIC if self.yields_to_specific(hits, text, start, keyword, protein_name) else SUBSTRING
+
+    def find_matches(self, ingredients: str) -> list:
+        ingredients_lower = normalize(ingredients).lower
+        hits = self.scan(ingredients_lower)
+        matches = []
+        if not hits:
+            return matches
+
+        decide = self.decide
+        for protein_name, keywords in self.protein_keywords.items():
+            for keyword in keywords:
+                if keyword in hits and decide(hits, ingredients_lower, protein_name, keyword) in MATCHED:
                     matches.append((protein_name, keyword))
-                    found = True
-                else:
-                    idx = ingredients_lower.find(keyword)
-                    if idx != -1:
-                        if keyword.lower() in PROTEIN_BASE_KEYWORDS:
-                            full_word = get_full_word(ingredients_lower, idx, idx + len(keyword))
-                            if "isolat" not in full_word and "konzentrat" not in full_word:
-                                matches.append((protein_name, keyword))
-                                found = True
-                        else:
-                            matches.append((protein_name, keyword))
-                            found = True
-            
-            if found:
-                break
-    return matches
+                    break
+        return matches
+
+_matcher = None
+
+def _write_matcher_stats(path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(_matcher.stats.to_json())
+
+def _matcher_key():
+    table = [PROTEIN_KEYWORDS, sorted(PROTEIN_BASE_KEYWORDS), PROTEIN_SUFFIXES, MATCHER_FORMAT]
+    return hashlib.sha1(json.dumps(table, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def load_matcher(cache_file=MATCHER_CACHE_FILE, rebuild=False):
+    """KeywordMatcher for the shared table, reusing the automaton cached in cache_file.
+
+    The cache is keyed by the keyword table, so it is rebuilt (and rewritten)
+    whenever protein_data.json or ProteinDatabase.kt changes.
+    """
+    key = _matcher_key()
+    cache_file = Path(cache_file)
+    if not rebuild and cache_file.exists():
+        try:
+            with open(cache_file, "rb") as f:
+                cached = pickle.load(f)
+            if cached.get("key") == key:
+                return KeywordMatcher(PROTEIN_KEYWORDS, PROTEIN_BASE_KEYWORDS, tables=cached["tables"])
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError):
+            pass
+    matcher = KeywordMatcher(PROTEIN_KEYWORDS, PROTEIN_BASE_KEYWORDS)
+    tmp = cache_file.with_name(cache_file.name + ".tmp")
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump({"key": key, "tables": matcher.tables()}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass  # read-only checkout: just use the freshly built matcher
+    return matcher
+
+def get_matcher():
+    """Compiled matcher for PROTEIN_KEYWORDS, loaded on first use (see load_matcher).
+
+    With PROTEIN_MATCHER_STATS=<file.json> set, the matcher is instrumented
+    (see matcher_stats.py) and its per-keyword stats are written there at exit.
+    """
+    global _matcher
+    if _matcher is None:
+        stats_file = os.environ.get("PROTEIN_MATCHER_STATS")
+        if stats_file:
+            from matcher_stats import InstrumentedMatcher
+            _matcher = InstrumentedMatcher(PROTEIN_KEYWORDS, PROTEIN_BASE_KEYWORDS)
+            atexit.register(_write_matcher_stats, stats_file)
+        else:
+            _matcher = load_matcher()
+    return _matcher
+
+def find_matches(ingredients: str) -> list:
+    return get_matcher().find_matches(ingredients)
+
+# Upper bound on distinct texts remembered by one find_matches_batch call
+BATCH_MEMO_SIZE = 100_000
+
+def find_matches_batch(texts, matcher=None):
+    """Yield find_matches() results for every text, in input order.
+
+    The compiled matcher is shared by the whole batch, and texts repeated in
+    the stream (the same recipe under several barcodes is common in OFF data)
+    are lowercased and scanned only once.
+    """
+    matcher = matcher or get_matcher()
+    memo = {}
+    for text in texts:
+        result = memo.get(text)
+        if result is None:
+            result = matcher.find_matches(text)
+            if len(memo) < BATCH_MEMO_SIZE:
+                memo[text] = result
+        yield list(result)
+
+def quiet_compile_starts_runner():
+    """GradleTestRunner.start() against a stub wrapper that prints nothing and exits 0."""
+    import stat
+    import tempfile
+    from gradle_runner import GradleTestRunner
+    with tempfile.TemporaryDirectory() as project:
+        wrapper = Path(project) / "gradlew"
+        wrapper.write_text("#!/bin/sh\nexit 0\n", encoding="utf-8")
+        wrapper.chmod(wrapper.stat().st_mode | stat.S_IEXEC)
+        (Path(project) / "gradlew.bat").write_text("@exit /b 0\r\n", encoding="utf-8")
+        runner = GradleTestRunner(project, on_line=None)
+        success, _ = runner.start()
+        return success and runner.started
 
 def test():
+    # Names and outcomes follow the app's proteinSources table (shared through protein_data.json)
     tests = [
-        ("Reismehl, Zucker", [], "Rice flour no match"),
-        ("Reisprotein, Wasser", ["Rice Protein"], "Rice protein matches"),
-        ("Molkeneiweiß, Zucker", ["Whey Concentrate"], "Generic whey -> Concentrate"),
-        ("Molkenproteinisolat", ["Whey Isolate"], "Whey isolat -> Isolate ONLY"),
+        ("Reismehl, Zucker", ["Rice Grain Protein"], "Rice flour -> Rice Grain, not Rice Protein"),
+        ("Reisprotein, Wasser", ["Rice Protein"], "Rice protein matches (no Rice Grain from 'reis')"),
+        ("Molkeneiweiß, Zucker", ["Whey Protein Concentrate"], "Generic whey -> Concentrate (no Egg from 'eiweiß')"),
+        ("Molkenproteinisolat", ["Whey Protein Isolate"], "Whey isolat -> Isolate ONLY"),
         ("Soja, Wasser", ["Soy Protein"], "Plain soja -> Soy Protein"),
         ("Sojaproteinisolat", ["Soy Protein Isolate"], "Soy isolat -> Isolate ONLY"),
-        ("Erbsen, Salz", ["Pea Protein"], "Plain erbsen -> Pea Protein"),  
+        ("Erbsen, Salz", ["Pea Protein"], "Plain erbsen -> Pea Protein"),
         ("Erbsenproteinisolat", ["Pea Protein Isolate"], "Pea isolat -> Isolate ONLY"),
-        ("Whey protein, wheat flour", ["Whey Concentrate", "Wheat Protein"], "Mixed detection"),
+        ("Whey protein, wheat flour", ["Whey Protein Concentrate", "Wheat Protein"], "Mixed detection"),
         ("Weizenvollkornmehl", ["Wheat Protein"], "German wheat compound"),
         ("Tofu, Salz", ["Soy Protein"], "Tofu matches"),
-        ("Molkenproteinisolat, Weizen", ["Whey Isolate", "Wheat Protein"], "Isolate + wheat"),
+        ("Molkenproteinisolat, Weizen", ["Whey Protein Isolate", "Wheat Protein"], "Isolate + wheat"),
+        ("Molkenproteinisolat, Molkenprotein", ["Whey Protein Isolate", "Whey Protein Concentrate"],
+         "Isolate + separate whey protein"),
     ]
     
     print("Testing with refined logic...\n")
@@ -97,6 +335,25 @@ def test():
         
         passed += ok
         failed += not ok
+
+    # The instrumented matcher (matcher_stats.py) must only observe, never change a result
+    from corpus import iter_test_cases
+    from matcher_stats import mismatches
+    differences = mismatches(case["ingredients"] for case in iter_test_cases())
+    ok = not differences
+    print(f"{'✅' if ok else '❌'} Instrumented matcher agrees with KeywordMatcher on the test cases")
+    for text, expected, got in differences[:5]:
+        print(f"   Input: '{text[:60]}'")
+        print(f"   Expected: {expected}")
+        print(f"   Got: {got}")
+    passed += ok
+    failed += not ok
+
+    # A quiet warm-up compile prints no "BUILD SUCCESSFUL"; exiting 0 must still count as started
+    ok = quiet_compile_starts_runner()
+    print(f"{'✅' if ok else '❌'} Gradle runner starts after a quiet compile that exits 0")
+    passed += ok
+    failed += not ok
     
     print(f"\n{'='*40}")
     print(f"Results: {passed} passed, {failed} failed")
@@ -0,0 +1,162 @@
+"""
+Structured results from the Gradle unit test reports
+
+Reads the JUnit XML reports Gradle writes under app/build/test-results with a
+streaming parser, plus the per-case JSON report ProteinDetectionTest writes
+next to them (one entry per test case, in file order). Cases are counted
+per entry, so the duplicate ids in protein_test_cases.json stay separate:
+the second copy of an id is keyed "<id>#2".
+
+Usage:
+    python test_results.py                        # summarize the latest reports
+    python test_results.py --save run_a.json      # store per-case results
+    python test_results.py --diff run_a.json      # compare latest reports with a saved run
+"""
+
+import argparse
+import json
+import sys
+import xml.etree.ElementTree as ET
+from collections import Counter
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+RESULTS_DIR = PROJECT_ROOT / "app/build/test-results/testDebugUnitTest"
+# Written by ProteinDetectionTest.writeCaseReport (Gradle runs unit tests in the app module directory)
+CASE_REPORT_FILE = PROJECT_ROOT / "app/build/test-results/protein-detection/cases.json"
+CASE_REPORT_FORMAT = "protein-detection-results"
+
+
+def iter_report_files(results_dir=RESULTS_DIR, since=None):
+    """JUnit XML report files, optionally only those written after a timestamp."""
+    results_dir = Path(results_dir)
+    if not results_dir.exists():
+        return
+    for path in sorted(results_dir.glob("TEST-*.xml")):
+        if since is None or path.stat().st_mtime >= since:
+            yield path
+
+
+def parse_report(path) -> list:
+    """Stream one JUnit XML report into its testcases."""
+    tests = []
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag == "testcase":
+            failure = elem.find("failure")
+            if failure is None:
+                failure = elem.find("error")
+            tests.append({
+                "classname": elem.get("classname", ""),
+                "name": elem.get("name", ""),
+                "time_s": float(elem.get("time") or 0),
+                "passed": failure is None and elem.find("skipped") is None,
+                "skipped": elem.find("skipped") is not None,
+                "message": failure.get("message", "") if failure is not None else "",
+            })
+            elem.clear()
+        elif elem.tag == "system-out":
+            elem.clear()
+    return tests
+
+
+def load_case_report(path=CASE_REPORT_FILE, since=None):
+    """Per-case results of the last ProteinDetectionTest run, or None if there is none (since `since`)."""
+    path = Path(path)
+    if not path.exists() or (since is not None and path.stat().st_mtime < since):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    if report.get("format") != CASE_REPORT_FORMAT:
+        raise ValueError(f"{path} is not a {CASE_REPORT_FORMAT} report")
+    cases = report.get("cases", [])
+    copies = Counter()
+    for case in cases:
+        copies[case["id"]] += 1
+        case["key"] = case["id"] if copies[case["id"]] == 1 else f"{case['id']}#{copies[case['id']]}"
+        for field in ("detected", "missing", "wrongly_detected", "unexpected"):
+            case.setdefault(field, [])
+    return cases
+
+
+def load_results(results_dir=RESULTS_DIR, since=None, case_report=CASE_REPORT_FILE):
+    """Combine the reports into one result dict, or None if there are no reports.
+
+    Keys: tests (JUnit testcases), cases (per-case results, one per test
+    case), passed/failed (case counts when the case report exists,
+    otherwise JUnit test counts).
+    """
+    tests = []
+    found = False
+    for path in iter_report_files(results_dir, since):
+        found = True
+        tests.extend(parse_report(path))
+    cases = load_case_report(case_report, since)
+    if not found and cases is None:
+        return None
+
+    if cases is not None:
+        passed = sum(1 for c in cases if c["passed"])
+        failed = len(cases) - passed
+    else:
+        cases = []
+        passed = sum(1 for t in tests if t["passed"])
+        failed = sum(1 for t in tests if not t["passed"] and not t["skipped"])
+    return {"tests": tests, "cases": cases, "passed": passed, "failed": failed}
+
+
+def _cases_by_key(results: dict) -> dict:
+    return {case["key"]: case for case in results.get("cases", [])}
+
+
+def diff_results(old: dict, new: dict) -> dict:
+    """Case keys whose outcome changed between two load_results() dicts."""
+    old_cases, new_cases = _cases_by_key(old), _cases_by_key(new)
+    shared = set(old_cases) & set(new_cases)
+    return {
+        "newly_failing": sorted(i for i in shared if old_cases[i]["passed"] and not new_cases[i]["passed"]),
+        "newly_passing": sorted(i for i in shared if not old_cases[i]["passed"] and new_cases[i]["passed"]),
+        "added": sorted(set(new_cases) - set(old_cases)),
+        "removed": sorted(set(old_cases) - set(new_cases)),
+    }
+
+
+def save_results(results: dict, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+def load_saved_results(path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Structured protein detection test results")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR), help="Directory with TEST-*.xml reports")
+    parser.add_argument("--save", help="Write per-case results to this JSON file")
+    parser.add_argument("--diff", help="Compare with results saved earlier via --save")
+    args = parser.parse_args()
+
+    results = load_results(args.results_dir)
+    if results is None:
+        print(f"No JUnit reports found in {args.results_dir}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Cases: {results['passed']} passed, {results['failed']} failed")
+    slowest = sorted((c for c in results["cases"] if c.get("time_ms") is not None),
+                     key=lambda c: c["time_ms"], reverse=True)[:5]
+    for case in slowest:
+        print(f"  slow: {case['key']} {case['time_ms']:.3f} ms")
+
+    if args.save:
+        save_results(results, args.save)
+    if args.diff:
+        changes = diff_results(load_saved_results(args.diff), results)
+        for change, keys in changes.items():
+            print(f"{change}: {len(keys)}")
+            for key in keys:
+                print(f"  {key}")
+
+
+if __name__ == "__main__":
+    main()
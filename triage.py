@@ -0,0 +1,155 @@
+"""
+Detector pre-triage for training products
+
+Most products in a run are handled correctly by the current detector, yet
+each one used to cost a full agent iteration. Triage runs the detector (the
+protein_engine port of analyzeProteinQuality, cross-checked with the keyword
+matcher) over the products up front and sorts them into:
+
+    accept    the detection is uncontroversial: it is recorded as the test
+              case directly (expected_detected = detected sources,
+              expected_not_detected = sources whose keywords were rejected)
+    review    the agent has to look at it, together with the detection and
+              the reasons below
+
+A product needs review when any of these holds:
+
+    - it contains protein-looking words no keyword matches ("lupinenprotein")
+    - the engine and the keyword matcher detect different sources
+    - a keyword was accepted or rejected by a word-boundary heuristic
+      (short keyword, generic term, compound word, corrupted data) rather
+      than by a domain rule (trace warning, lecithin, oil, starch, ...)
+    - it triggers a domain rule that fewer than MIN_RULE_CASES test cases
+      exercise, or is in a language with fewer than MIN_LANGUAGE_CASES cases
+    - nothing was detected although its category suggests protein
+
+Usage:
+    python triage.py runs/run_20260127_01           # decision per product
+    python triage.py runs/run_20260127_01 --json
+    python triage.py --text "Zutaten: Wasser, Erbsenprotein, Salz"
+"""
+
+import argparse
+import json
+from collections import Counter
+
+from product_selector import coverage_profile, features, guess_language, rule_family
+from protein_engine import get_engine
+
+ACCEPT, REVIEW = "accept", "review"
+
+MIN_RULE_CASES = 5
+MIN_LANGUAGE_CASES = 20
+# Rejections decided by word boundaries/spelling rather than by an ingredient rule
+HEURISTIC_RULES = ("Short keyword not at word boundary", "Generic term not at word boundary",
+                   "Part of compound word", "Corrupted data pattern")
+# Categories whose products are expected to contain a protein source
+PROTEIN_CATEGORY_HINTS = ("protein", "meat", "fish", "cheese", "milk", "yogurt", "egg", "tofu", "legume",
+                          "nut", "poultry", "chicken", "sausage", "ham", "seafood", "dairy")
+
+
+def _matcher_detect(ingredients: str) -> list:
+    from test_fixes import find_matches
+    return [name for name, _ in find_matches(ingredients)]
+
+
+def triage_product(product: dict, profile: Counter = None, engine=None) -> dict:
+    """Decision, reasons and the precomputed detection for one product."""
+    engine = engine or get_engine()
+    profile = profile if profile is not None else coverage_profile(engine=engine)
+    ingredients = product.get("ingredients") or ""
+    analysis = engine.analyze(ingredients)
+    detected = [d["name"] for d in analysis["detected_proteins"]]
+    debug = analysis["debug_matches"]
+    rejected = {}
+    for match in debug:
+        if not match["was_accepted"]:
+            rejected.setdefault(match["protein_source_name"], match["rejection_reason"])
+    not_detected = [name for name in rejected if name not in detected]
+
+    reasons = []
+    uncovered = [value for kind, value in features(product, engine) if kind == "uncovered"]
+    if uncovered:
+        reasons.append(f"protein words no keyword matches: {', '.join(uncovered)}")
+    matcher = _matcher_detect(ingredients)
+    if set(matcher) != set(detected):
+        reasons.append(f"engine detects {detected or 'nothing'}, keyword matcher {matcher or 'nothing'}")
+    for name, reason in rejected.items():
+        if reason.startswith(HEURISTIC_RULES):
+            reasons.append(f"{name}: {reason}")
+        else:
+            if profile["rule", rule_family(reason)] < MIN_RULE_CASES:
+                reasons.append(f"{name}: rarely tested rule ({reason})")
+    language = guess_language(ingredients, product.get("lang", ""))
+    if profile["language", language] < MIN_LANGUAGE_CASES:
+        reasons.append(f"few test cases in language '{language}'")
+    category = (product.get("category") or "").lower()
+    if not detected and any(hint in category for hint in PROTEIN_CATEGORY_HINTS):
+        reasons.append(f"nothing detected in category {product.get('category')}")
+
+    return {
+        "decision": REVIEW if reasons else ACCEPT,
+        "reasons": reasons,
+        "detected": detected,
+        "not_detected": not_detected,
+        "matcher_detected": matcher,
+        "confidence_score": analysis["confidence_score"],
+        "weighted_pdcaas": analysis["weighted_pdcaas"],
+    }
+
+
+def auto_case(product: dict, result: dict) -> dict:
+    """The test case for an accepted product, in the shape the agent writes."""
+    barcode = product.get("barcode", "unknown")
+    name = product.get("name") or "Unknown Product"
+    brand = product.get("brand") or ""
+    return {
+        "id": f"off_{barcode}",
+        "name": f"{brand} - {name}" if brand else name,
+        "source": "openfoodfacts",
+        "barcode": barcode,
+        "ingredients": product.get("ingredients", ""),
+        "expected_detected": result["detected"],
+        "expected_not_detected": result["not_detected"],
+        "notes": "Auto-accepted by triage (detector result, no conflicting signals)",
+    }
+
+
+def triage_products(products, profile: Counter = None, engine=None) -> list:
+    """triage_product() for each product, sharing one coverage profile."""
+    engine = engine or get_engine()
+    profile = profile if profile is not None else coverage_profile(engine=engine)
+    return [triage_product(product, profile, engine) for product in products]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sort products into auto-accepted and agent review")
+    parser.add_argument("source", nargs="?", help="Run folder or products file")
+    parser.add_argument("--text", help="Triage a single ingredient text instead")
+    parser.add_argument("--json", action="store_true", help="Print one JSON result per product")
+    args = parser.parse_args()
+    if not args.source and args.text is None:
+        parser.error("give a run folder/products file or --text")
+
+    if args.text is not None:
+        products = [{"barcode": "text", "name": "", "ingredients": args.text}]
+    else:
+        from run_products import iter_products
+        products = list(iter_products(args.source))
+    results = triage_products(products)
+
+    for i, (product, result) in enumerate(zip(products, results)):
+        if args.json:
+            print(json.dumps({"index": i, "barcode": product.get("barcode"), **result}, ensure_ascii=False))
+            continue
+        print(f"#{i:<3} {result['decision']:<6} {(product.get('name') or '')[:32]:<32} "
+              f"{', '.join(result['detected']) or '-'}")
+        for reason in result["reasons"]:
+            print(f"       - {reason}")
+    if not args.json:
+        accepted = sum(1 for r in results if r["decision"] == ACCEPT)
+        print(f"{accepted} of {len(results)} products auto-accepted, {len(results) - accepted} need review")
+
+
+if __name__ == "__main__":
+    main()